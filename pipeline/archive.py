@@ -0,0 +1,213 @@
+# pipeline/archive.py
+"""
+raw html archive (warc-style) in data/archive
+1. every fetched article appended to a segment file, one compressed record each (zstd, zlib if not installed)
+2. index.db maps url -> segment, offset, length (random access, no scanning)
+3. same body as the last record for a url is not stored again
+4. re-extract: replay archived pages through the current extractors, in parallel, no network
+   python -m pipeline.archive reextract [--workers N] [--kind article]
+"""
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+import argparse, hashlib, json, os, sqlite3, struct, threading, time, zlib
+
+import pandas as pd
+
+try:
+    import zstandard
+    _zc = zstandard.ZstdCompressor(level=10)
+    _zd = zstandard.ZstdDecompressor()
+    CODEC = "zstd"
+except ImportError:
+    zstandard = None
+    CODEC = "zlib"
+    print("warning: zstandard not installed, archive records fall back to zlib (larger, slower); "
+          "pip install zstandard")
+
+# archive location
+archive_folder = Path("data/archive")
+archive_folder.mkdir(parents=True, exist_ok=True)
+db_file = archive_folder / "index.db"
+
+SEGMENT_BYTES = 256 * 1024 * 1024   # start a new segment past this size
+MAGIC = b"IWR1"                      # record marker, then 4-byte length
+
+_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    con = sqlite3.connect(db_file, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS records ("
+        " id INTEGER PRIMARY KEY,"
+        " url TEXT,"
+        " final_url TEXT,"
+        " status INTEGER,"
+        " content_type TEXT,"
+        " kind TEXT,"           # cache class it was fetched as (article, rss, search ...)
+        " fetched REAL,"
+        " sha TEXT,"            # sha256 of the raw body
+        " segment TEXT,"
+        " offset INTEGER,"
+        " length INTEGER,"
+        " codec TEXT)"
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS records_url ON records (url)")
+    return con
+
+def compress(data: bytes, codec: str = CODEC) -> bytes:
+    return _zc.compress(data) if codec == "zstd" else zlib.compress(data, 6)
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("record is zstd compressed, install zstandard to read it")
+        return _zd.decompress(data)
+    return zlib.decompress(data)
+
+# newest segment, or a new one once it is full
+def _segment() -> Path:
+    segs = sorted(archive_folder.glob("seg_*.warcz"))
+    if segs and segs[-1].stat().st_size < SEGMENT_BYTES:
+        return segs[-1]
+    n = int(segs[-1].stem.split("_")[1]) + 1 if segs else 0
+    return archive_folder / f"seg_{n:05d}.warcz"
+
+# append one response (body already read)
+def store(url: str, r, body: bytes | None = None, kind: str | None = None) -> bool:
+    body = r.content if body is None else body
+    if not body:
+        return False
+    sha = hashlib.sha256(body).hexdigest()
+    header = {
+        "url": url,
+        "final_url": r.url or url,
+        "status": r.status_code,
+        "headers": dict(r.headers),
+        "kind": kind,
+        "fetched": time.time()
+    }
+    head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    payload = compress(struct.pack(">I", len(head)) + head + body)
+    record = MAGIC + struct.pack(">I", len(payload)) + payload
+
+    with _lock:
+        con = _connect()
+        try:
+            last = con.execute("SELECT sha FROM records WHERE url = ? ORDER BY id DESC LIMIT 1", (url,)).fetchone()
+            if last and last[0] == sha:
+                return False
+            seg = _segment()
+            # one write with O_APPEND, so other processes appending to the segment can't interleave
+            fd = os.open(seg, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, record)
+                offset = os.lseek(fd, 0, os.SEEK_CUR) - len(record)
+            finally:
+                os.close(fd)
+            with con:
+                con.execute(
+                    "INSERT INTO records (url, final_url, status, content_type, kind, fetched, sha, segment, offset, length, codec) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, header["final_url"], r.status_code, r.headers.get("Content-Type", ""), kind,
+                     header["fetched"], sha, seg.name, offset, len(record), CODEC)
+                )
+        finally:
+            con.close()
+    return True
+
+# read one record -> (header, body)
+def read(segment: str, offset: int, length: int, codec: str) -> tuple[dict, bytes]:
+    with open(archive_folder / segment, "rb") as f:
+        f.seek(offset)
+        record = f.read(length)
+    if record[:4] != MAGIC:
+        raise ValueError(f"no record at {segment}:{offset}")
+    (n,) = struct.unpack(">I", record[4:8])
+    raw = decompress(record[8:8 + n], codec)
+    (h,) = struct.unpack(">I", raw[:4])
+    return json.loads(raw[4:4 + h].decode("utf-8")), raw[4 + h:]
+
+# index rows, newest record per url
+def records(kinds: list[str] | None = None) -> list[tuple]:
+    sql = ("SELECT id, url, final_url, segment, offset, length, codec, kind FROM records "
+           "WHERE id IN (SELECT MAX(id) FROM records GROUP BY url)")
+    args = []
+    if kinds:
+        sql += f" AND kind IN ({','.join('?' * len(kinds))})"
+        args = kinds
+    with _connect() as con:
+        return con.execute(sql + " ORDER BY id", args).fetchall()
+
+# latest archived body for a url (None if not archived)
+def latest(url: str) -> tuple[dict, bytes] | None:
+    with _connect() as con:
+        row = con.execute(
+            "SELECT segment, offset, length, codec FROM records WHERE url = ? ORDER BY id DESC LIMIT 1", (url,)
+        ).fetchone()
+    return read(*row) if row else None
+
+def summary() -> dict:
+    with _connect() as con:
+        n, urls = con.execute("SELECT COUNT(*), COUNT(DISTINCT url) FROM records").fetchone()
+    size = sum(f.stat().st_size for f in archive_folder.glob("seg_*.warcz"))
+    return {"records": n, "urls": urls, "bytes": size, "codec": CODEC}
+
+# re-extract one batch of records (runs in a worker process)
+def _extract_batch(rows: list[tuple]) -> list[dict]:
+    from pipeline import scraper_full, scraper_quick, scraper_search
+
+    outlets = {urlsplit(src["url"]).hostname: scraper_full.outlet_settings(src["name"], src["url"])
+               for src in scraper_quick.news}
+    out = []
+    for rid, url, final_url, segment, offset, length, codec, kind in rows:
+        try:
+            _, body = read(segment, offset, length, codec)
+        except Exception as e:
+            print("unreadable record", rid, "-", e)
+            continue
+        page_url = final_url or url
+        settings = outlets.get(urlsplit(page_url).hostname)
+        if settings:
+            status, article = scraper_full.parse_article(body, page_url, settings)
+            row = article if status == "found" else None
+        else:
+            row = scraper_search.parse_page(page_url, body)
+        if row:
+            out.append({**row, "Archive_ID": rid, "Kind": kind})
+    return out
+
+# replay the archive through the current extractors
+def reextract(kinds: list[str] | None = None, workers: int | None = None, batch: int = 200) -> pd.DataFrame:
+    rows = records(kinds)
+    print("re-extracting", len(rows), "archived pages")
+    workers = workers or os.cpu_count() or 1
+    batch = max(1, min(batch, -(-len(rows) // workers)))    # spread small archives over every worker
+    batches = [rows[i:i + batch] for i in range(0, len(rows), batch)]
+    out = []
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for res in pool.map(_extract_batch, batches):
+            out += res
+    secs = time.perf_counter() - t0
+    print(f"{len(out)} of {len(rows)} pages extracted in {secs:.1f}s ({len(rows) / secs if secs else 0:.0f} pages/s)")
+    return pd.DataFrame(out)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="raw html archive")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rx = sub.add_parser("reextract", help="run archived pages through the current extractors")
+    rx.add_argument("--kind", action="append", help="only records fetched as this kind (default: article)")
+    rx.add_argument("--workers", type=int, default=None)
+    rx.add_argument("--out", default=None, help="csv to write (default data/archive/reextract_<time>.csv)")
+    sub.add_parser("summary", help="record count and size")
+    args = parser.parse_args()
+
+    if args.cmd == "summary":
+        print(summary())
+    else:
+        df = reextract(args.kind or ["article"], args.workers)
+        out = Path(args.out) if args.out else archive_folder / f"reextract_{time.strftime('%Y%m%d_%H%M%S')}.csv"
+        df.to_csv(out, index=False)
+        print("saved to", out)
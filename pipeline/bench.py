@@ -0,0 +1,161 @@
+# pipeline/bench.py
+"""
+benchmarks on saved pages (no network needed once pages are saved)
+1. search: compare duckduckgo backends on saved result pages in data/bench/ddg
+2. extract: pages/s of the extraction engine on saved html in data/bench/html
+run with: python -m pipeline.bench search [--save "query" ...]
+          python -m pipeline.bench extract [--save URL ...]
+"""
+from pathlib import Path
+import argparse, contextlib, io, statistics, time
+
+from pipeline import search_backends, http_client
+
+# saved pages
+bench_folder = Path("data/bench")
+ddg_folder = bench_folder / "ddg"
+html_folder = bench_folder / "html"
+
+# save live result pages so later runs are repeatable
+def save_ddg_pages(queries: list[str]) -> list[Path]:
+    ddg_folder.mkdir(parents=True, exist_ok=True)
+    saved = []
+    for q in queries:
+        r = http_client.post(search_backends.DDG_URL, data={"q": q}, timeout=search_backends.SEARCH_TIMEOUT)
+        r.raise_for_status()
+        f = ddg_folder / f"{''.join(c if c.isalnum() else '_' for c in q)}.html"
+        f.write_bytes(r.content)
+        saved.append(f)
+        print("saved", f)
+    return saved
+
+# time a function over each page, return per-page seconds
+def time_pages(fn, pages: list[Path], repeat: int) -> tuple[list[float], int]:
+    times, links = [], 0
+    for f in pages:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            out = fn(f)
+            times.append(time.perf_counter() - t0)
+        links += len(out)
+    return times, links
+
+def report(name: str, times: list[float], links: int, extra: str = ""):
+    if not times:
+        print(f"{name:<10} no timings")
+        return
+    print(f"{name:<10} pages={len(times):<5} links={links:<5} "
+          f"mean={statistics.mean(times) * 1000:8.2f}ms  "
+          f"median={statistics.median(times) * 1000:8.2f}ms {extra}")
+
+# http backend parser vs selenium on the same saved pages
+def bench_search(repeat: int = 20, with_selenium: bool = True):
+    pages = sorted(ddg_folder.glob("*.html"))
+    if not pages:
+        print("no saved pages in", ddg_folder, "- run with --save first")
+        return
+
+    times, links = time_pages(lambda f: search_backends.parse_results(f.read_bytes()), pages, repeat)
+    report("http", times, links, "(parse only, network excluded)")
+
+    if not with_selenium:
+        return
+    try:
+        from selenium.webdriver.common.by import By
+        from pipeline import driver_pool
+
+        pool = driver_pool.DriverPool(size=1, max_pages=len(pages) + 1)
+        t0 = time.perf_counter()
+        driver = pool.checkout()
+        cold = time.perf_counter() - t0
+    except Exception as e:
+        print("selenium    skipped:", e)
+        return
+
+    def load(f: Path) -> list[str]:
+        driver.get(f.resolve().as_uri())
+        return [a.get_attribute("href") for a in driver.find_elements(By.CSS_SELECTOR, "div.result a.result__a")]
+
+    try:
+        times, links = time_pages(load, pages, 1)
+    finally:
+        pool.checkin(driver)
+        pool.close()
+    report("selenium", times, links, f"(pooled, {cold:.2f}s one-off browser start)")
+
+# save article pages as html fixtures
+def save_html_pages(urls: list[str]) -> list[Path]:
+    html_folder.mkdir(parents=True, exist_ok=True)
+    saved = []
+    for url in urls:
+        r = http_client.get(url, timeout=20)
+        r.raise_for_status()
+        f = html_folder / f"{''.join(c if c.isalnum() else '_' for c in url)[-120:]}.html"
+        f.write_bytes(r.content)
+        saved.append(f)
+        print("saved", f)
+    return saved
+
+# old way: beautifulsoup parse + soupsieve select_one per selector
+def bs4_baseline(page: bytes, selectors: list[tuple[str, ...]]) -> int:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(page, "html.parser")
+    hits = 0
+    for cascade in selectors:
+        for sel in cascade:
+            el = soup.select_one(sel)
+            if el and el.get_text(strip=True):
+                hits += 1
+                break
+    return hits
+
+# pages per second, old (bs4) vs new (extract.py), search and full-news parsers
+def bench_extract(repeat: int = 5):
+    from pipeline import scraper_search, scraper_full
+
+    pages = [f.read_bytes() for f in sorted(html_folder.glob("*.html"))]
+    if not pages:
+        print("no saved pages in", html_folder, "- run with --save first")
+        return
+
+    search_sels = [scraper_search.title_selectors, scraper_search.date_selectors,
+                   scraper_search.category_selectors, scraper_search.content_selectors]
+    full_sels = [tuple(scraper_full.UTUSAN[k]) for k in ("title_selectors", "date_selectors", "category_selectors")]
+
+    runs = {
+        "search (extract.py)": lambda p: scraper_search.parse_page("bench", p),
+        "full (extract.py)": lambda p: scraper_full.parse_article(p, "bench", scraper_full.UTUSAN),
+    }
+    try:
+        import bs4  # noqa: F401
+        runs["search (bs4 old)"] = lambda p: bs4_baseline(p, search_sels)
+        runs["full (bs4 old)"] = lambda p: bs4_baseline(p, full_sels)
+    except ImportError:
+        pass
+
+    for name, fn in runs.items():
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):   # parsers print misses
+            for _ in range(repeat):
+                for p in pages:
+                    fn(p)
+        secs = time.perf_counter() - t0
+        n = repeat * len(pages)
+        print(f"{name:<22} {n / secs:8.1f} pages/s  ({n} pages, {secs:.2f}s)")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="InfoCrawl benchmarks")
+    ap.add_argument("which", choices=["search", "extract"])
+    ap.add_argument("--save", nargs="*", default=[], help="queries (search) or urls (extract) to save first")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--no-selenium", action="store_true")
+    args = ap.parse_args()
+
+    if args.which == "search":
+        if args.save:
+            save_ddg_pages(args.save)
+        bench_search(repeat=args.repeat, with_selenium=not args.no_selenium)
+    elif args.which == "extract":
+        if args.save:
+            save_html_pages(args.save)
+        bench_extract(repeat=max(1, args.repeat // 4))
@@ -1,45 +1,40 @@
 # pipeline/compile.py
 """
 compile search data into a single txt file
-1. get all csv files in data/raw/search
-2. get only content column
-3. save as compiled_<query>.txt into data/processed
+1. get the search articles for the query only (parquet store, built from data/raw/search/search_<query>_<date>.csv)
+2. get only title and content columns, streamed a batch at a time
+3. skip paragraphs already written (repeated boilerplate, syndicated copies)
+4. stop at a character budget (MAX_CHARS, or max_tokens at ~4 chars per token)
+5. write as it goes to compiled_<query>.txt in data/processed (temp file, swapped in at the end)
 """
 from pathlib import Path
-import pandas as pd
-
-# raw csv file location
-raw_folder = Path("data/raw/search")
+import hashlib, re
+from pipeline import store
+from pipeline.scraper_search import clean_name
 
 # compiled file location
 processed_folder = Path("data/processed")
 processed_folder.mkdir(parents=True, exist_ok=True)
 
-def run(query: str = "", output_name: str | None = None) -> Path:
-    texts = []  # keep all the text here
-
-    # get all csv files and sort them
-    csvs = sorted(raw_folder.glob("*.csv"))
+# budget for the compiled text (it becomes one llm prompt)
+MAX_CHARS = 24000
+CHARS_PER_TOKEN = 4
 
-    for f in csvs:
-        try:
-            df = pd.read_csv(f)
-        except Exception as e:
-            print("could not read", f, e)
-            continue
+# search csv stems for a query (same name scraper_search writes)
+def query_filter(query: str):
+    if not query:
+        return None
+    pattern = re.compile(rf"search_{re.escape(clean_name(query))}_[\d-]+", re.IGNORECASE)
+    return lambda stem: bool(pattern.fullmatch(stem))
 
-        if "Content" not in df.columns:
-            print("no Content column in", f)
-            continue
+# paragraph -> key that ignores case and spacing
+def para_key(para: str) -> bytes:
+    return hashlib.blake2b(" ".join(para.lower().split()).encode("utf-8"), digest_size=16).digest()
 
-        for i, row in df.iterrows():
-            title = row.get("Title", f"row{i}")
-            content = str(row.get("Content", "")).strip()
-            if not content:
-                continue
-            texts.append(f"# {title}\n\n{content}\n\n---\n")
-
-    final = "\n".join(texts) if texts else "# Empty\n"
+def run(query: str = "", output_name: str | None = None, max_chars: int | None = MAX_CHARS,
+        max_tokens: int | None = None) -> Path:
+    if max_tokens:
+        max_chars = max_tokens * CHARS_PER_TOKEN
 
     # build output filename
     if output_name:
@@ -48,7 +43,64 @@ def run(query: str = "", output_name: str | None = None) -> Path:
         safe_q = "".join(c if c.isalnum() else "_" for c in query) if query else "compiled"
         out_file = processed_folder / f"compiled_{safe_q}.txt"
 
-    out_file.write_text(final, encoding="utf-8")
+    seen = set()    # paragraph keys already written
+    stats = {"articles": 0, "skipped_paragraphs": 0, "chars": 0, "truncated": False}
+    tmp = out_file.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as out:
+        for batch in store.batches("search", columns=["Title", "Content"], file_filter=query_filter(query)):
+            for title, content, i in zip(batch["Title"], batch["Content"], batch["__row__"]):
+                title = title if isinstance(title, str) else f"row{i}"
+                content = content.strip() if isinstance(content, str) else ""
+                if not content:
+                    continue
+
+                # new paragraphs only
+                paras = []
+                for para in re.split(r"\n\s*\n|\n", content):
+                    para = para.strip()
+                    if not para:
+                        continue
+                    key = para_key(para)
+                    if key in seen:
+                        stats["skipped_paragraphs"] += 1
+                        continue
+                    seen.add(key)
+                    paras.append(para)
+                if not paras:
+                    continue
+
+                head = f"# {title}\n\n"
+                tail = "\n\n---\n\n"
+                body = "\n\n".join(paras)
+                if max_chars is not None:
+                    room = max_chars - stats["chars"] - len(head) - len(tail)
+                    if room <= 0:
+                        stats["truncated"] = True
+                        break
+                    if len(body) > room:
+                        # cut at a paragraph (or word) boundary
+                        cut = body.rfind("\n\n", 0, room)
+                        cut = cut if cut > 0 else body.rfind(" ", 0, room)
+                        body = body[:cut if cut > 0 else room].rstrip()
+                        stats["truncated"] = True
+
+                text = head + body + tail
+                out.write(text)
+                stats["chars"] += len(text)
+                stats["articles"] += 1
+                if stats["truncated"]:
+                    break
+            if stats["truncated"]:
+                break
+
+        if not stats["articles"]:
+            print("no search articles to compile" + (f" for query '{query}'" if query else ""))
+            out.write("# Empty\n")
+    tmp.replace(out_file)
+
+    print(f"compiled {stats['articles']} articles ({stats['chars']} chars, "
+          f"{stats['skipped_paragraphs']} repeated paragraphs skipped"
+          f"{', budget reached' if stats['truncated'] else ''}) to {out_file}")
     return out_file
 
 if __name__ == "__main__":
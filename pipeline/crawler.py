@@ -1,27 +1,32 @@
 # pipeline/crawler.py
 """
-crawl and parse for links (pending update - selenium error if tried on other links)
+crawl and parse for links
 1. set template links
 2. set parsing for each template (beautifulsoup)
-3. set duckduckgo crawl (selenium)
-4. save as search_*.csv into data/raw/search
+3. set duckduckgo crawl (search_backends.py - http first, selenium fallback)
+4. fetch all sources at once (thread pool)
+5. save canonical links into data/crawl (frontier.py)
 """
 from urllib.parse import quote_plus
 from pathlib import Path
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.edge.options import Options
-import time, requests
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+import time
 from bs4 import BeautifulSoup
-
-# path to edge driver
-edge_driver = r"C:\WebDrivers\msedgedriver.exe"
+from pipeline import search_backends, frontier, http_client
 
 # folder to save stuff
 crawl_folder = Path("data/crawl")
 crawl_folder.mkdir(parents=True, exist_ok=True)
 
+# time limits (seconds)
+QUERY_DEADLINE = 30     # whole crawl, all sources together
+SOURCE_TIMEOUT = 15     # default per source
+SOURCE_TIMEOUTS = {     # slower sites get a bit more
+    "prpm": 20,
+    "pnm": 20,
+    "duckduckgo": 25
+}
+
 # make search urls for different sites
 def build_search_pages(text: str) -> dict[str, str]:
     q = text.strip()
@@ -79,51 +84,67 @@ def extract_article_links(url: str, html: str) -> list[str]:
     return links
 
 # duckduckgo
-def duckduckgo_links(query: str, max_results: int = 10, delay: float = 2.0) -> list[str]:
-    opts = Options()
-    opts.add_argument("--headless")
-    service = Service(edge_driver)
-    driver = webdriver.Edge(service=service, options=opts)
+def duckduckgo_links(query: str, max_results: int = 10, backends: list[str] | None = None,
+                     timeout: float = SOURCE_TIMEOUT) -> list[str]:
+    return search_backends.search(query, max_results, order=backends, timeout=timeout)
 
-    urls = []
-    try:
-        driver.get("https://html.duckduckgo.com/html/")
-        box = driver.find_element(By.NAME, "q")
-        box.send_keys(query)
-        box.submit()
-        time.sleep(delay)
-
-        results = driver.find_elements(By.CSS_SELECTOR, "div.result a.result__a")
-        for r in results[:max_results]:
-            h = r.get_attribute("href")
-            if h:
-                urls.append(h)
-    finally:
-        driver.quit()
-
-    return urls
-
-# save all links into a file
+# save all links into a file (canonical, no duplicates) and add them to the frontier
 def save_links(links: list[str]) -> Path:
+    links = frontier.add(links)
     f = crawl_folder / "link_list.txt"
     f.write_text("\n".join(links), encoding="utf-8")
     return f
 
-# main function
-def run(search_text: str) -> Path:
+# fetch one source and parse it
+def fetch_source(url: str, timeout: float) -> list[str]:
+    r = http_client.get(url, timeout=timeout, cache="search")
+    r.raise_for_status()
+    return extract_article_links(url, r.text)
+
+# fetch every source (and duckduckgo) at the same time
+def crawl(search_text: str, deadline: float = QUERY_DEADLINE, timeouts: dict | None = None) -> dict:
     pages = build_search_pages(search_text)
-    all_links = []
+    timeouts = {**SOURCE_TIMEOUTS, **(timeouts or {})}
+    names = list(pages) + ["duckduckgo"]
+
+    report = {name: {"status": "timeout", "links": 0, "seconds": None} for name in names}
+    found = {name: [] for name in names}
+    start = time.time()
+
+    pool = ThreadPoolExecutor(max_workers=len(names))
+    futures = {
+        pool.submit(fetch_source, url, timeouts.get(name, SOURCE_TIMEOUT)): name
+        for name, url in pages.items()
+    }
+    futures[pool.submit(duckduckgo_links, search_text, timeout=timeouts["duckduckgo"])] = "duckduckgo"
 
-    for name, url in pages.items():
-        try:
-            r = requests.get(url, timeout=15, headers={"User-Agent": "Mozilla/5.0"})
-            r.raise_for_status()
-            links = extract_article_links(url, r.text)
-            all_links.extend(links)
-        except Exception as e:
-            print("failed to fetch", url, e)
+    try:
+        # links are parsed inside each worker, so results are ready as they arrive
+        for fut in as_completed(futures, timeout=deadline):
+            name = futures[fut]
+            report[name]["seconds"] = round(time.time() - start, 2)
+            try:
+                found[name] = fut.result()
+                report[name]["status"] = "ok"
+                report[name]["links"] = len(found[name])
+            except Exception as e:
+                report[name]["status"] = "failed"
+                print("failed to fetch", pages.get(name, name), e)
+    except TimeoutError:
+        late = [n for n in names if report[n]["status"] == "timeout"]
+        print("deadline reached, still waiting on:", ", ".join(late))
+    finally:
+        # don't wait for slow sources past the deadline
+        pool.shutdown(wait=False, cancel_futures=True)
 
-    # add duckduckgo links too
-    all_links.extend(duckduckgo_links(search_text))
+    # keep source order so the link list is stable between runs
+    all_links = [h for name in names for h in found[name]]
+    return {"links": all_links, "report": report, "seconds": round(time.time() - start, 2)}
 
-    return save_links(all_links)
+# main function
+def run(search_text: str) -> Path:
+    res = crawl(search_text)
+    for name, info in res["report"].items():
+        print(f"{name:<12} {info['status']:<8} {info['links']:>3} links  {info['seconds']}s")
+    print("crawl done in", res["seconds"], "s")
+    return save_links(res["links"])
@@ -0,0 +1,165 @@
+# pipeline/dedupe.py
+"""
+near-duplicate article detection across news_feed, news_id and search
+1. simhash (64-bit) over word 3-grams of title + text
+2. lsh banding (4 x 16-bit bands) so lookups only touch likely matches
+3. each cluster gets a canonical doc id (first copy seen)
+4. saved in data/processed/dedupe.db
+run with: python -m pipeline.dedupe   (backfills every raw csv)
+"""
+from pathlib import Path
+import hashlib, re, sqlite3
+import pandas as pd
+
+from pipeline import frontier
+
+# folders
+data_folder = Path("data")
+proc_folder = data_folder / "processed"
+proc_folder.mkdir(parents=True, exist_ok=True)
+db_file = proc_folder / "dedupe.db"
+raw_folders = {
+    "news_feed": data_folder / "raw" / "news_feed",
+    "news_id": data_folder / "raw" / "news_id",
+    "search": data_folder / "raw" / "search"
+}
+
+# settings
+SHINGLE = 3         # words per shingle
+BANDS = 4           # 64 bits / 4 = 16-bit bands; any pair within 3 bits shares a band
+MAX_DISTANCE = 3    # hamming distance that still counts as the same story
+
+_word = re.compile(r"\w+", re.UNICODE)
+_mask = (1 << 64) - 1
+
+def _h64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+
+def simhash(text: str) -> int:
+    words = _word.findall((text or "").lower())
+    if not words:
+        return 0
+    grams = [" ".join(words[i:i + SHINGLE]) for i in range(max(1, len(words) - SHINGLE + 1))]
+    weights = [0] * 64
+    for g in grams:
+        h = _h64(g)
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & _mask).count("1")
+
+def bands(h: int) -> list[int]:
+    width = 64 // BANDS
+    return [(h >> (i * width)) & ((1 << width) - 1) for i in range(BANDS)]
+
+# sqlite wants signed 64-bit
+def _signed(h: int) -> int:
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+def _unsigned(h: int) -> int:
+    return h & _mask
+
+def _connect() -> sqlite3.Connection:
+    con = sqlite3.connect(db_file, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("CREATE TABLE IF NOT EXISTS docs (doc TEXT PRIMARY KEY, store TEXT, simhash INTEGER, cluster TEXT)")
+    con.execute("CREATE TABLE IF NOT EXISTS bands (band INTEGER, key INTEGER, doc TEXT)")
+    con.execute("CREATE INDEX IF NOT EXISTS bands_key ON bands (band, key)")
+    return con
+
+# doc id for a row: canonical url
+def doc_id(url) -> str:
+    if url is None or (isinstance(url, float) and pd.isna(url)):
+        return ""
+    return frontier.canonical_url(str(url))
+
+# add docs [(doc, text, store)] and return doc -> cluster id
+def assign(docs: list[tuple[str, str, str]]) -> dict[str, str]:
+    out = {}
+    with _connect() as con:
+        for doc, text, store in docs:
+            if not doc or doc in out:
+                continue
+            row = con.execute("SELECT cluster FROM docs WHERE doc = ?", (doc,)).fetchone()
+            if row:
+                out[doc] = row[0]
+                continue
+
+            h = simhash(text)
+            cluster = doc
+            if h:
+                seen = set()
+                for i, key in enumerate(bands(h)):
+                    for cand, ch, ccluster in con.execute(
+                        "SELECT d.doc, d.simhash, d.cluster FROM bands b JOIN docs d ON d.doc = b.doc "
+                        "WHERE b.band = ? AND b.key = ?", (i, key)
+                    ):
+                        if cand in seen:
+                            continue
+                        seen.add(cand)
+                        if hamming(h, _unsigned(ch)) <= MAX_DISTANCE:
+                            cluster = ccluster
+                            break
+                    if cluster != doc:
+                        break
+                con.executemany("INSERT INTO bands VALUES (?, ?, ?)", [(i, k, doc) for i, k in enumerate(bands(h))])
+
+            con.execute("INSERT INTO docs VALUES (?, ?, ?, ?)", (doc, store, _signed(h), cluster))
+            out[doc] = cluster
+    return out
+
+# index a scraped dataframe (Title + Content/Summary)
+def assign_frame(df: pd.DataFrame, store: str) -> dict[str, str]:
+    if df is None or df.empty or "Source_URL" not in df.columns:
+        return {}
+    text_col = "Content" if "Content" in df.columns else "Summary"
+    docs = []
+    for row in df.to_dict("records"):
+        text = f"{row.get('Title') or ''} {row.get(text_col) or ''}"
+        docs.append((doc_id(row.get("Source_URL")), text, store))
+    res = assign(docs)
+    merged = sum(1 for d, c in res.items() if d != c)
+    if merged:
+        print(f"{merged} of {len(res)} {store} articles are near-duplicates of earlier ones")
+    return res
+
+# doc -> cluster for known docs (unknown docs are their own cluster)
+def clusters(docs: list[str]) -> dict[str, str]:
+    docs = [d for d in dict.fromkeys(docs) if d]
+    out = {d: d for d in docs}
+    with _connect() as con:
+        for i in range(0, len(docs), 500):
+            part = docs[i:i + 500]
+            q = f"SELECT doc, cluster FROM docs WHERE doc IN ({','.join('?' * len(part))})"
+            out.update(dict(con.execute(q, part).fetchall()))
+    return out
+
+# add a __cluster__ column and keep one row per cluster (canonical copy first)
+def collapse(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty or "Source_URL" not in df.columns:
+        return df
+    ids = df["Source_URL"].map(doc_id)
+    cmap = clusters(ids.tolist())
+    df = df.assign(__cluster__=[cmap.get(d) or f"row{i}" for i, d in zip(df.index, ids)])
+    is_canon = ids == df["__cluster__"]
+    order = (~is_canon).astype(int)
+    keep = df.assign(__order__=order).sort_values("__order__", kind="stable") \
+             .drop_duplicates("__cluster__").index
+    return df.loc[df.index.isin(keep)]
+
+# index every csv already on disk
+def backfill() -> int:
+    total = 0
+    for store, folder in raw_folders.items():
+        for f in sorted(folder.glob("*.csv")):
+            try:
+                df = pd.read_csv(f)
+            except Exception:
+                continue
+            total += len(assign_frame(df, store))
+    return total
+
+if __name__ == "__main__":
+    print("indexed", backfill(), "articles")
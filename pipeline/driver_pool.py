@@ -0,0 +1,160 @@
+# pipeline/driver_pool.py
+"""
+shared pool of headless browsers for pages that need javascript
+1. start drivers lazily, up to a fixed size
+2. check out / check in (with a health check on checkout)
+3. recycle a driver after N pages or when it crashes
+4. close everything on exit
+"""
+from contextlib import contextmanager
+import atexit, os, queue, threading, time
+
+# path to edge driver
+edge_driver = os.environ.get("EDGE_DRIVER_PATH", r"C:\WebDrivers\msedgedriver.exe")
+
+# pool settings
+POOL_SIZE = 2           # max browsers alive at once
+MAX_PAGES = 50          # restart a browser after this many pages
+CHECKOUT_TIMEOUT = 60   # seconds to wait for a free browser
+
+# start a headless edge browser
+def new_edge_driver():
+    from selenium import webdriver
+    from selenium.webdriver.edge.service import Service
+    from selenium.webdriver.edge.options import Options
+
+    opts = Options()
+    opts.add_argument("--headless")
+    opts.add_argument("--disable-gpu")
+    return webdriver.Edge(service=Service(edge_driver), options=opts)
+
+class DriverPool:
+    def __init__(self, size: int = POOL_SIZE, max_pages: int = MAX_PAGES, factory=new_edge_driver):
+        self.size = size
+        self.max_pages = max_pages
+        self.factory = factory
+        self.idle = queue.LifoQueue()   # most recently used first, keeps caches warm
+        self.pages = {}                 # id(driver) -> pages served
+        self.lock = threading.Lock()
+        self.alive = 0
+        self.closed = False
+        self.stats = {"started": 0, "recycled": 0, "crashed": 0, "checkouts": 0}
+
+    # browser still answering?
+    def healthy(self, driver) -> bool:
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, driver):
+        with self.lock:
+            self.pages.pop(id(driver), None)
+            self.alive -= 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _start(self):
+        driver = self.factory()
+        with self.lock:
+            self.pages[id(driver)] = 0
+            self.stats["started"] += 1
+        return driver
+
+    # take a browser (reuse idle one, start a new one, or wait)
+    def checkout(self, timeout: float = CHECKOUT_TIMEOUT):
+        if self.closed:
+            raise RuntimeError("driver pool is closed")
+
+        deadline = time.time() + timeout
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                driver = None
+
+            if driver is None:
+                with self.lock:
+                    can_start = self.alive < self.size
+                    if can_start:
+                        self.alive += 1
+                if can_start:
+                    try:
+                        driver = self._start()
+                    except Exception:
+                        with self.lock:
+                            self.alive -= 1
+                        raise
+                else:
+                    # wait in short steps, a crashed browser frees a slot too
+                    if time.time() >= deadline:
+                        raise TimeoutError("no free browser in pool")
+                    try:
+                        driver = self.idle.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+
+            if self.healthy(driver):
+                with self.lock:
+                    self.stats["checkouts"] += 1
+                return driver
+
+            # dead browser, drop it and try again
+            self.stats["crashed"] += 1
+            self._quit(driver)
+
+    # give a browser back (broken ones are thrown away)
+    def checkin(self, driver, broken: bool = False):
+        with self.lock:
+            n = self.pages.get(id(driver), 0) + 1
+            self.pages[id(driver)] = n
+
+        if broken:
+            self.stats["crashed"] += 1
+            self._quit(driver)
+        elif self.closed:
+            self._quit(driver)
+        elif n >= self.max_pages:
+            self.stats["recycled"] += 1
+            self._quit(driver)
+        else:
+            self.idle.put(driver)
+
+    @contextmanager
+    def driver(self, timeout: float = CHECKOUT_TIMEOUT):
+        from selenium.common.exceptions import WebDriverException
+
+        d = self.checkout(timeout)
+        try:
+            yield d
+        except WebDriverException:
+            self.checkin(d, broken=not self.healthy(d))
+            raise
+        except Exception:
+            self.checkin(d)
+            raise
+        else:
+            self.checkin(d)
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self._quit(self.idle.get_nowait())
+            except queue.Empty:
+                break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# one pool per process, shared by the crawler and scrapers
+def get_pool() -> DriverPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = DriverPool()
+            atexit.register(_pool.close)
+    return _pool
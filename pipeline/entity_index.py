@@ -0,0 +1,154 @@
+# pipeline/entity_index.py
+"""
+entity inverted index in data/processed/entities.db
+1. entity (text, label) -> docs that mention it, with mention counts, per prediction set
+2. updated by predict.run_csv for the docs it predicts (no full rewrite)
+3. a set is rebuilt from pred_store only when its version there differs from the one indexed
+4. panel queries: docs matching a text, top entities of a label in those docs
+"""
+from pathlib import Path
+from collections import Counter
+import sqlite3, threading
+
+from pipeline import pred_store
+
+# index location
+proc_folder = Path("data/processed")
+proc_folder.mkdir(parents=True, exist_ok=True)
+db_file = proc_folder / "entities.db"
+
+_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    con = sqlite3.connect(db_file, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS entities ("
+        " id INTEGER PRIMARY KEY,"
+        " text TEXT,"
+        " label TEXT,"
+        " lower TEXT,"           # for case-insensitive text search
+        " UNIQUE (text, label))"
+    )
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS postings ("
+        " entity INTEGER,"
+        " source TEXT,"          # prediction set, e.g. newsfeed, fullnews, search_<query>
+        " doc TEXT,"
+        " count INTEGER,"        # mentions in the doc
+        " PRIMARY KEY (entity, source, doc))"
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS postings_doc ON postings (source, doc)")
+    # every predicted doc, with or without entities (a later set's empty doc still replaces an earlier one)
+    con.execute("CREATE TABLE IF NOT EXISTS docs (source TEXT, doc TEXT, PRIMARY KEY (source, doc))")
+    con.execute("CREATE TABLE IF NOT EXISTS versions (source TEXT PRIMARY KEY, version INTEGER)")
+    return con
+
+# (text, label) -> id, creating missing ones
+def _entity_ids(con: sqlite3.Connection, keys: set[tuple[str, str]]) -> dict[tuple[str, str], int]:
+    con.executemany(
+        "INSERT OR IGNORE INTO entities (text, label, lower) VALUES (?, ?, ?)",
+        [(t, l, t.lower()) for t, l in keys]
+    )
+    ids = {}
+    for t, l in keys:
+        (ids[(t, l)],) = con.execute("SELECT id FROM entities WHERE text = ? AND label = ?", (t, l)).fetchone()
+    return ids
+
+# replace the postings of these docs (doc -> entity list as saved in the prediction json)
+def update(source: str, docs: dict[str, list[dict]]):
+    counts = {}
+    for doc, ents in docs.items():
+        c = Counter()
+        for e in ents if isinstance(ents, list) else []:
+            if not isinstance(e, dict):
+                continue
+            txt, label = str(e.get("text") or "").strip(), e.get("label")
+            if txt and label:
+                c[(txt, label)] += 1
+        counts[doc] = c
+    with _lock:
+        con = _connect()
+        try:
+            with con:
+                ids = _entity_ids(con, {k for c in counts.values() for k in c})
+                con.executemany("DELETE FROM postings WHERE source = ? AND doc = ?",
+                                [(source, doc) for doc in counts])
+                con.executemany("INSERT OR IGNORE INTO docs VALUES (?, ?)", [(source, doc) for doc in counts])
+                con.executemany(
+                    "INSERT INTO postings VALUES (?, ?, ?, ?)",
+                    [(ids[k], source, doc, n) for doc, c in counts.items() for k, n in c.items()]
+                )
+        finally:
+            con.close()
+
+# remember which version of a prediction set the index holds
+def mark_loaded(source: str, version: int | None = None):
+    version = pred_store.version(source) if version is None else version
+    with _connect() as con:
+        con.execute("INSERT OR REPLACE INTO versions VALUES (?, ?)", (source, version))
+
+# forget a prediction set
+def drop(source: str):
+    with _lock:
+        con = _connect()
+        try:
+            with con:
+                con.execute("DELETE FROM postings WHERE source = ?", (source,))
+                con.execute("DELETE FROM docs WHERE source = ?", (source,))
+                con.execute("DELETE FROM versions WHERE source = ?", (source,))
+        finally:
+            con.close()
+
+# (re)build a set from pred_store if the index doesn't hold its current version
+def ensure(source: str) -> bool:
+    version = pred_store.version(source)
+    with _connect() as con:
+        row = con.execute("SELECT version FROM versions WHERE source = ?", (source,)).fetchone()
+    if not version:
+        if row:
+            drop(source)
+        return False
+    if row and row[0] == version:
+        return True
+    drop(source)
+    update(source, pred_store.load(source))
+    mark_loaded(source, version)
+    print("indexed entities of", source)
+    return True
+
+# docs (source, doc) whose id or any entity text contains the query; later sources win on the same doc id
+def matching_docs(sources: list[str], query: str) -> list[tuple[str, str]]:
+    q = query.strip().lower()
+    marks = ",".join("?" * len(sources))
+    with _connect() as con:
+        rows = con.execute(
+            f"SELECT p.source, p.doc FROM postings p JOIN entities e ON e.id = p.entity "
+            f"WHERE p.source IN ({marks}) AND instr(e.lower, ?) > 0 "
+            f"UNION SELECT source, doc FROM docs WHERE source IN ({marks}) AND instr(lower(doc), ?) > 0",
+            sources + [q] + sources + [q]
+        ).fetchall()
+    order = {s: i for i, s in enumerate(sources)}
+    best = {}
+    for source, doc in rows:
+        if doc not in best or order[source] > order[best[doc]]:
+            best[doc] = source
+    return [(s, d) for d, s in best.items()]
+
+# mention counts per entity text for one label, over the given docs
+def label_counts(docs: list[tuple[str, str]], label: str) -> Counter:
+    counts = Counter()
+    if not docs:
+        return counts
+    with _connect() as con:
+        con.execute("CREATE TEMP TABLE IF NOT EXISTS picked (source TEXT, doc TEXT)")
+        con.execute("DELETE FROM picked")
+        con.executemany("INSERT INTO picked VALUES (?, ?)", docs)
+        for txt, n in con.execute(
+            "SELECT e.text, SUM(p.count) FROM picked k "
+            "JOIN postings p ON p.source = k.source AND p.doc = k.doc "
+            "JOIN entities e ON e.id = p.entity AND e.label = ? GROUP BY e.text",
+            (label,)
+        ):
+            counts[txt] = n
+    return counts
@@ -0,0 +1,119 @@
+# pipeline/extract.py
+"""
+single-parse extraction engine
+1. parse each page once with lxml
+2. compile css selector cascades to xpath ahead of time
+3. evaluate a whole cascade in one pass (one union query, then rank by selector order)
+4. value helpers that match the old beautifulsoup output
+"""
+from functools import lru_cache
+from cssselect import HTMLTranslator, parse as parse_css
+from cssselect.parser import CombinedSelector
+from lxml import etree, html
+
+_tr = HTMLTranslator()
+
+# parse a page (bytes keep the page's own charset)
+def parse(page: str | bytes) -> html.HtmlElement | None:
+    if not page:
+        return None
+    try:
+        return html.fromstring(page)
+    except (etree.ParserError, ValueError):
+        return None
+
+# xpath test: does the current node match this (parsed) selector?
+def _node_test(parsed, axis: str = "self::") -> str:
+    if isinstance(parsed, CombinedSelector):
+        if parsed.combinator not in (" ", ">"):
+            raise ValueError(f"combinator {parsed.combinator!r} not supported")
+        right = _tr.xpath(parsed.subselector)
+        left = _node_test(parsed.selector, "ancestor::" if parsed.combinator == " " else "parent::")
+        cond = f"[{right.condition}]" if right.condition else ""
+        return f"{axis}{right.element}{cond}[{left}]"
+    x = _tr.xpath(parsed)
+    return f"{axis}{x.element}" + (f"[{x.condition}]" if x.condition else "")
+
+class Cascade:
+    """selectors tried in order; first selector with a usable value wins"""
+
+    def __init__(self, selectors: list[str]):
+        self.selectors = list(selectors)
+        paths = [_tr.css_to_xpath(sel) for sel in self.selectors]
+        self.union = etree.XPath(" | ".join(paths))
+        self.each = [etree.XPath(p) for p in paths]
+        try:
+            self.tests = [
+                etree.XPath(f"boolean({_node_test(parse_css(sel)[0].parsed_tree)})")
+                for sel in self.selectors
+            ]
+        except ValueError:
+            self.tests = None   # fall back to one query per selector
+
+    # (selector index, first matching element), best selector first
+    def matches(self, tree) -> list[tuple[int, html.HtmlElement]]:
+        if tree is None:
+            return []
+        if self.tests is None:
+            out = []
+            for i, xp in enumerate(self.each):
+                found = xp(tree)
+                if found:
+                    out.append((i, found[0]))
+            return out
+
+        # one query for the whole cascade, results come in document order
+        first = {}
+        for node in self.union(tree):
+            for i, test in enumerate(self.tests):
+                if i not in first and test(node):
+                    first[i] = node
+            if len(first) == len(self.tests):
+                break
+        return sorted(first.items())
+
+    # first non-empty value from getter, with the selector index that gave it
+    def value(self, tree, getter) -> tuple[str, int | None]:
+        for i, el in self.matches(tree):
+            try:
+                val = getter(el)
+            except Exception:
+                continue
+            if val:
+                return val, i
+        return "", None
+
+    # first element from one selector only (for a known-good selector)
+    def first_of(self, tree, i: int):
+        found = self.each[i](tree) if tree is not None else []
+        return found[0] if found else None
+
+# compiled once per selector list
+@lru_cache(maxsize=128)
+def cascade(selectors: tuple[str, ...]) -> Cascade:
+    return Cascade(list(selectors))
+
+# text helpers (same output as beautifulsoup get_text variants)
+def text_strip(el) -> str:
+    # get_text(strip=True)
+    return "".join(t.strip() for t in el.xpath(".//text()"))
+
+def text_joined(el, sep: str = " ") -> str:
+    # get_text(sep, strip=True)
+    return sep.join(t.strip() for t in el.xpath(".//text()") if t.strip())
+
+def text_raw(el) -> str:
+    # get_text().strip()
+    return "".join(el.xpath(".//text()")).strip()
+
+# meta content attribute if there is one, else text
+def content_or_text(el, text=text_strip) -> str:
+    if el.get("content") is not None:
+        return el.get("content", "").strip()
+    return text(el)
+
+# paragraphs inside a block
+_paragraphs = etree.XPath(".//p")
+
+def paragraphs(el) -> list[str]:
+    return [text_strip(p) for p in _paragraphs(el)]
@@ -0,0 +1,166 @@
+# pipeline/frontier.py
+"""
+url frontier shared by every scraper
+1. canonicalise urls (unwrap redirects, drop tracking params, normalise host/scheme)
+2. keep a compact seen-set (64-bit url hash -> row) in data/crawl/frontier.db
+3. keep fetch state per url and which stores (news_feed, news_id, search) hold it
+"""
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from pathlib import Path
+import hashlib, sqlite3, time
+
+# frontier db location
+crawl_folder = Path("data/crawl")
+crawl_folder.mkdir(parents=True, exist_ok=True)
+db_file = crawl_folder / "frontier.db"
+
+# one bit per raw store
+stores = {"news_feed": 1, "news_id": 2, "search": 4}
+
+# fetch states
+NEW, DONE, FAILED = "new", "done", "failed"
+
+# query params that only track clicks
+tracking_params = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "yclid", "ref_src", "rut"
+}
+
+# redirect wrappers: host suffix -> (path prefix, param holding the real url)
+redirects = {
+    "duckduckgo.com": ("/l/", "uddg"),
+    "google.com": ("/url", "q"),
+    "facebook.com": ("/l.php", "u")
+}
+
+# unwrap redirects, drop tracking params, tidy scheme and host
+def canonical_url(url: str) -> str:
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if url.startswith("//"):
+        url = "https:" + url
+
+    for _ in range(3):  # wrappers can be nested
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        unwrapped = None
+        for suffix, (path, param) in redirects.items():
+            if (host == suffix or host.endswith("." + suffix)) and parts.path.startswith(path):
+                unwrapped = dict(parse_qsl(parts.query)).get(param)
+                break
+        if not unwrapped:
+            break
+        url = unwrapped if not unwrapped.startswith("//") else "https:" + unwrapped
+
+    parts = urlsplit(url)
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower().rstrip(".")
+    if not host:
+        return url
+    port = parts.port
+    netloc = host if port is None or (scheme, port) in {("http", 80), ("https", 443)} else f"{host}:{port}"
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in tracking_params
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(query), ""))
+
+# key used for the seen-set (scheme and www. don't make a new article)
+def url_key(url: str) -> str:
+    parts = urlsplit(canonical_url(url))
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    path = parts.path.rstrip("/") or "/"
+    return host + path + ("?" + parts.query if parts.query else "")
+
+# 64-bit hash that fits an sqlite integer key
+def url_hash(url: str) -> int:
+    digest = hashlib.blake2b(url_key(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+def _connect() -> sqlite3.Connection:
+    con = sqlite3.connect(db_file, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS urls ("
+        " h INTEGER PRIMARY KEY,"     # url_hash
+        " url TEXT NOT NULL,"         # canonical url
+        " stores INTEGER DEFAULT 0,"  # bit flags from `stores`
+        " state TEXT DEFAULT 'new',"
+        " tries INTEGER DEFAULT 0,"
+        " updated REAL)"
+    )
+    return con
+
+# canonicalise + drop duplicates, keeping order
+def dedupe(urls: list[str]) -> list[str]:
+    out, seen = [], set()
+    for u in urls:
+        c = canonical_url(u)
+        if not c:
+            continue
+        k = url_key(c)
+        if k not in seen:
+            seen.add(k)
+            out.append(c)
+    return out
+
+# add urls to the frontier (existing ones are left alone)
+def add(urls: list[str]) -> list[str]:
+    clean = dedupe(urls)
+    with _connect() as con:
+        con.executemany(
+            "INSERT OR IGNORE INTO urls (h, url, updated) VALUES (?, ?, ?)",
+            [(url_hash(u), u, time.time()) for u in clean]
+        )
+    return clean
+
+# set fetch state (and store) for urls
+def mark(urls: list[str] | str, state: str, store: str | None = None):
+    if isinstance(urls, str):
+        urls = [urls]
+    bit = stores.get(store, 0)
+    now = time.time()
+    rows = [(url_hash(u), canonical_url(u), bit, state, int(state == FAILED), now) for u in urls if u]
+    with _connect() as con:
+        con.executemany(
+            "INSERT INTO urls (h, url, stores, state, tries, updated) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(h) DO UPDATE SET stores = stores | excluded.stores, state = excluded.state, "
+            "tries = tries + excluded.tries, updated = excluded.updated",
+            rows
+        )
+
+# url -> {"state", "stores", "tries"} for the urls we know about
+def lookup(urls: list[str]) -> dict[str, dict]:
+    by_hash = {url_hash(u): u for u in urls if u}
+    out = {}
+    if not by_hash:
+        return out
+    hashes = list(by_hash)
+    with _connect() as con:
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            q = f"SELECT h, state, stores, tries FROM urls WHERE h IN ({','.join('?' * len(part))})"
+            for h, state, bits, tries in con.execute(q, part):
+                out[by_hash[h]] = {
+                    "state": state,
+                    "stores": [name for name, b in stores.items() if bits & b],
+                    "tries": tries
+                }
+    return out
+
+# urls already fetched into any of the given stores
+def fetched(urls: list[str], in_stores: list[str] | None = None) -> set[str]:
+    want = in_stores or list(stores)
+    return {
+        u for u, info in lookup(urls).items()
+        if info["state"] == DONE and any(s in want for s in info["stores"])
+    }
+
+# counts by state
+def summary() -> dict[str, int]:
+    with _connect() as con:
+        return dict(con.execute("SELECT state, COUNT(*) FROM urls GROUP BY state").fetchall())
@@ -0,0 +1,142 @@
+# pipeline/fts.py
+"""
+full-text index over all articles (sqlite fts5) in data/processed/fts.db
+1. one row per article: title + summary/content indexed, display fields stored alongside
+2. refreshed at ingest from the parquet store (only csvs that changed are re-indexed)
+3. query = exact phrase, ranked by bm25 (title weighs more than body)
+4. one row per near-duplicate cluster (canonical copy first), paged in sql
+"""
+from pathlib import Path
+import json, sqlite3, threading
+
+import pandas as pd
+from pipeline import dedupe, store
+
+# index location
+proc_folder = Path("data/processed")
+proc_folder.mkdir(parents=True, exist_ok=True)
+db_file = proc_folder / "fts.db"
+
+# bm25 column weights (title, body)
+TITLE_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+PAGE_SIZE = 30
+
+# columns returned by search, named like the csv columns
+result_columns = ["Title", "Body", "Source_URL", "News_Source", "Publish_Date", "Category",
+                  "__srcfile__", "__row__", "__cluster__", "score"]
+
+_lock = threading.Lock()
+
+def _connect() -> sqlite3.Connection:
+    con = sqlite3.connect(db_file, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS articles USING fts5("
+        " title, body,"
+        " store UNINDEXED, srcfile UNINDEXED, row UNINDEXED, url UNINDEXED, source UNINDEXED,"
+        " published UNINDEXED, category UNINDEXED, cluster UNINDEXED, canonical UNINDEXED,"
+        " tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    con.execute("CREATE TABLE IF NOT EXISTS files (store TEXT, srcfile TEXT, sig TEXT, PRIMARY KEY (store, srcfile))")
+    con.execute("CREATE TABLE IF NOT EXISTS totals (store TEXT PRIMARY KEY, clusters INTEGER)")
+    return con
+
+def _text(x) -> str:
+    return x if isinstance(x, str) else ""
+
+# rows for one csv (read back from the parquet store)
+def _rows(name: str, srcfile: str) -> list[tuple]:
+    stem = Path(srcfile).stem
+    df = store.read(name, file_filter=lambda s: s == stem)
+    if df.empty:
+        return []
+    body_col = "Content" if "Content" in df.columns else "Summary"
+    ids = [dedupe.doc_id(u) for u in df["Source_URL"]]
+    cmap = dedupe.clusters([d for d in ids if d])
+    rows = []
+    for rec, doc in zip(df.to_dict("records"), ids):
+        key = doc or f"{srcfile}:{rec['__row__']}"
+        cluster = cmap.get(doc) or key
+        rows.append((
+            _text(rec.get("Title")), _text(rec.get(body_col)), name, srcfile, int(rec["__row__"]),
+            _text(rec.get("Source_URL")), _text(rec.get("News_Source")), _text(rec.get("Publish_Date")),
+            _text(rec.get("Category")), cluster, int(cluster == doc)
+        ))
+    return rows
+
+# sync the store, then re-index csvs whose size/mtime changed
+def refresh(name: str) -> dict[str, int]:
+    store.sync(name)
+    current = {f"{stem}.csv": json.dumps(sig) for stem, sig in store.signatures(name).items()}
+    with _lock:
+        con = _connect()
+        try:
+            indexed = dict(con.execute("SELECT srcfile, sig FROM files WHERE store = ?", (name,)).fetchall())
+            changed = [f for f, sig in current.items() if indexed.get(f) != sig]
+            gone = [f for f in indexed if f not in current]
+            with con:
+                for f in changed + gone:
+                    con.execute("DELETE FROM articles WHERE store = ? AND srcfile = ?", (name, f))
+                    con.execute("DELETE FROM files WHERE store = ? AND srcfile = ?", (name, f))
+                for f in changed:
+                    con.executemany("INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", _rows(name, f))
+                    con.execute("INSERT INTO files VALUES (?, ?, ?)", (name, f, current[f]))
+                if changed or gone:
+                    (n,) = con.execute(
+                        "SELECT COUNT(DISTINCT cluster) FROM articles WHERE store = ?", (name,)
+                    ).fetchone()
+                    con.execute("INSERT OR REPLACE INTO totals VALUES (?, ?)", (name, n))
+        finally:
+            con.close()
+    return {"indexed": len(changed), "removed": len(gone)}
+
+# user text -> fts5 phrase query (exact phrase, punctuation ignored)
+def phrase(text: str) -> str:
+    return '"' + text.strip().replace('"', '""') + '"'
+
+# articles in one store matching the query, best first, one per cluster
+#   exclude_store: leave out clusters that also match in this store
+# -> (page dataframe, number of matching clusters)
+def search(query: str, name: str, page: int = 1, page_size: int = PAGE_SIZE,
+           exclude_store: str | None = None) -> tuple[pd.DataFrame, int]:
+    if not query.strip():
+        return pd.DataFrame(columns=result_columns), 0
+    q = phrase(query)
+    exclude = ""
+    args = [q, name]
+    if exclude_store:
+        exclude = "AND cluster NOT IN (SELECT cluster FROM articles WHERE articles MATCH ? AND store = ?)"
+        args += [q, exclude_store]
+    hits = (
+        "SELECT title, body, url, source, published, category, srcfile, row, cluster, score FROM ("
+        " SELECT *, rank AS score, ROW_NUMBER() OVER (PARTITION BY cluster ORDER BY canonical DESC, rank) AS rn"
+        "  FROM articles WHERE articles MATCH ? AND store = ?"
+        f"  AND rank MATCH 'bm25({TITLE_WEIGHT}, {BODY_WEIGHT})'"
+        f") WHERE rn = 1 {exclude}"
+    )
+    con = _connect()
+    try:
+        (total,) = con.execute(f"SELECT COUNT(*) FROM ({hits})", args).fetchone()
+        rows = con.execute(f"{hits} ORDER BY score LIMIT ? OFFSET ?",
+                           args + [page_size, max(0, page - 1) * page_size]).fetchall()
+    except sqlite3.OperationalError as e:
+        print("fts query failed:", e)
+        return pd.DataFrame(columns=result_columns), 0
+    finally:
+        con.close()
+    return pd.DataFrame(rows, columns=result_columns), total
+
+# near-duplicate clusters in a store (for "x of y" captions)
+def total(name: str) -> int:
+    con = _connect()
+    try:
+        row = con.execute("SELECT clusters FROM totals WHERE store = ?", (name,)).fetchone()
+    finally:
+        con.close()
+    return row[0] if row else 0
+
+if __name__ == "__main__":
+    # build / refresh the index for every store
+    for name in store.raw_folders:
+        print(name, refresh(name))
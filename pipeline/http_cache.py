@@ -0,0 +1,159 @@
+# pipeline/http_cache.py
+"""
+on-disk http cache in data/.cache/http
+1. bodies stored by content hash (same page twice = one file)
+2. index of url -> body, validators (etag / last-modified), timestamps
+3. ttl per source class (rss short, article long)
+4. size cap with lru eviction
+"""
+from pathlib import Path
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+import hashlib, sqlite3, time, requests
+
+from utils import cache_folder
+
+# cache location
+http_folder = cache_folder / "http"
+body_folder = http_folder / "bodies"
+body_folder.mkdir(parents=True, exist_ok=True)
+db_file = http_folder / "index.db"
+
+# seconds a cached page is served without asking the server
+ttls = {
+    "rss": 10 * 60,
+    "poll": 0,              # always revalidate (feed poller), 304s stay cheap
+    "search": 30 * 60,
+    "article": 7 * 24 * 3600,
+    "default": 60 * 60
+}
+
+# size cap for stored bodies
+MAX_BYTES = 300 * 1024 * 1024
+
+def _connect() -> sqlite3.Connection:
+    con = sqlite3.connect(db_file, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS entries ("
+        " url TEXT PRIMARY KEY,"
+        " final_url TEXT,"
+        " body TEXT,"            # sha256 of the body
+        " size INTEGER,"
+        " content_type TEXT,"
+        " etag TEXT,"
+        " last_modified TEXT,"
+        " kind TEXT,"            # ttl class
+        " stored REAL,"          # last time the server confirmed it
+        " accessed REAL)"
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+    return con
+
+def _body_path(digest: str) -> Path:
+    return body_folder / digest[:2] / digest
+
+# cache entry for a url (None if missing or body gone)
+def lookup(url: str) -> dict | None:
+    with _connect() as con:
+        con.row_factory = sqlite3.Row
+        row = con.execute("SELECT * FROM entries WHERE url = ?", (url,)).fetchone()
+    if row is None or not _body_path(row["body"]).exists():
+        return None
+    return dict(row)
+
+def is_fresh(entry: dict, kind: str | None = None) -> bool:
+    ttl = ttls.get(kind or entry.get("kind") or "default", ttls["default"])
+    return time.time() - (entry.get("stored") or 0) < ttl
+
+# headers for a conditional get
+def validators(entry: dict) -> dict:
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+# rebuild a response from the cache
+def response(entry: dict) -> requests.Response:
+    body = _body_path(entry["body"]).read_bytes()
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.reason = "OK"
+    resp._content = body
+    resp.url = entry.get("final_url") or entry["url"]
+    resp.headers = CaseInsensitiveDict({"Content-Type": entry.get("content_type") or ""})
+    if entry.get("etag"):
+        resp.headers["ETag"] = entry["etag"]
+    if entry.get("last_modified"):
+        resp.headers["Last-Modified"] = entry["last_modified"]
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp.from_cache = True
+    with _connect() as con:
+        con.execute("UPDATE entries SET accessed = ? WHERE url = ?", (time.time(), entry["url"]))
+    return resp
+
+# server said 304: reset the ttl
+def refresh(entry: dict):
+    now = time.time()
+    with _connect() as con:
+        con.execute("UPDATE entries SET stored = ?, accessed = ? WHERE url = ?", (now, now, entry["url"]))
+
+# save a 200 response
+def store(url: str, r: requests.Response, kind: str = "default"):
+    body = r.content or b""
+    digest = hashlib.sha256(body).hexdigest()
+    path = _body_path(digest)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(body)
+        tmp.replace(path)
+
+    now = time.time()
+    with _connect() as con:
+        old = con.execute("SELECT body FROM entries WHERE url = ?", (url,)).fetchone()
+        con.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, r.url, digest, len(body), r.headers.get("Content-Type", ""),
+             r.headers.get("ETag"), r.headers.get("Last-Modified"), kind, now, now)
+        )
+        if old and old[0] != digest:
+            _drop_body(con, old[0])
+    evict()
+
+# delete a body file once no url points at it
+def _drop_body(con: sqlite3.Connection, digest: str):
+    left = con.execute("SELECT 1 FROM entries WHERE body = ? LIMIT 1", (digest,)).fetchone()
+    if not left:
+        _body_path(digest).unlink(missing_ok=True)
+
+# drop least recently used entries until under the cap
+def evict(max_bytes: int = MAX_BYTES) -> int:
+    removed = 0
+    with _connect() as con:
+        # each body counted once even if several urls share it
+        total = con.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT body, MAX(size) AS size FROM entries GROUP BY body)"
+        ).fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        for url, digest, size in con.execute(
+            "SELECT url, body, size FROM entries ORDER BY accessed"
+        ).fetchall():
+            con.execute("DELETE FROM entries WHERE url = ?", (url,))
+            left = con.execute("SELECT 1 FROM entries WHERE body = ? LIMIT 1", (digest,)).fetchone()
+            if not left:
+                _body_path(digest).unlink(missing_ok=True)
+                total -= size or 0
+            removed += 1
+            if total <= max_bytes:
+                break
+    return removed
+
+# entries, bytes and counts per ttl class
+def summary() -> dict:
+    with _connect() as con:
+        rows = con.execute("SELECT kind, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY kind").fetchall()
+    return {kind: {"entries": n, "bytes": size} for kind, n, size in rows}
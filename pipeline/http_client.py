@@ -0,0 +1,326 @@
+# pipeline/http_client.py
+"""
+shared http client for every fetcher
+1. one session, keep-alive connection pool per host
+2. gzip/brotli accept-encoding, optional http/2 (httpx)
+3. dns cache (ttl, bounded, only for connections made by the shared session)
+4. retry with jittered exponential backoff
+5. byte/latency counters per host
+6. optional on-disk cache with conditional get (http_cache.py)
+7. raw copy of every fetched article (archive.py)
+"""
+from urllib.parse import urlsplit
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+import os, random, socket, threading, time, requests
+from pipeline import http_cache, archive
+
+# settings
+POOL_HOSTS = 32         # hosts kept in the pool
+POOL_PER_HOST = 8       # open connections per host
+RETRIES = 2             # extra attempts after the first one
+BACKOFF = 0.5           # seconds, doubles each retry (plus jitter)
+MAX_BACKOFF = 10.0
+DNS_TTL = 300           # seconds to keep a resolved address
+DNS_MAX = 512           # hosts kept in the dns cache
+MAX_BODY = 2 * 1024 * 1024  # default cap for get_capped
+HTTP2 = os.environ.get("INFOCRAWL_HTTP2", "") == "1"
+ARCHIVE = os.environ.get("INFOCRAWL_ARCHIVE", "1") != "0"
+ARCHIVE_KINDS = {"article"}     # cache classes worth a raw copy (not robots, feeds, search pages)
+
+# statuses worth another try
+retry_statuses = {429, 500, 502, 503, 504}
+
+# brotli only if urllib3 can decode it
+try:
+    import brotli  # noqa: F401
+    _encodings = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        _encodings = "gzip, deflate, br"
+    except ImportError:
+        _encodings = "gzip, deflate"
+
+default_headers = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept-Encoding": _encodings,
+    "Accept-Language": "ms-MY,ms;q=0.9,en;q=0.8",
+    "Connection": "keep-alive"
+}
+
+# dns cache: (host, port) -> (expires, addresses), least recently used dropped past DNS_MAX
+_dns = OrderedDict()
+_dns_lock = threading.Lock()
+
+# addresses for a host, [] if it doesn't resolve (the connection then reports the error)
+def resolve(host: str, port: int) -> list[str]:
+    key = (host, port)
+    now = time.monotonic()
+    with _dns_lock:
+        hit = _dns.get(key)
+        if hit and hit[0] > now:
+            _dns.move_to_end(key)
+            return hit[1]
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        return []
+    addrs = list(dict.fromkeys(info[4][0] for info in infos))
+    with _dns_lock:
+        _dns[key] = (now + DNS_TTL, addrs)
+        _dns.move_to_end(key)
+        while len(_dns) > DNS_MAX:
+            _dns.popitem(last=False)
+    return addrs
+
+def clear_dns_cache():
+    with _dns_lock:
+        _dns.clear()
+
+# connects to cached addresses in turn; tls still checks the real host name
+class _CachedDNS:
+    def _new_conn(self):
+        host = self._dns_host
+        addrs = resolve(host, self.port)
+        if not addrs:
+            return super()._new_conn()
+        err = None
+        try:
+            for addr in addrs:
+                self._dns_host = addr
+                try:
+                    return super()._new_conn()
+                except (ConnectTimeoutError, NewConnectionError) as e:
+                    err = e
+        finally:
+            self._dns_host = host
+        raise err
+
+class _HTTPConnection(_CachedDNS, HTTPConnection):
+    pass
+
+class _HTTPSConnection(_CachedDNS, HTTPSConnection):
+    pass
+
+class _HTTPPool(HTTPConnectionPool):
+    ConnectionCls = _HTTPConnection
+
+class _HTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _HTTPSConnection
+
+# session adapter using the dns cache (nothing else in the process is affected)
+class CachedDNSAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _HTTPPool, "https": _HTTPSPool}
+
+# per-host counters
+_stats = {}
+_stats_lock = threading.Lock()
+
+def _new_stats() -> dict:
+    return {"requests": 0, "errors": 0, "retries": 0, "bytes": 0, "seconds": 0.0,
+            "cache_hits": 0, "not_modified": 0}
+
+def _count(host: str, nbytes: int = 0, seconds: float = 0.0, error: bool = False, retry: bool = False):
+    with _stats_lock:
+        st = _stats.setdefault(host, _new_stats())
+        st["requests"] += 0 if retry else 1
+        st["retries"] += int(retry)
+        st["errors"] += int(error)
+        st["bytes"] += nbytes
+        st["seconds"] += seconds
+
+def _count_cache(host: str, field: str):
+    with _stats_lock:
+        _stats.setdefault(host, _new_stats())[field] += 1
+
+# copy of counters, with average latency
+def stats() -> dict[str, dict]:
+    with _stats_lock:
+        out = {h: dict(st) for h, st in _stats.items()}
+    for st in out.values():
+        n = st["requests"] + st["retries"]
+        st["avg_ms"] = round(st["seconds"] / n * 1000, 1) if n else 0.0
+        st["seconds"] = round(st["seconds"], 3)
+    return out
+
+# one line per host
+def print_stats():
+    for host, st in sorted(stats().items()):
+        print(f"{host:<30} {st['requests']:>4} req  {st['retries']:>3} retry  {st['errors']:>3} err  "
+              f"{st['bytes'] / 1024:>8.1f} KB  {st['avg_ms']:>7.1f} ms avg  "
+              f"{st['cache_hits']:>3} cached  {st['not_modified']:>3} not modified")
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+_session = None
+_h2 = None
+_client_lock = threading.Lock()
+
+# one shared session
+def session() -> requests.Session:
+    global _session
+    with _client_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = CachedDNSAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_PER_HOST, max_retries=0)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers.update(default_headers)
+            _session = s
+    return _session
+
+# http/2 client (None if httpx/h2 not installed; resolves through the system, no dns cache)
+def _h2_client():
+    global _h2
+    with _client_lock:
+        if _h2 is None:
+            try:
+                import httpx
+                _h2 = httpx.Client(
+                    http2=True,
+                    headers=default_headers,
+                    limits=httpx.Limits(max_connections=POOL_HOSTS * POOL_PER_HOST,
+                                        max_keepalive_connections=POOL_HOSTS)
+                )
+            except Exception as e:
+                print("http/2 not available, using http/1.1:", e)
+                _h2 = False
+    return _h2 or None
+
+# httpx response -> requests response, so callers see one type
+def _as_requests(r) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = r.status_code
+    resp.headers = CaseInsensitiveDict(r.headers)
+    resp._content = r.content
+    resp.url = str(r.url)
+    resp.reason = r.reason_phrase
+    resp.encoding = r.encoding
+    resp.elapsed = r.elapsed
+    return resp
+
+def _send(method: str, url: str, **kwargs) -> requests.Response:
+    client = _h2_client() if HTTP2 and not kwargs.get("stream") else None
+    if client is None:
+        return session().request(method, url, **kwargs)
+    kwargs.setdefault("timeout", 20)
+    follow = kwargs.pop("allow_redirects", True)
+    r = client.request(method, url, follow_redirects=follow, **kwargs)
+    return _as_requests(r)
+
+# seconds to wait before retry number `attempt` (1-based)
+def backoff_delay(attempt: int, retry_after: str | None = None) -> float:
+    if retry_after and retry_after.strip().isdigit():
+        return min(MAX_BACKOFF, float(retry_after))
+    base = min(MAX_BACKOFF, BACKOFF * 2 ** (attempt - 1))
+    return random.uniform(base / 2, base)   # jitter
+
+# request with retries; raise_for_status is left to the caller
+def request(method: str, url: str, retries: int = RETRIES, **kwargs) -> requests.Response:
+    host = (urlsplit(url).hostname or "").lower()
+    for attempt in range(retries + 1):
+        t0 = time.perf_counter()
+        try:
+            r = _send(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            _count(host, seconds=time.perf_counter() - t0, error=True, retry=attempt > 0)
+            if attempt >= retries:
+                raise
+            time.sleep(backoff_delay(attempt + 1))
+            continue
+        except Exception as e:
+            _count(host, seconds=time.perf_counter() - t0, error=True, retry=attempt > 0)
+            if attempt >= retries or not _h2_error(e):
+                raise
+            time.sleep(backoff_delay(attempt + 1))
+            continue
+
+        nbytes = 0 if kwargs.get("stream") else wire_bytes(r)
+        _count(host, nbytes, time.perf_counter() - t0, error=r.status_code >= 400, retry=attempt > 0)
+        if r.status_code in retry_statuses and attempt < retries:
+            time.sleep(backoff_delay(attempt + 1, r.headers.get("Retry-After")))
+            continue
+        return r
+
+# bytes over the wire (compressed), falls back to body size
+def wire_bytes(r: requests.Response) -> int:
+    try:
+        return int(r.raw.tell()) or len(r.content)
+    except Exception:
+        return len(r.content or b"")
+
+# network errors from httpx count as retryable too
+def _h2_error(e: Exception) -> bool:
+    return type(e).__module__.startswith(("httpx", "httpcore", "h2"))
+
+# keep a raw copy of a fetched article (never fails the fetch)
+def _archive(url: str, r: requests.Response, body: bytes | None = None, kind: str | None = None):
+    if not ARCHIVE or kind not in ARCHIVE_KINDS or r.status_code != 200:
+        return
+    try:
+        archive.store(url, r, body, kind)
+    except Exception as e:
+        print("archive failed for", url, "-", e)
+
+# get, optionally through the disk cache (cache = ttl class, e.g. "rss" or "article")
+def get(url: str, cache: str | None = None, **kwargs) -> requests.Response:
+    if kwargs.get("stream"):
+        return request("GET", url, **kwargs)
+    if not cache:
+        return request("GET", url, **kwargs)
+
+    host = (urlsplit(url).hostname or "").lower()
+    entry = http_cache.lookup(url)
+    if entry and http_cache.is_fresh(entry, cache):
+        _count_cache(host, "cache_hits")
+        return http_cache.response(entry)
+
+    if entry:
+        kwargs["headers"] = {**http_cache.validators(entry), **(kwargs.get("headers") or {})}
+    r = request("GET", url, **kwargs)
+
+    if r.status_code == 304 and entry:
+        _count_cache(host, "not_modified")
+        http_cache.refresh(entry)
+        return http_cache.response(entry)
+    if r.status_code == 200:
+        http_cache.store(url, r, cache)
+        _archive(url, r, kind=cache)
+    return r
+
+# get without following redirects, reading at most max_bytes of the body
+# -> (response, body); body is None when the cap was hit
+def get_capped(url: str, max_bytes: int = MAX_BODY, kind: str | None = None,
+               **kwargs) -> tuple[requests.Response, bytes | None]:
+    kwargs.update(stream=True, allow_redirects=False)
+    host = (urlsplit(url).hostname or "").lower()
+    r = request("GET", url, **kwargs)
+    chunks, total = [], 0
+    try:
+        length = r.headers.get("Content-Length", "")
+        if length.isdigit() and int(length) > max_bytes:
+            return r, None
+        for chunk in r.iter_content(64 * 1024):
+            total += len(chunk)
+            if total > max_bytes:
+                return r, None
+            chunks.append(chunk)
+        r._content = b"".join(chunks)
+        _archive(url, r, r._content, kind)
+        return r, r._content
+    finally:
+        r.close()
+        with _stats_lock:
+            _stats.setdefault(host, _new_stats())["bytes"] += total
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
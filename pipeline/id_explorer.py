@@ -0,0 +1,185 @@
+# pipeline/id_explorer.py
+"""
+stateful id-space explorer for scraper_full
+1. probe map: 2-bit status per id (unknown / miss / article / no content), zlib-compressed on disk
+2. skip ids already probed
+3. estimate article density per region, sample dense regions more
+4. walk forward from the highest known article id to catch new ones
+   (misses past it are not stored: those ids may still be published, so they stay unknown)
+5. keep articles-per-request history
+"""
+from pathlib import Path
+import json, random, re, struct, time, zlib
+
+# probe map folder
+crawl_folder = Path("data/crawl")
+crawl_folder.mkdir(parents=True, exist_ok=True)
+
+# statuses (2 bits each)
+UNKNOWN, MISS, ARTICLE, EMPTY = 0, 1, 2, 3
+status_names = {"miss": MISS, "found": ARTICLE, "skip": EMPTY}
+
+# planning
+REGION = 10000          # ids per density region
+FORWARD_SHARE = 0.3     # of each run spent walking past the newest article
+DENSE_SHARE = 0.5       # of each run spent in dense regions (rest is random exploration)
+
+# counts of each status in one byte (4 ids per byte)
+_byte_counts = [[sum(1 for k in range(4) if (b >> (2 * k)) & 3 == s) for s in range(4)] for b in range(256)]
+
+class ProbeMap:
+    def __init__(self, name: str, start: int, end: int):
+        self.name = name
+        self.start = start
+        self.end = end                          # exclusive, grows when walking forward
+        self.bits = bytearray((end - start + 3) // 4)
+        self.meta = {"requests": 0, "articles": 0, "highest_article": None, "runs": []}
+
+    @staticmethod
+    def path_for(name: str) -> Path:
+        return crawl_folder / f"probe_{re.sub(r'[^a-zA-Z0-9_-]', '_', name).lower()}.bin"
+
+    # load from disk (or start empty)
+    @classmethod
+    def load(cls, name: str, id_range: tuple[int, int]) -> "ProbeMap":
+        pm = cls(name, *id_range)
+        f = cls.path_for(name)
+        if not f.exists():
+            return pm
+        try:
+            raw = f.read_bytes()
+            (n,) = struct.unpack(">I", raw[:4])
+            header = json.loads(raw[4:4 + n].decode("utf-8"))
+            bits = bytearray(zlib.decompress(raw[4 + n:]))
+        except Exception as e:
+            print("could not read probe map, starting fresh:", e)
+            return pm
+        if header.get("start") != pm.start:
+            print("probe map range changed, starting fresh")
+            return pm
+        pm.end = max(pm.end, header["end"])
+        pm.bits = bits + bytearray(max(0, (pm.end - pm.start + 3) // 4 - len(bits)))
+        pm.meta = header.get("meta", pm.meta)
+        return pm
+
+    def save(self):
+        header = json.dumps({"start": self.start, "end": self.end, "meta": self.meta}).encode("utf-8")
+        tmp = self.path_for(self.name).with_suffix(".tmp")
+        tmp.write_bytes(struct.pack(">I", len(header)) + header + zlib.compress(bytes(self.bits), 9))
+        tmp.replace(self.path_for(self.name))
+
+    def _grow(self, aid: int):
+        if aid >= self.end:
+            self.end = aid + 1
+            need = (self.end - self.start + 3) // 4
+            self.bits.extend(bytearray(need - len(self.bits)))
+
+    def get(self, aid: int) -> int:
+        if aid < self.start or aid >= self.end:
+            return UNKNOWN
+        off = aid - self.start
+        return (self.bits[off >> 2] >> ((off & 3) * 2)) & 3
+
+    def set(self, aid: int, status: int):
+        if aid < self.start:
+            return
+        self._grow(aid)
+        off = aid - self.start
+        shift = (off & 3) * 2
+        self.bits[off >> 2] = (self.bits[off >> 2] & ~(3 << shift) & 0xFF) | (status << shift)
+        if status == ARTICLE and (self.meta["highest_article"] or 0) < aid:
+            self.meta["highest_article"] = aid
+
+    # [probed, articles] per region
+    def regions(self) -> list[list[int]]:
+        per = REGION // 4
+        out = []
+        for i in range(0, len(self.bits), per):
+            probed = hits = 0
+            for b in self.bits[i:i + per]:
+                if b:
+                    c = _byte_counts[b]
+                    probed += c[MISS] + c[ARTICLE] + c[EMPTY]
+                    hits += c[ARTICLE]
+            out.append([probed, hits])
+        return out
+
+    def _random_unprobed(self, lo: int, hi: int, taken: set, tries: int = 50) -> int | None:
+        for _ in range(tries):
+            aid = random.randrange(lo, hi)
+            if aid not in taken and self.get(aid) == UNKNOWN:
+                return aid
+        return None
+
+    # pick n ids: forward walk, dense regions, random exploration
+    def plan(self, n: int) -> list[int]:
+        taken, ids = set(), []
+
+        def add(aid):
+            if aid is not None and aid not in taken:
+                taken.add(aid)
+                ids.append(aid)
+
+        # 1. walk forward from the newest article we know about
+        top = self.meta.get("highest_article")
+        if top:
+            aid = top + 1
+            while len(ids) < int(n * FORWARD_SHARE) and aid < top + n * 20:
+                if self.get(aid) == UNKNOWN:
+                    add(aid)
+                aid += 1
+
+        # 2. dense regions, weighted by estimated density (beta(1, 1) prior)
+        regions = self.regions()
+        weights = []
+        for probed, hits in regions:
+            left = REGION - probed
+            weights.append((hits + 1) / (probed + 2) * (left > 0) if probed else 0.0)
+        want = len(ids) + int(n * DENSE_SHARE)
+        if any(weights):
+            for _ in range(want * 3):
+                if len(ids) >= want:
+                    break
+                r = random.choices(range(len(regions)), weights=weights)[0]
+                lo = self.start + r * REGION
+                add(self._random_unprobed(lo, min(lo + REGION, self.end), taken))
+
+        # 3. explore anywhere not probed yet
+        for _ in range(n * 20):
+            if len(ids) >= n:
+                break
+            add(self._random_unprobed(self.start, self.end, taken, tries=1))
+
+        return ids[:n]
+
+    # record a run's results, return articles per request
+    def record(self, results: dict[int, str | None]) -> float:
+        requests = articles = 0
+        for aid, status in results.items():
+            requests += 1
+            if status in status_names and status != "miss":
+                self.set(aid, status_names[status])
+            articles += status == "found"
+        # misses only count below the newest article (found this run included); past it they aren't published yet
+        head = self.meta.get("highest_article") or 0
+        for aid, status in results.items():
+            if status == "miss" and aid < head:
+                self.set(aid, MISS)
+        self.meta["requests"] += requests
+        self.meta["articles"] += articles
+        rate = articles / requests if requests else 0.0
+        self.meta["runs"] = (self.meta.get("runs", []) + [
+            {"time": time.strftime("%Y-%m-%d %H:%M"), "requests": requests, "articles": articles}
+        ])[-50:]
+        return rate
+
+    def summary(self) -> dict:
+        probed = sum(p for p, _ in self.regions())
+        total = self.meta["requests"]
+        return {
+            "probed_ids": probed,
+            "requests": total,
+            "articles": self.meta["articles"],
+            "articles_per_request": round(self.meta["articles"] / total, 3) if total else 0.0,
+            "highest_article": self.meta.get("highest_article")
+        }
@@ -0,0 +1,170 @@
+# pipeline/ollama_client.py
+"""
+client for the local ollama server (rest api, no cli subprocess)
+1. one pooled keep-alive session to OLLAMA_HOST (default http://localhost:11434)
+2. /api/generate with keep_alive, so the model stays loaded between articles
+3. optional streaming (tokens handed to a callback as they arrive)
+4. connect / read timeouts
+5. token counts and timings per call, totals per model (stats)
+6. /api/tags to list installed models, /api/pull to download one
+"""
+from requests.adapters import HTTPAdapter
+import json, os, threading, time, requests
+
+# server
+HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+if "://" not in HOST:
+    HOST = "http://" + HOST     # ollama accepts a bare host:port here
+HOST = HOST.rstrip("/")
+
+# settings
+KEEP_ALIVE = os.environ.get("INFOCRAWL_OLLAMA_KEEP_ALIVE", "30m")    # how long the model stays loaded after a call
+CONNECT_TIMEOUT = 5     # seconds
+READ_TIMEOUT = 600      # seconds without a byte (whole reply, or between streamed chunks)
+PULL_TIMEOUT = 3600
+POOL_SIZE = 16          # connections kept to the server (parallel summarisation)
+
+class OllamaError(RuntimeError):
+    pass
+
+_session = None
+_session_lock = threading.Lock()
+
+def session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _session = s
+    return _session
+
+# totals per model
+_stats = {}
+_stats_lock = threading.Lock()
+
+def _count(model: str, result: dict | None = None, error: bool = False):
+    with _stats_lock:
+        st = _stats.setdefault(model, {"requests": 0, "errors": 0, "prompt_tokens": 0, "tokens": 0,
+                                       "load_s": 0.0, "gen_s": 0.0, "wall_s": 0.0})
+        st["requests"] += 1
+        if error or result is None:
+            st["errors"] += 1
+            return
+        for k in ("prompt_tokens", "tokens", "load_s", "gen_s", "wall_s"):
+            st[k] += result.get(k) or 0
+
+def stats() -> dict[str, dict]:
+    with _stats_lock:
+        out = {m: dict(st) for m, st in _stats.items()}
+    for st in out.values():
+        st["tokens_per_s"] = round(st["tokens"] / st["gen_s"], 1) if st["gen_s"] else None
+    return out
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+# final reply fields (durations are nanoseconds) -> our result
+def _result(text: str, final: dict, wall: float) -> dict:
+    ns = 1e9
+    gen_s = (final.get("eval_duration") or 0) / ns
+    tokens = final.get("eval_count") or 0
+    return {
+        "text": text,
+        "model": final.get("model"),
+        "done_reason": final.get("done_reason"),
+        "prompt_tokens": final.get("prompt_eval_count") or 0,
+        "tokens": tokens,
+        "load_s": (final.get("load_duration") or 0) / ns,      # > 0 means the model had to be loaded
+        "prompt_s": (final.get("prompt_eval_duration") or 0) / ns,
+        "gen_s": gen_s,
+        "total_s": (final.get("total_duration") or 0) / ns,
+        "wall_s": wall,
+        "tokens_per_s": round(tokens / gen_s, 1) if gen_s else None
+    }
+
+# run a prompt
+#   stream: read the reply chunk by chunk, on_token(text) for each
+#   options: model options (temperature, num_ctx ...)
+# -> dict with text, token counts and timings (raises OllamaError)
+def generate(prompt: str, model: str, stream: bool = False, on_token=None, options: dict | None = None,
+             keep_alive: str | int | None = None, timeout: float | None = None) -> dict:
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": stream,
+        "keep_alive": KEEP_ALIVE if keep_alive is None else keep_alive
+    }
+    if options:
+        payload["options"] = options
+    t0 = time.perf_counter()
+    try:
+        r = session().post(f"{HOST}/api/generate", json=payload, stream=stream,
+                           timeout=(CONNECT_TIMEOUT, timeout or READ_TIMEOUT))
+        with r:
+            if r.status_code != 200:
+                raise OllamaError(f"{r.status_code} from ollama: {r.text[:200]}")
+            if not stream:
+                final = r.json()
+                text = final.get("response", "")
+            else:
+                parts, final = [], {}
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise OllamaError(chunk["error"])
+                    piece = chunk.get("response", "")
+                    if piece:
+                        parts.append(piece)
+                        if on_token:
+                            on_token(piece)
+                    if chunk.get("done"):
+                        final = chunk
+                        break
+                if not final:
+                    raise OllamaError("stream ended before the reply was done")
+                text = "".join(parts)
+    except OllamaError:
+        _count(model, error=True)
+        raise
+    except (requests.RequestException, ValueError) as e:
+        _count(model, error=True)
+        raise OllamaError(f"ollama request failed: {e}") from e
+    if final.get("error"):
+        _count(model, error=True)
+        raise OllamaError(final["error"])
+    result = _result(text, final, time.perf_counter() - t0)
+    _count(model, result)
+    return result
+
+# installed model names (e.g. "mistral:latest")
+def tags(timeout: float = CONNECT_TIMEOUT) -> list[str]:
+    try:
+        r = session().get(f"{HOST}/api/tags", timeout=(CONNECT_TIMEOUT, timeout))
+        r.raise_for_status()
+        return [m.get("name") or m.get("model") for m in r.json().get("models", [])]
+    except (requests.RequestException, ValueError) as e:
+        raise OllamaError(f"could not list ollama models: {e}") from e
+
+# is the model installed ("mistral" matches "mistral:latest")
+def has_model(model: str, names: list[str] | None = None) -> bool:
+    names = tags() if names is None else names
+    want = model if ":" in model else f"{model}:latest"
+    return any(n == model or n == want for n in names)
+
+# download a model (blocks until done)
+def pull(model: str, timeout: float = PULL_TIMEOUT) -> dict:
+    try:
+        r = session().post(f"{HOST}/api/pull", json={"model": model, "stream": False},
+                           timeout=(CONNECT_TIMEOUT, timeout))
+        reply = r.json()
+    except (requests.RequestException, ValueError) as e:
+        raise OllamaError(f"could not pull {model}: {e}") from e
+    if r.status_code != 200 or reply.get("error"):
+        raise OllamaError(reply.get("error") or f"{r.status_code} from ollama")
+    return reply
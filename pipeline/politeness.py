@@ -0,0 +1,181 @@
+# pipeline/politeness.py
+"""
+per-domain politeness scheduler
+1. one queue per domain
+2. token bucket per domain (configurable, honours robots.txt crawl-delay, read when the domain first comes up)
+3. different domains run in parallel, one request in flight per domain
+4. back off a domain after errors
+"""
+from collections import deque
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+import random, threading, time
+from pipeline import http_client
+
+# defaults
+DEFAULT_RATE = 0.5      # requests per second per domain (one every 2 s)
+DEFAULT_BURST = 1       # requests allowed back to back
+DEFAULT_WORKERS = 4     # domains fetched at the same time
+ERROR_BACKOFF = 3.0     # seconds after the first error, doubles on repeats
+MAX_BACKOFF = 60.0
+JITTER = 0.25           # up to this fraction of the interval added at random
+
+# per-domain overrides (requests per second)
+domain_rates = {}
+
+def domain_of(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+# crawl-delay from robots.txt (None if not set or not reachable)
+def robots_delay(url: str, user_agent: str = "*", timeout: float = 10) -> float | None:
+    parts = urlsplit(url)
+    try:
+        r = http_client.get(f"{parts.scheme}://{parts.netloc}/robots.txt", timeout=timeout, retries=0)
+        if r.status_code != 200:
+            return None
+        rp = RobotFileParser()
+        rp.parse(r.text.splitlines())
+        delay = rp.crawl_delay(user_agent)
+        return float(delay) if delay else None
+    except Exception:
+        return None
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    # seconds until a token is free (0 if one is free now)
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+class DomainScheduler:
+    def __init__(self, workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE,
+                 rates: dict | None = None, use_robots: bool = True, key=domain_of):
+        self.workers = workers
+        self.rate = rate
+        self.rates = {**domain_rates, **(rates or {})}
+        self.use_robots = use_robots
+        self.key = key
+        self.buckets = {}
+        self.errors = {}
+        self.robots_checked = set()
+        self.cond = threading.Condition()
+
+    # rate for a domain: override, else default
+    def rate_for(self, domain: str) -> float:
+        return self.rates.get(domain, self.rate)
+
+    # slow a domain down to its robots.txt crawl-delay (fetched once, inside the domain's worker)
+    # -> True if the bucket was slowed and the next request has to wait
+    def apply_robots(self, domain: str, sample_url: str) -> bool:
+        if domain in self.robots_checked:
+            return False
+        self.robots_checked.add(domain)
+        if not self.use_robots or not sample_url.startswith("http"):
+            return False
+        delay = robots_delay(sample_url)
+        if not delay:
+            return False
+        with self.cond:
+            bucket = self.buckets[domain]
+            if 1.0 / delay >= bucket.rate:
+                return False
+            bucket.rate = 1.0 / delay
+            # robots.txt itself counts as the last request
+            bucket.tokens = 0.0
+            bucket.last = time.monotonic()
+        return True
+
+    # push a domain back after an error
+    def backoff(self, domain: str):
+        with self.cond:
+            n = self.errors.get(domain, 0) + 1
+            self.errors[domain] = n
+            wait = min(MAX_BACKOFF, ERROR_BACKOFF * 2 ** (n - 1))
+            bucket = self.buckets.get(domain)
+            if bucket:
+                bucket.blocked_until = time.monotonic() + wait
+
+    # run fn(item) for every item, politely; results come back in input order
+    def run(self, items: list, fn) -> list:
+        results = [None] * len(items)
+        queues = {}
+        for i, item in enumerate(items):
+            queues.setdefault(self.key(item), deque()).append((i, item))
+
+        for domain in queues:
+            if domain not in self.buckets:
+                self.buckets[domain] = TokenBucket(self.rate_for(domain))
+
+        busy = set()
+
+        # pick the domain whose next token comes first
+        def next_job():
+            with self.cond:
+                while True:
+                    ready = [d for d, q in queues.items() if q and d not in busy]
+                    if not ready:
+                        if not any(queues.values()):
+                            return None
+                        self.cond.wait()
+                        continue
+                    now = time.monotonic()
+                    waits = {d: self.buckets[d].wait_time(now) for d in ready}
+                    domain = min(waits, key=waits.get)
+                    if waits[domain] > 0:
+                        self.cond.wait(waits[domain])
+                        continue
+                    bucket = self.buckets[domain]
+                    bucket.take(now)
+                    # a little jitter so requests don't line up exactly (on top of the token wait)
+                    bucket.tokens -= random.uniform(0, JITTER)
+                    busy.add(domain)
+                    return domain, queues[domain].popleft()
+
+        def worker():
+            while True:
+                job = next_job()
+                if job is None:
+                    return
+                domain, (i, item) = job
+                if self.apply_robots(domain, str(item)):
+                    # put the item back until the slower bucket has a token
+                    with self.cond:
+                        queues[domain].appendleft((i, item))
+                        busy.discard(domain)
+                        self.cond.notify_all()
+                    continue
+                try:
+                    results[i] = fn(item)
+                    with self.cond:
+                        self.errors.pop(domain, None)
+                except Exception as e:
+                    print("failed", item, e)
+                    self.backoff(domain)
+                finally:
+                    with self.cond:
+                        busy.discard(domain)
+                        self.cond.notify_all()
+
+        n = max(1, min(self.workers, len(queues)))
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
@@ -0,0 +1,178 @@
+# pipeline/poller.py
+"""
+adaptive rss poller (runs in a background thread)
+1. learn each feed's publish rate from its item timestamps
+2. poll busy feeds often, quiet ones rarely (with jitter)
+3. back off on errors
+4. store new items as they arrive (scraper_quick.store), then call on_new
+5. report poll interval and freshness lag per feed
+"""
+from datetime import datetime, timezone
+import random, statistics, threading, time
+
+import pandas as pd
+from pipeline import scraper_quick
+
+# poll interval bounds (seconds)
+MIN_INTERVAL = 2 * 60
+MAX_INTERVAL = 60 * 60
+DEFAULT_INTERVAL = 10 * 60
+POLL_FRACTION = 0.5     # poll twice per average gap between items
+QUIET_GROWTH = 1.25     # interval growth after a poll with nothing new
+JITTER = 0.2            # +- fraction of the interval
+ERROR_BACKOFF = 2.0     # interval multiplier per error in a row
+KEEP = 20               # publish times / lags remembered per feed
+
+def _now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _seconds_since(iso: str) -> float | None:
+    try:
+        then = datetime.fromisoformat(iso).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+    return (_now_utc() - then).total_seconds()
+
+class FeedPoller:
+    def __init__(self, sources: list[dict] | None = None, on_new=None):
+        self.sources = sources or scraper_quick.news
+        self.on_new = on_new            # called with the new rows after they are stored
+        self.feeds = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        # learned rates survive restarts (kept next to the feed state)
+        state = scraper_quick.load_state()
+        for src in self.sources:
+            learned = state.get(src["name"], {}).get("poll", {})
+            self.feeds[src["name"]] = {
+                "src": src,
+                "interval": learned.get("interval", DEFAULT_INTERVAL),
+                "published": learned.get("published", []),
+                "lags": [],
+                "next_due": time.monotonic() + random.uniform(0, 5),
+                "errors": 0,
+                "polls": 0,
+                "new_items": 0,
+                "last_poll": None,
+                "last_error": None
+            }
+
+    # average gap between recent items -> poll interval
+    def learned_interval(self, feed: dict) -> float | None:
+        times = sorted(feed["published"])
+        if len(times) < 2:
+            return None
+        first = datetime.fromisoformat(times[0])
+        last = datetime.fromisoformat(times[-1])
+        gap = (last - first).total_seconds() / (len(times) - 1)
+        return min(MAX_INTERVAL, max(MIN_INTERVAL, gap * POLL_FRACTION))
+
+    def schedule(self, feed: dict, found: int, failed: bool):
+        if failed:
+            feed["errors"] += 1
+            wait = min(MAX_INTERVAL, feed["interval"] * ERROR_BACKOFF ** feed["errors"])
+        else:
+            feed["errors"] = 0
+            if found:
+                feed["interval"] = self.learned_interval(feed) or feed["interval"]
+            else:
+                feed["interval"] = min(MAX_INTERVAL, feed["interval"] * QUIET_GROWTH)
+            wait = feed["interval"]
+        feed["next_due"] = time.monotonic() + wait * random.uniform(1 - JITTER, 1 + JITTER)
+
+    # poll one feed, store what's new
+    def poll(self, name: str):
+        feed = self.feeds[name]
+        src = feed["src"]
+        rows, failed = [], False
+        try:
+            feed_state = scraper_quick.load_state().get(name, {})
+            rows = scraper_quick.read_feed(src, feed_state, scraper_quick.get_now()["date"], cache="poll")
+            if rows:
+                scraper_quick.store(pd.DataFrame(rows))
+        except Exception as e:
+            print("poll failed for", name, "-", e)
+            feed["last_error"] = str(e)
+            failed = True
+
+        with self.lock:
+            first = feed["polls"] == 0     # first poll returns the backlog, not fresh items
+            feed["last_poll"] = time.time()
+            feed["new_items"] += len(rows)
+            for row in rows:
+                published = scraper_quick.parse_date(row.get("Publish_Date"))
+                if not published:
+                    continue
+                feed["published"] = sorted(feed["published"] + [published])[-KEEP:]
+                lag = None if first else _seconds_since(published)
+                if lag is not None:
+                    feed["lags"] = (feed["lags"] + [max(0.0, lag)])[-KEEP:]
+            feed["polls"] += 1
+            self.schedule(feed, len(rows), failed)
+
+        if not failed:
+            feed_state["poll"] = {"interval": feed["interval"], "published": feed["published"]}
+            # only this feed, merged under the state file lock
+            scraper_quick.save_state({name: feed_state})
+        if rows and self.on_new:
+            try:
+                self.on_new(rows)
+            except Exception as e:
+                print("on_new failed:", e)
+
+    def loop(self):
+        while not self.stop_event.is_set():
+            with self.lock:
+                name, feed = min(self.feeds.items(), key=lambda kv: kv[1]["next_due"])
+                wait = feed["next_due"] - time.monotonic()
+            if wait > 0:
+                self.stop_event.wait(min(wait, 5))
+                continue
+            self.poll(name)
+
+    def start(self):
+        if self.running():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.loop, name="feed-poller", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=10)
+
+    def running(self) -> bool:
+        return bool(self.thread and self.thread.is_alive())
+
+    # one row per feed: interval, next poll, freshness lag
+    def report(self) -> list[dict]:
+        now = time.monotonic()
+        out = []
+        with self.lock:
+            for name, feed in self.feeds.items():
+                lags = feed["lags"]
+                out.append({
+                    "feed": name,
+                    "interval_min": round(feed["interval"] / 60, 1),
+                    "next_poll_in_s": max(0, round(feed["next_due"] - now)),
+                    "polls": feed["polls"],
+                    "new_items": feed["new_items"],
+                    "errors_in_row": feed["errors"],
+                    "last_lag_min": round(lags[-1] / 60, 1) if lags else None,
+                    "median_lag_min": round(statistics.median(lags) / 60, 1) if lags else None,
+                    "last_poll": time.strftime("%H:%M:%S", time.localtime(feed["last_poll"])) if feed["last_poll"] else None
+                })
+        return out
+
+if __name__ == "__main__":
+    poller = FeedPoller()
+    poller.start()
+    try:
+        while True:
+            time.sleep(60)
+            print(pd.DataFrame(poller.report()).to_string(index=False))
+    except KeyboardInterrupt:
+        poller.stop()
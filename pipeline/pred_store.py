@@ -0,0 +1,179 @@
+# pipeline/pred_store.py
+"""
+entity predictions in data/processed/predictions.db (replaces predictions_*.json)
+1. one row per (prediction set, doc): newsfeed, fullnews, search_<query>, individual_<query>, overall_<query>
+2. writes only append rows for docs whose entities changed (newest row per doc wins)
+3. point lookup by doc key (url, file name, or "<csv>:<row>")
+4. compaction drops superseded rows and vacuums once they pile up
+5. old predictions_*.json files are imported once
+"""
+from pathlib import Path
+import json, sqlite3, threading
+
+# store location
+proc_folder = Path("data/processed")
+proc_folder.mkdir(parents=True, exist_ok=True)
+db_file = proc_folder / "predictions.db"
+
+COMPACT_RATIO = 0.5     # compact once superseded rows pass this share of all rows
+COMPACT_MIN = 1000      # ...and there are at least this many
+
+_lock = threading.Lock()
+_imported = False
+
+def _connect() -> sqlite3.Connection:
+    con = sqlite3.connect(db_file, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS preds ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"   # ids never reused, so version() can't repeat
+        " source TEXT,"
+        " doc TEXT,"
+        " ents TEXT)"           # json list of {start, end, text, label, score}
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS preds_doc ON preds (source, doc, id)")
+    con.execute("CREATE TABLE IF NOT EXISTS labels (source TEXT, label TEXT, PRIMARY KEY (source, label))")
+    con.execute("CREATE TABLE IF NOT EXISTS imported (file TEXT PRIMARY KEY)")
+    return con
+
+# newest rows only
+_latest = "id IN (SELECT MAX(id) FROM preds WHERE source = ? GROUP BY doc)"
+
+# import predictions_*.json written before the store existed (once per file)
+def import_json():
+    global _imported
+    if _imported:
+        return
+    _imported = True
+    with _connect() as con:
+        done = {f for (f,) in con.execute("SELECT file FROM imported")}
+    for f in sorted(proc_folder.glob("predictions_*.json")):
+        if f.name in done:
+            continue
+        try:
+            data = json.loads(f.read_text(encoding="utf-8"))
+        except Exception as e:
+            print("could not import", f, e)
+            continue
+        source = f.stem.removeprefix("predictions_")
+        if isinstance(data, dict) and isinstance(data.get("entities"), list):
+            data = {data.get("file") or source: data["entities"]}   # overall summary layout
+        if isinstance(data, dict):
+            put(source, data)
+            print("imported", f, "into", db_file)
+        with _connect() as con:
+            con.execute("INSERT OR IGNORE INTO imported VALUES (?)", (f.name,))
+
+# write entities for these docs; unchanged docs are skipped -> number of docs written
+def put(source: str, docs: dict[str, list[dict]]) -> int:
+    if not docs:
+        return 0
+    new = {doc: json.dumps(ents or [], ensure_ascii=False) for doc, ents in docs.items()}
+    with _lock:
+        con = _connect()
+        try:
+            old = _get_many(con, source, list(new))
+            rows = [(source, doc, ents) for doc, ents in new.items() if old.get(doc) != ents]
+            labels = {(source, e.get("label")) for doc in docs for e in docs[doc] or []
+                      if isinstance(e, dict) and e.get("label")}
+            with con:
+                con.executemany("INSERT INTO preds (source, doc, ents) VALUES (?, ?, ?)", rows)
+                con.executemany("INSERT OR IGNORE INTO labels VALUES (?, ?)", labels)
+        finally:
+            con.close()
+    return len(rows)
+
+def _get_many(con: sqlite3.Connection, source: str, docs: list[str]) -> dict[str, str]:
+    out = {}
+    for doc in docs:
+        row = con.execute(
+            "SELECT ents FROM preds WHERE source = ? AND doc = ? ORDER BY id DESC LIMIT 1", (source, doc)
+        ).fetchone()
+        if row:
+            out[doc] = row[0]
+    return out
+
+# entities for some docs (docs without predictions are left out)
+def get_many(source: str, docs: list[str]) -> dict[str, list[dict]]:
+    import_json()
+    with _connect() as con:
+        return {doc: json.loads(ents) for doc, ents in _get_many(con, source, docs).items()}
+
+# entities for one doc, first set that has them wins
+def get(sources: list[str] | str, doc: str) -> list[dict]:
+    for source in [sources] if isinstance(sources, str) else sources:
+        ents = get_many(source, [doc]).get(doc)
+        if ents:
+            return ents
+    return []
+
+# whole prediction set {doc: entities} (small sets: individual / overall summaries)
+def load(source: str) -> dict[str, list[dict]]:
+    import_json()
+    with _connect() as con:
+        rows = con.execute(f"SELECT doc, ents FROM preds WHERE source = ? AND {_latest} ORDER BY id",
+                           (source, source)).fetchall()
+    return {doc: json.loads(ents) for doc, ents in rows}
+
+# docs that have at least one entity
+def done_docs(source: str) -> set[str]:
+    import_json()
+    with _connect() as con:
+        return {doc for (doc,) in con.execute(
+            f"SELECT doc FROM preds WHERE source = ? AND {_latest} AND ents != '[]'", (source, source)
+        )}
+
+# labels seen in these sets
+def labels(sources: list[str]) -> list[str]:
+    import_json()
+    marks = ",".join("?" * len(sources))
+    with _connect() as con:
+        return sorted({l for (l,) in con.execute(f"SELECT label FROM labels WHERE source IN ({marks})", sources)})
+
+# newest row id of a set (changes whenever the set does, 0 if empty)
+def version(source: str) -> int:
+    import_json()
+    with _connect() as con:
+        (v,) = con.execute("SELECT MAX(id) FROM preds WHERE source = ?", (source,)).fetchone()
+    return v or 0
+
+# every set name
+def sources() -> list[str]:
+    import_json()
+    with _connect() as con:
+        return [s for (s,) in con.execute("SELECT DISTINCT source FROM preds")]
+
+# remove whole prediction sets (clear data)
+def drop(names: list[str]):
+    with _lock:
+        con = _connect()
+        try:
+            with con:
+                for name in names:
+                    con.execute("DELETE FROM preds WHERE source = ?", (name,))
+                    con.execute("DELETE FROM labels WHERE source = ?", (name,))
+        finally:
+            con.close()
+
+# drop superseded rows and reclaim the space
+def compact(force: bool = False) -> dict[str, int]:
+    with _lock:
+        con = _connect()
+        try:
+            (total,) = con.execute("SELECT COUNT(*) FROM preds").fetchone()
+            (live,) = con.execute("SELECT COUNT(*) FROM (SELECT 1 FROM preds GROUP BY source, doc)").fetchone()
+            stale = total - live
+            if not force and (stale < COMPACT_MIN or stale < total * COMPACT_RATIO):
+                return {"rows": total, "removed": 0}
+            with con:
+                con.execute("DELETE FROM preds WHERE id NOT IN (SELECT MAX(id) FROM preds GROUP BY source, doc)")
+            con.execute("VACUUM")
+        finally:
+            con.close()
+    print(f"compacted {db_file}: removed {stale} of {total} rows")
+    return {"rows": live, "removed": stale}
+
+if __name__ == "__main__":
+    # import old json files, then compact
+    import_json()
+    print(compact(force=True))
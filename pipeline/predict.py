@@ -5,17 +5,17 @@ label prediction
 2. load model (urchade/gliner_multi)
 3. get csv files
 4. predict individual and overall summaries (txt files)
-5. predict news feed, full news, and search data (csv files)
-6. save predictions as *.json files into data/processed
+5. predict news feed, full news, and search data (csv files, one copy per near-duplicate cluster)
+6. save predictions per doc into data/processed/predictions.db (pred_store, only changed docs are written)
+7. keep the entity index (entity_index) in step with the csv predictions
 """
 from pathlib import Path
-import json
 import time
 import pandas as pd
 from collections import defaultdict
 from gliner import GLiNER
-import hashlib
 import re
+from pipeline import dedupe, store, entity_index, pred_store
 
 # config
 CHUNK_SIZE = 500
@@ -62,7 +62,12 @@ def safe_str(x) -> str:
 def clean_name(txt: str, max_len: int = 50) -> str:
     return re.sub(r"[^a-zA-Z0-9_-]", "_", txt).strip("_")[:max_len]
 
+# every csv in a folder, with __srcfile__ / __row__ (csv name, row in it) for docs without a url
 def read_all_csvs(folder: Path) -> pd.DataFrame:
+    # raw folders are read from the parquet store
+    name = store.store_for(folder)
+    if name:
+        return store.read(name)
     files = sorted(folder.glob("*.csv"))
     if not files:
         return pd.DataFrame()
@@ -71,6 +76,7 @@ def read_all_csvs(folder: Path) -> pd.DataFrame:
         try:
             df = pd.read_csv(f)
             df["__srcfile__"] = f.name
+            df["__row__"] = range(len(df))
             dfs.append(df)
         except Exception:
             continue
@@ -95,16 +101,6 @@ def deduplicate_entities(entities: list[dict]) -> list[dict]:
             unique.append(ent)
     return unique
 
-def file_hash(path: Path) -> str | None:
-    try:
-        h = hashlib.sha256()
-        with path.open("rb") as f:
-            for chunk in iter(lambda: f.read(8192), b""):
-                h.update(chunk)
-        return h.hexdigest()
-    except Exception:
-        return None
-
 # batch prediction
 def predict_entities_in_chunks(texts, batch_size=32):
     model = get_model()
@@ -124,9 +120,9 @@ def predict_entities_in_chunks(texts, batch_size=32):
     return results
 
 # individual summaries
-def run_individual(query: str) -> Path:
+def run_individual(query: str) -> str:
     safe_q = clean_name(query) if query else "default"
-    out_file = proc_folder / f"predictions_individual_{safe_q}.json"
+    source = f"individual_{safe_q}"
 
     print(f"Running individual summaries prediction for query '{query}'...")
     texts, keys = [], []
@@ -142,23 +138,17 @@ def run_individual(query: str) -> Path:
     preds = predict_entities_in_chunks(texts)
     res = {k: deduplicate_entities(p) for k, p in zip(keys, preds)}
 
-    new_content = json.dumps(res, ensure_ascii=False, indent=2)
-    new_hash = hashlib.sha256(new_content.encode("utf-8")).hexdigest()
-
-    if out_file.exists():
-        old_hash = file_hash(out_file)
-        if old_hash == new_hash:
-            print(f"Skipping individual summaries — {out_file} already up to date")
-            return out_file
-
-    out_file.write_text(new_content, encoding="utf-8")
-    print(f"Individual predictions saved to {out_file}")
-    return out_file
+    written = pred_store.put(source, res)
+    if not written:
+        print(f"Skipping individual summaries — {source} already up to date")
+        return source
+    print(f"Individual predictions saved to {pred_store.db_file} ({source}, {written} docs)")
+    return source
 
 # overall summary
-def run_overall(query: str) -> Path | None:
+def run_overall(query: str) -> str | None:
     safe_q = clean_name(query) if query else "default"
-    out_file = proc_folder / f"predictions_overall_{safe_q}.json"
+    source = f"overall_{safe_q}"
 
     print(f"Running overall summary prediction for query '{query}'...")
     sum_file = out_folder / f"summary_overall_{safe_q}.txt"
@@ -178,34 +168,24 @@ def run_overall(query: str) -> Path | None:
     ents = predict_entities_in_chunks([txt])[0]
     ents = deduplicate_entities(ents)
 
-    new_content = json.dumps({"file": sum_file.name, "entities": ents}, ensure_ascii=False, indent=2)
-    new_hash = hashlib.sha256(new_content.encode("utf-8")).hexdigest()
-
-    if out_file.exists():
-        old_hash = file_hash(out_file)
-        if old_hash == new_hash:
-            print(f"Skipping overall summary — {out_file} already up to date")
-            return out_file
-
-    out_file.write_text(new_content, encoding="utf-8")
-    print(f"Overall predictions saved to {out_file}")
-    return out_file
+    if not pred_store.put(source, {sum_file.name: ents}):
+        print(f"Skipping overall summary — {source} already up to date")
+        return source
+    print(f"Overall predictions saved to {pred_store.db_file} ({source})")
+    return source
 
 # predict csvs
-def run_csv(folder: Path, out_name: str, text_cols: list[str], batch_size: int = 32, query: str = "") -> Path:
+def run_csv(folder: Path, out_name: str, text_cols: list[str], batch_size: int = 32, query: str = "") -> str:
     safe_q = clean_name(query) if query else ""
     # only add suffix if a query is provided
     suffix = f"_{safe_q}" if safe_q else "" 
-    out_file = proc_folder / f"predictions_{out_name}{suffix}.json"
+    source = f"{out_name}{suffix}"
 
-    # load existing predictions if available
-    if out_file.exists():
-        try:
-            existing = json.loads(out_file.read_text(encoding="utf-8"))
-        except Exception:
-            existing = {}
-    else:
-        existing = {}
+    # index must match the store before only the new docs are added to it
+    entity_index.ensure(source)
+
+    # docs already predicted (keys only, entities stay in the store)
+    done = pred_store.done_docs(source)
 
     msg = f"Running {out_name} prediction" + (f" for query '{query}'..." if query else "...")
     print(msg)
@@ -213,11 +193,23 @@ def run_csv(folder: Path, out_name: str, text_cols: list[str], batch_size: int =
     df = read_all_csvs(folder)
     if df.empty:
         print(f"No {out_name} data found")
-        out_file.write_text(json.dumps(existing, ensure_ascii=False, indent=2), encoding="utf-8")
-        return out_file
+        return source
+
+    # near-duplicates: predict one copy per cluster (canonical copy first)
+    if "Source_URL" in df.columns:
+        ids = df["Source_URL"].map(dedupe.doc_id)
+        cmap = dedupe.clusters(ids.tolist() + [dedupe.doc_id(k) for k in done])
+        df = df.assign(__cluster__=[cmap.get(d, "") for d in ids])
+        df = df.iloc[(ids != df["__cluster__"]).astype(int).argsort(kind="stable")]
+        done_clusters = {cmap.get(dedupe.doc_id(k)) for k in done}
+    else:
+        done_clusters = set()
 
     texts, keys, starts = [], [], []
-    for i, row in df.iterrows():
+    for _, row in df.iterrows():
+        cluster = row.get("__cluster__")
+        if cluster and cluster in done_clusters:
+            continue
         txt = ""
         for col in text_cols:
             txt = safe_str(row.get(col))
@@ -226,12 +218,15 @@ def run_csv(folder: Path, out_name: str, text_cols: list[str], batch_size: int =
         if not txt:
             continue
 
+        # same key the sections look up: url, else "<csv>:<row in that csv>"
         key = safe_str(row.get("Source_URL")).strip()
         if not key:
-            key = f"{safe_str(row.get('__srcfile__'))}:{i}"
+            key = f"{safe_str(row.get('__srcfile__'))}:{int(row['__row__'])}"
 
-        if key in existing and existing.get(key):
+        if key in done:
             continue
+        if cluster:
+            done_clusters.add(cluster)
 
         start = 0
         while start < len(txt):
@@ -256,23 +251,17 @@ def run_csv(folder: Path, out_name: str, text_cols: list[str], batch_size: int =
                     pass
                 merged[doc].append(ent)
 
-        # deduplicate and merge
-        for doc, ents in merged.items():
-            combined = (existing.get(doc, []) or []) + ents
-            existing[doc] = deduplicate_entities(combined)
-
-    new_content = json.dumps(existing, ensure_ascii=False, indent=2)
-    new_hash = hashlib.sha256(new_content.encode("utf-8")).hexdigest()
-
-    if out_file.exists():
-        old_hash = file_hash(out_file)
-        if old_hash == new_hash:
-            print(f"Skipping {out_name} — {out_file} already up to date")
-            return out_file
-
-    out_file.write_text(new_content, encoding="utf-8")
-    print(f"{out_name.capitalize()} predictions saved to {out_file}")
-    return out_file
+        # deduplicate and merge, write only these docs
+        existing = pred_store.get_many(source, list(merged))
+        new = {doc: deduplicate_entities((existing.get(doc) or []) + ents) for doc, ents in merged.items()}
+        written = pred_store.put(source, new)
+        entity_index.update(source, new)
+        entity_index.mark_loaded(source)
+        pred_store.compact()
+        print(f"{out_name.capitalize()} predictions saved to {pred_store.db_file} ({source}, {written} docs)")
+    else:
+        print(f"Skipping {out_name} — {source} already up to date")
+    return source
 
 # respective runs
 def run_news(): 
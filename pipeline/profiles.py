@@ -0,0 +1,110 @@
+# pipeline/profiles.py
+"""
+learned extraction profiles per domain
+1. remember which selector gave each field (title, date, category, content) per domain and cascade
+   (scrapers with different cascades for the same field keep separate profiles)
+2. try that selector first on the next page from the same domain, unless a better-ranked one matches there
+3. re-learn when it stops matching a few pages in a row
+4. saved in data/crawl/profiles.json
+"""
+from pathlib import Path
+import hashlib, json, threading
+
+from pipeline import extract
+from pipeline.politeness import domain_of
+
+# profile file
+crawl_folder = Path("data/crawl")
+crawl_folder.mkdir(parents=True, exist_ok=True)
+profile_file = crawl_folder / "profiles.json"
+
+# misses in a row before a new winner replaces the learned selector
+RELEARN_AFTER = 3
+
+_profiles = None
+_lock = threading.Lock()
+_dirty = False
+
+def load() -> dict:
+    global _profiles
+    with _lock:
+        if _profiles is None:
+            try:
+                _profiles = json.loads(profile_file.read_text(encoding="utf-8"))
+            except Exception:
+                _profiles = {}
+        return _profiles
+
+# write to disk (only if something changed)
+def save():
+    global _dirty
+    with _lock:
+        if not _dirty or _profiles is None:
+            return
+        tmp = profile_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(_profiles, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(profile_file)
+        _dirty = False
+
+def _learn(domain: str, field: str, winner: str | None, preferred: str | None):
+    global _dirty
+    with _lock:
+        prof = _profiles.setdefault(domain, {})
+        entry = prof.get(field)
+        if winner is None:
+            return  # nothing matched, nothing to learn
+        if entry is None:
+            prof[field] = {"selector": winner, "hits": 1, "misses": 0}
+        elif winner == preferred:
+            entry["hits"] += 1
+            entry["misses"] = 0
+        else:
+            entry["misses"] += 1
+            if entry["misses"] >= RELEARN_AFTER:
+                prof[field] = {"selector": winner, "hits": 1, "misses": 0}
+        _dirty = True
+
+# profile key: field name + the cascade it was learned with
+def profile_key(name: str, cascade: extract.Cascade) -> str:
+    digest = hashlib.blake2b("\n".join(cascade.selectors).encode("utf-8"), digest_size=4).hexdigest()
+    return f"{name}:{digest}"
+
+# extract one field, learned selector first, full cascade if it misses
+# (same value the full cascade would give; the profile only saves work)
+def field(url: str, name: str, cascade: extract.Cascade, tree, getter) -> str:
+    domain = domain_of(url)
+    key = profile_key(name, cascade)
+    entry = load().get(domain, {}).get(key)
+    preferred = entry["selector"] if entry else None
+
+    if preferred in cascade.selectors:
+        i = cascade.selectors.index(preferred)
+        # a better-ranked selector matching this page outranks the learned one
+        if not any(cascade.first_of(tree, j) is not None for j in range(i)):
+            el = cascade.first_of(tree, i)
+            try:
+                val = getter(el) if el is not None else ""
+            except Exception:
+                val = ""
+            if val:
+                _learn(domain, key, preferred, preferred)
+                return val
+
+    found = cascade.matches(tree)
+    val, winner = "", None
+    for i, el in found:
+        try:
+            val = getter(el)
+        except Exception:
+            continue
+        if val:
+            winner = i
+            break
+    # only learn a winner nothing ranked above it matched (an empty h1 on one page shouldn't teach "title")
+    learn = winner if winner is not None and winner == found[0][0] else None
+    _learn(domain, key, cascade.selectors[learn] if learn is not None else None, preferred)
+    return val
+
+# domain -> {field:cascade: selector} for display/debugging
+def summary() -> dict[str, dict[str, str]]:
+    return {d: {f: e["selector"] for f, e in fields.items()} for d, fields in load().items()}
@@ -2,23 +2,32 @@
 """
 scrape news based on id
 1. set scrape
-2. set parse
-3. scrape and parse
-4. save as malay_news_*.csv file into data/raw/news_id
+2. set parse (extract.py - one lxml parse, compiled selectors; profiles.py - learned selector per domain)
+3. pick ids (id_explorer.py - skip probed ids, favour dense regions, walk past the newest article)
+4. probe without following redirects - a redirect to the home page is a miss, no body downloaded;
+   a redirect to the article is followed by hand, with the same size cap
+5. scrape and parse (paced by politeness.py)
+6. or with --sitemap: read new urls from each outlet's sitemaps (sitemaps.py) instead of probing ids
+7. save as malay_news_*.csv file into data/raw/news_id
 """
-import requests
 import pandas as pd
-from bs4 import BeautifulSoup
-from lxml import html
-import random, time
-from requests.exceptions import RequestException
+import argparse, threading, time
+from functools import lru_cache
+from lxml import etree, html
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+from pipeline import frontier, http_client, http_cache, extract, profiles, dedupe, sitemaps, scraper_quick, fts
+from pipeline.id_explorer import ProbeMap
+from pipeline.politeness import DomainScheduler
 
 # folder to save csv
 save_folder = Path("data/raw/news_id")
 save_folder.mkdir(parents=True, exist_ok=True)
 
+# redirects followed by hand from an id probe (id -> permalink, maybe http -> https)
+MAX_REDIRECTS = 3
+
 # settings for Utusan
 UTUSAN = {
     "name": "Utusan Malaysia",
@@ -26,6 +35,7 @@ UTUSAN = {
     "id_param": "p",
     "id_range": (100000, 900000),
     "num_ids_to_check": 100,
+    "max_bytes": 2 * 1024 * 1024,   # stop reading a page past this size
     "content_xpath": '//*[@id="content"]/div/div/section[3]/div/div/div[1]/div/div/div[5]/div',
     "title_selectors": ["h1.jeg_post_title", "h1.entry-title", "title"],
     "date_selectors": [
@@ -45,36 +55,93 @@ def get_now():
     now = datetime.now()
     return {"date": now.strftime("%Y-%m-%d"), "time": now.strftime("%H:%M:%S")}
 
+# compiled xpath per settings string
+@lru_cache(maxsize=16)
+def compiled_xpath(path: str) -> etree.XPath:
+    return etree.XPath(path)
+
+# meta content (date part only for timestamps) or element text
+def meta_or_text(el, date_only: bool = False) -> str:
+    if el.tag == "meta":
+        val = (el.get("content") or "").strip()
+        return val.split("T")[0] if date_only and "T" in val else val
+    return extract.text_raw(el)
+
 # grab article text
-def get_text(soup: BeautifulSoup, tree: html.HtmlElement, settings: dict) -> str:
-    txt = ""
+def get_text(tree: html.HtmlElement, settings: dict, url: str = "") -> str:
+    paras = []
     try:
-        box = tree.xpath(settings["content_xpath"])
+        box = compiled_xpath(settings["content_xpath"])(tree)
         if box:
-            ps = box[0].xpath(".//p")
-            for p in ps:
-                bits = p.xpath(".//text()")
-                para = " ".join(t.strip() for t in bits if t.strip())
+            for p in box[0].xpath(".//p"):
+                para = extract.text_joined(p)
                 if para:
-                    txt += para + "\n\n"
+                    paras.append(para)
     except Exception as e:
         print("xpath failed:", e)
 
-    if not txt.strip():
-        fallbacks = ['.jeg_post_content', '.entry-content', '.article-content', '.post-content', '.content']
-        for sel in fallbacks:
-            try:
-                block = soup.select_one(sel)
-                if block:
-                    for p in block.find_all("p"):
-                        para = p.get_text(strip=True)
-                        if para:
-                            txt += para + "\n\n"
-                    if txt.strip():
-                        break
-            except Exception:
-                continue
-    return txt.strip()
+    if not paras:
+        fallbacks = (".jeg_post_content", ".entry-content", ".article-content", ".post-content", ".content")
+        txt = profiles.field(url, "content", extract.cascade(fallbacks), tree,
+                             lambda block: "\n\n".join(p for p in extract.paragraphs(block) if p))
+        return txt.strip()
+    return "\n\n".join(paras).strip()
+
+# url is the site's home page (where unknown ids redirect to)
+def is_home(url: str, settings: dict) -> bool:
+    return url.split("#")[0].rstrip("/") == settings["base_url"].rstrip("/")
+
+# home page size, used to estimate bytes saved by not following redirects to it
+# (from the http cache if it has the page, else measured once and kept in the probe map's meta)
+def homepage_size(settings: dict, meta: dict) -> int:
+    entry = http_cache.lookup(settings["base_url"])
+    if entry and entry["size"]:
+        meta["homepage_bytes"] = entry["size"]
+    if "homepage_bytes" not in meta:
+        try:
+            meta["homepage_bytes"] = len(http_client.get(settings["base_url"], timeout=20, cache="default").content)
+        except Exception as e:
+            print("could not size home page:", e)
+            return 0
+    return meta["homepage_bytes"]
+
+# pull an article out of a page -> ("found" | "miss" | "skip", article or None)
+def parse_article(page: str | bytes, url: str, settings: dict, scrape_date: str | None = None):
+    tree = extract.parse(page)
+    if tree is None:
+        return "miss", None
+
+    # title (the site name alone means it's not an article)
+    def title_text(el) -> str:
+        t = extract.text_raw(el)
+        return "" if t == settings["name"] else t
+
+    title = profiles.field(url, "title", extract.cascade(tuple(settings["title_selectors"])), tree, title_text)
+    if not title:
+        return "miss", None
+
+    pub_date = profiles.field(url, "date", extract.cascade(tuple(settings["date_selectors"])), tree,
+                              lambda el: meta_or_text(el, date_only=True))
+    cat = profiles.field(url, "category", extract.cascade(tuple(settings["category_selectors"])), tree, meta_or_text)
+
+    # content
+    content = get_text(tree, settings, url)
+    if not content:
+        return "skip", None
+
+    # summary
+    last = max(content.rfind("."), content.rfind("!"), content.rfind("?"))
+    summary = content[:last+1] if last != -1 else content
+
+    return "found", {
+        "News_Source": settings["name"],
+        "Title": title,
+        "Source_URL": url,
+        "Publish_Date": pub_date,
+        "Category": cat,
+        "Summary": summary,
+        "Scrape_Date": scrape_date or get_now()["date"]
+    }
 
 # main scrape
 def scrape_utusan(settings: dict, num_articles: int | None = None):
@@ -82,126 +149,173 @@ def scrape_utusan(settings: dict, num_articles: int | None = None):
         settings = {**settings, "num_ids_to_check": num_articles}
 
     now_info = get_now()
-    articles = []
-    found = 0
-    skipped = 0
 
-    ids = random.sample(range(settings["id_range"][0], settings["id_range"][1]), settings["num_ids_to_check"])
-    print("trying", settings["num_ids_to_check"], "random IDs from", settings["name"])
+    # ids not probed before, biased to where articles have been found
+    probe_map = ProbeMap.load(settings["name"], settings["id_range"])
+    ids = probe_map.plan(settings["num_ids_to_check"])
+    ids_by_url = {f"{settings['base_url']}/?{settings['id_param']}={aid}": aid for aid in ids}
+    print("trying", len(ids), "IDs from", settings["name"])
 
-    for aid in ids:
-        try:
-            url = f"{settings['base_url']}/?{settings['id_param']}={aid}"
-            r = requests.get(url, timeout=20)
-            r.raise_for_status()
-
-            if r.url.rstrip("/") == settings["base_url"].rstrip("/"):
-                continue
-
-            soup = BeautifulSoup(r.text, "html.parser")
-            tree = html.fromstring(r.content)
-
-            # title
-            title = ""
-            for sel in settings["title_selectors"]:
-                try:
-                    el = soup.select_one(sel)
-                    if el:
-                        t = el.get_text().strip()
-                        if t and t != settings["name"]:
-                            title = t
-                            break
-                except Exception:
-                    continue
-            if not title:
-                continue
-
-            # date
-            pub_date = ""
-            for sel in settings["date_selectors"]:
-                try:
-                    if sel.startswith("meta["):
-                        el = soup.select_one(sel)
-                        if el and el.has_attr("content"):
-                            val = el["content"]
-                            pub_date = str(val).strip()
-                            if "T" in pub_date:
-                                pub_date = pub_date.split("T")[0]
-                            if pub_date:
-                                break
-                    else:
-                        el = soup.select_one(sel)
-                        if el:
-                            val = el.get_text()
-                            pub_date = str(val).strip()
-                            if pub_date:
-                                break
-                except Exception:
-                    continue
-
-            # category
-            cat = ""
-            for sel in settings["category_selectors"]:
-                try:
-                    if sel.startswith("meta["):
-                        el = soup.select_one(sel)
-                        if el and el.has_attr("content"):
-                            val = el["content"]
-                            cat = str(val).strip()
-                            if cat:
-                                break
-                    else:
-                        el = soup.select_one(sel)
-                        if el:
-                            val = el.get_text()
-                            cat = str(val).strip()
-                            if cat:
-                                break
-                except Exception:
-                    continue
-
-            # content
-            content = get_text(soup, tree, settings)
-            if not content:
-                skipped += 1
-                print("skip ID", aid, "- no content")
-                continue
-
-            # summary
-            last = max(content.rfind("."), content.rfind("!"), content.rfind("?"))
-            summary = content[:last+1] if last != -1 else content
-
-            articles.append({
-                "News_Source": settings["name"],
-                "Title": title,
-                "Source_URL": r.url,
-                "Publish_Date": pub_date,
-                "Category": cat,
-                "Summary": summary,
-                "Scrape_Date": now_info["date"]
-            })
-
-            found += 1
-            print("found:", aid, "-", title[:50], "...")
-            time.sleep(random.uniform(1.0, 2.5))
-
-        except RequestException as e:
-            print("request failed for", aid, e)
-            time.sleep(3)
-        except Exception as e:
-            print("error with", aid, e)
-            time.sleep(1.5)
+    metrics = {"short_circuited": 0, "capped": 0, "parsed": 0, "parse_seconds": 0.0}
+    metrics_lock = threading.Lock()
+
+    # parse a page, timing it
+    def parse_timed(page: bytes, url: str):
+        t0 = time.perf_counter()
+        res = parse_article(page, url, settings, now_info["date"])
+        with metrics_lock:
+            metrics["parsed"] += 1
+            metrics["parse_seconds"] += time.perf_counter() - t0
+        return res
+
+    # scrape one id (errors are raised so the scheduler backs off)
+    def scrape_id(url: str):
+        aid = ids_by_url[url]
+        r, body = http_client.get_capped(url, settings["max_bytes"], kind="article", timeout=20)
+
+        # unknown ids redirect to the home page - no need to download it;
+        # articles redirect to their permalink, read with the same cap
+        for _ in range(MAX_REDIRECTS):
+            if not r.is_redirect:
+                break
+            target = urljoin(r.url or url, r.headers.get("Location", ""))
+            if is_home(target, settings):
+                with metrics_lock:
+                    metrics["short_circuited"] += 1
+                return "miss", None
+            r, body = http_client.get_capped(target, settings["max_bytes"], kind="article", timeout=20)
+        if r.is_redirect:
+            raise RuntimeError(f"more than {MAX_REDIRECTS} redirects from {url}")
+        r.raise_for_status()
+
+        if is_home(r.url, settings):
+            return "miss", None
+        if body is None:
+            print("skip ID", aid, "- page over", settings["max_bytes"], "bytes")
+            with metrics_lock:
+                metrics["capped"] += 1
+            return "skip", None
+
+        status, article = parse_timed(body, r.url)
+        if status == "skip":
+            print("skip ID", aid, "- no content")
+        if status != "found":
+            return status, None
 
+        print("found:", aid, "-", article["Title"][:50], "...")
+        return "found", article
+
+    # same host for every id, so this paces requests and backs off after errors
+    results = DomainScheduler(workers=1).run(list(ids_by_url), scrape_id)
+
+    articles = [res[1] for res in results if res and res[0] == "found"]
+    found = len(articles)
+    skipped = sum(1 for res in results if res and res[0] == "skip")
+
+    # failed requests stay unknown so they are tried again later
+    rate = probe_map.record({aid: res[0] if res else None for aid, res in zip(ids, results)})
+    short = metrics["short_circuited"]
+    home_bytes = homepage_size(settings, probe_map.meta) if short else 0
+    probe_map.save()
+    history = probe_map.summary()
+    print(f"articles per request: {rate:.3f} this run, {history['articles_per_request']:.3f} overall "
+          f"({history['probed_ids']} ids probed)")
+
+    # what skipping redirects to the home page saved
+    avg_parse = metrics["parse_seconds"] / metrics["parsed"] if metrics["parsed"] else 0.0
+    probe = {
+        "misses_short_circuited": short,
+        "pages_capped": metrics["capped"],
+        "homepage_bytes": home_bytes,
+        "bytes_saved": short * home_bytes,
+        "parse_seconds_saved": round(short * avg_parse, 3)
+    }
+    print(f"short-circuited {short} misses, ~{probe['bytes_saved'] / 1024:.0f} KB "
+          f"and ~{probe['parse_seconds_saved']:.2f}s parsing saved")
+
+    profiles.save()
+    df = pd.DataFrame(articles) if articles else pd.DataFrame()
+    return {"dataframe": df, "articles_found": found, "articles_excluded": skipped,
+            "requests": len(ids), "articles_per_request": rate, "explorer": history, "probe": probe}
+
+# settings for an outlet read through its sitemaps (utusan selectors work as a start, profiles learn the rest)
+def outlet_settings(name: str, feed_url: str) -> dict:
+    parts = urlsplit(feed_url)
+    return {**UTUSAN, "name": name, "base_url": f"{parts.scheme}://{parts.netloc}"}
+
+# scrape new article urls listed in the outlets' sitemaps
+def scrape_sitemaps(sources: list[dict] | None = None, max_urls: int = sitemaps.MAX_URLS):
+    sources = sources or scraper_quick.news
+    now_info = get_now()
+    state = sitemaps.load_state()
+
+    # new urls per outlet, minus anything already scraped
+    settings_by_url = {}
+    for src in sources:
+        settings = outlet_settings(src["name"], src["url"])
+        urls = frontier.add(sitemaps.new_urls(settings["base_url"], state, max_urls))
+        done = frontier.fetched(urls)
+        todo = [u for u in urls if u not in done]
+        print(f"{src['name']}: {len(urls)} new in sitemaps, {len(todo)} not scraped yet")
+        for u in todo:
+            settings_by_url[u] = settings
+
+    def scrape_url(url: str):
+        settings = settings_by_url[url]
+        r = http_client.get(url, timeout=20, cache="article")
+        r.raise_for_status()
+        status, article = parse_article(r.content, r.url, settings, now_info["date"])
+        if status == "found":
+            print("found:", article["Title"][:50], "...")
+        return status, article
+
+    # paced per outlet
+    results = DomainScheduler().run(list(settings_by_url), scrape_url)
+    articles = [res[1] for res in results if res and res[0] == "found"]
+    failed = [u for u, res in zip(settings_by_url, results) if not res or res[0] != "found"]
+    frontier.mark(failed, frontier.FAILED)
+
+    # state is saved after scraping so an interrupted run reads the same urls again
+    sitemaps.save_state(state)
+    profiles.save()
+
+    found = len(articles)
+    print(f"sitemaps: {found} articles from {len(results)} requests")
     df = pd.DataFrame(articles) if articles else pd.DataFrame()
-    return {"dataframe": df, "articles_found": found, "articles_excluded": skipped}
+    return {"dataframe": df, "articles_found": found, "articles_excluded": len(results) - found,
+            "requests": len(results), "articles_per_request": found / len(results) if results else 0.0}
+
+# append rows to a daily csv (a second run the same day adds to it; ids / urls already done aren't scraped again)
+def append_csv(df: pd.DataFrame, fname: Path):
+    if fname.exists():
+        cols = list(pd.read_csv(fname, nrows=0).columns)
+        df = df.reindex(columns=cols + [c for c in df.columns if c not in cols])
+        if len(df.columns) > len(cols):
+            print("new columns not in", fname, "dropped:", list(df.columns[len(cols):]))
+            df = df[cols]
+    df.to_csv(fname, mode="a", header=not fname.exists(), index=False)
 
 # run directly
 if __name__ == "__main__":
-    res = scrape_utusan(UTUSAN)
+    parser = argparse.ArgumentParser(description="scrape full articles into data/raw/news_id")
+    parser.add_argument("--sitemap", action="store_true", help="read new urls from outlet sitemaps instead of probing ids")
+    parser.add_argument("--num", type=int, default=None, help="ids to probe, or max urls per outlet with --sitemap")
+    args = parser.parse_args()
+
+    if args.sitemap:
+        res = scrape_sitemaps(max_urls=args.num or sitemaps.MAX_URLS)
+        fname = save_folder / f"malay_news_sitemap_{get_now()['date']}.csv"
+    else:
+        res = scrape_utusan(UTUSAN, args.num)
+        fname = save_folder / f"malay_news_{get_now()['date']}.csv"
+
     if not res["dataframe"].empty:
         print("\nscraped", res["articles_found"], "articles")
-        fname = save_folder / f"malay_news_{get_now()['date']}.csv"
-        res["dataframe"].to_csv(fname, index=False)
+        append_csv(res["dataframe"], fname)
+        frontier.mark(res["dataframe"]["Source_URL"].dropna().tolist(), frontier.DONE, "news_id")
+        dedupe.assign_frame(res["dataframe"], "news_id")
+        fts.refresh("news_id")
         print("saved to", fname)
     else:
         print("no articles found")
+    http_client.print_stats()
@@ -3,21 +3,29 @@
 scrape news based on news feed
 1. set links
 2. set scrape
-3. set parse
-4. scrape and parse
-5. save as malay_news_*.csv file into data/raw/news_feed
+3. set parse (streamed with iterparse, namespace-aware)
+4. scrape and parse, all feeds at once (paced per host by politeness.py)
+5. keep only unseen items (guid or canonical link), stop at each feed's last pubDate
+6. append to malay_news_*.csv file in data/raw/news_feed, state in data/crawl/feeds.json
 """
-import requests
 import pandas as pd
 import xml.etree.ElementTree as ET
-import re, time
-from datetime import datetime
+import io, json, re
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from pipeline import frontier, http_client, dedupe, fts
+from pipeline.politeness import DomainScheduler
+from utils import file_lock
 
 # folder to save csv
 save_folder = Path("data/raw/news_feed")
 save_folder.mkdir(parents=True, exist_ok=True)
 
+# per-feed state
+state_file = Path("data/crawl/feeds.json")
+state_file.parent.mkdir(parents=True, exist_ok=True)
+
 # rss feeds
 news = [
     {"name": "Utusan Malaysia", "url": "https://www.utusan.com.my/feed/"},
@@ -27,6 +35,28 @@ news = [
     {"name": "Astro Awani", "url": "https://www.astroawani.com/feeds/posts/default?alt=rss"}
 ]
 
+# feed item fields, in order of preference (namespace-aware)
+NS = {
+    "content": "{http://purl.org/rss/1.0/modules/content/}",
+    "dc": "{http://purl.org/dc/elements/1.1/}",
+    "atom": "{http://www.w3.org/2005/Atom}"
+}
+item_fields = {
+    "title": ["title", NS["atom"] + "title"],
+    "link": ["link", NS["atom"] + "link"],
+    "guid": ["guid", NS["atom"] + "id"],
+    "date": ["pubDate", NS["dc"] + "date", NS["atom"] + "published", NS["atom"] + "updated", "date"],
+    "category": ["category", NS["dc"] + "subject", NS["atom"] + "category"],
+    "summary": ["description", NS["content"] + "encoded", NS["atom"] + "summary", NS["atom"] + "content", "content"]
+}
+
+# stop reading a feed after this many items older than its high-water mark
+STOP_AFTER = 5
+# items this much older than the high-water mark still count (late or back-dated posts, seen keys catch repeats)
+LATE_GRACE = 60 * 60
+# keys remembered per feed (covers items that keep the same pubDate)
+SEEN_KEEP = 1000
+
 # get date/time now
 def get_now():
     now = datetime.now()
@@ -48,98 +78,159 @@ def clean_summary(txt):
         txt = txt[:last+1]
     return txt
 
-# scrape all feeds
-def scrape_news(sources=None):
+# feed state: high-water pubDate + recently seen keys per feed
+# (the poller and manual runs share it, so reads and writes hold a file lock)
+def _read_state() -> dict:
+    try:
+        return json.loads(state_file.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+def load_state() -> dict:
+    with file_lock(state_file):
+        return _read_state()
+
+# one feed's saved state + this run's: later high-water, both runs' seen keys
+def merge_feed(old: dict, new: dict) -> dict:
+    out = {**old, **new}
+    out["high_water"] = max(old.get("high_water", ""), new.get("high_water", ""))
+    out["seen"] = list(dict.fromkeys(old.get("seen", []) + new.get("seen", [])))[-SEEN_KEEP:]
+    return out
+
+# merge into the state on disk (another run may have saved since this one loaded)
+def save_state(state: dict):
+    with file_lock(state_file):
+        current = _read_state()
+        for name, feed in state.items():
+            current[name] = merge_feed(current.get(name, {}), feed)
+        tmp = state_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(current, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(state_file)
+
+# pubDate / dc:date / atom date -> utc iso string ("" if unreadable)
+def parse_date(txt: str | None) -> str:
+    if not txt:
+        return ""
+    try:
+        dt = parsedate_to_datetime(txt)
+    except (TypeError, ValueError):
+        try:
+            dt = datetime.fromisoformat(txt.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return ""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+# first non-empty value among the candidate tags (atom keeps link/category in attributes)
+def field_value(item, tags: list[str]) -> str | None:
+    for tag in tags:
+        for el in item.findall(tag):
+            val = el.text or el.get("href") or el.get("term")
+            if val and val.strip():
+                return val.strip()
+    return None
+
+# stream items out of a feed body, one at a time
+def iter_items(content: bytes):
+    for _, el in ET.iterparse(io.BytesIO(content), events=("end",)):
+        if el.tag in ("item", NS["atom"] + "entry"):
+            yield {name: field_value(el, tags) for name, tags in item_fields.items()}
+            el.clear()
+
+# item key: guid, else canonical link
+def item_key(fields: dict) -> str:
+    return (fields.get("guid") or "").strip() or frontier.canonical_url(fields.get("link") or "")
+
+# fetch one feed, return only items not seen before
+def read_feed(src: dict, feed_state: dict, scrape_date: str, cache: str = "rss") -> list[dict]:
+    print("fetching from", src["name"])
+    r = http_client.get(src["url"], timeout=10, cache=cache)
+    r.raise_for_status()
+
+    high_water = feed_state.get("high_water", "")
+    since = ""
+    if high_water:
+        cut = datetime.fromisoformat(high_water) - timedelta(seconds=LATE_GRACE)
+        since = cut.strftime("%Y-%m-%dT%H:%M:%S")
+    seen = set(feed_state.get("seen", []))
+    articles, keys, old_in_row = [], [], 0
+    try:
+        for fields in iter_items(r.content):
+            try:
+                key = item_key(fields)
+                published = parse_date(fields["date"])
+                # feeds are newest first: a run of old items means the rest is old too
+                if since and published and published < since:
+                    old_in_row += 1
+                    if old_in_row >= STOP_AFTER:
+                        break
+                    continue
+                old_in_row = 0
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                keys.append(key)
+                articles.append({
+                    "News_Source": src["name"],
+                    "Title": fields["title"] or "No Title",
+                    "Source_URL": fields["link"] or "",
+                    "Publish_Date": fields["date"],
+                    "Category": fields["category"],
+                    "Summary": clean_summary(fields["summary"]),
+                    "Scrape_Date": scrape_date
+                })
+                if published > high_water:
+                    high_water = published
+            except Exception as e:
+                print("error processing item from", src["name"], e)
+    except ET.ParseError as e:
+        print("could not parse xml for", src["name"], "-", e)
+        if not articles:
+            raise
+
+    feed_state["high_water"] = high_water
+    feed_state["seen"] = (feed_state.get("seen", []) + keys)[-SEEN_KEEP:]
+    print("done with", src["name"], "-", len(articles), "new")
+    return articles
+
+# scrape all feeds (concurrently, one request per feed host at a time)
+def scrape_news(sources=None, state: dict | None = None):
     if sources is None:
         sources = news
+    if state is None:
+        state = load_state()
 
     now_info = get_now()
-    articles = []
-    failed = []
+    by_url = {src["url"]: src for src in sources}
 
-    for src in sources:
-        try:
-            print("fetching from", src["name"])
-            r = requests.get(src["url"], timeout=10)
-            r.raise_for_status()
-            content = r.content
+    def fetch(url: str):
+        src = by_url[url]
+        return read_feed(src, state.setdefault(src["name"], {}), now_info["date"])
 
-            root = None
-            try:
-                root = ET.fromstring(content)
-            except ET.ParseError:
-                for enc in ["utf-8"]:
-                    try:
-                        decoded = content.decode(enc)
-                        root = ET.fromstring(decoded)
-                        break
-                    except (UnicodeDecodeError, ET.ParseError):
-                        continue
-
-            if root is None:
-                print("could not parse xml for", src["name"])
-                failed.append(src["name"])
-                continue
-
-            for item in root.findall(".//item"):
-                try:
-                    title_el = item.find("title")
-                    title = title_el.text.strip() if title_el is not None and title_el.text else "No Title"
-
-                    link_el = item.find("link")
-                    link = link_el.text.strip() if link_el is not None and link_el.text else ""
-
-                    pub_date = None
-                    for tag in ["pubDate", "dc:date", "date"]:
-                        d = item.find(tag)
-                        if d is not None and d.text:
-                            pub_date = d.text.strip()
-                            break
-
-                    cat = None
-                    for tag in ["category", "dc:subject"]:
-                        c = item.find(tag)
-                        if c is not None and c.text:
-                            cat = c.text.strip()
-                            break
-
-                    summary = ""
-                    for tag in ["description", "content:encoded", "content"]:
-                        s = item.find(tag)
-                        if s is not None and s.text:
-                            summary = s.text
-                            break
-
-                    clean_sum = clean_summary(summary)
-
-                    articles.append({
-                        "News_Source": src["name"],
-                        "Title": title,
-                        "Source_URL": link,
-                        "Publish_Date": pub_date,
-                        "Category": cat,
-                        "Summary": clean_sum,
-                        "Scrape_Date": now_info["date"]
-                    })
-                except Exception as e:
-                    print("error processing item from", src["name"], e)
-
-            print("done with", src["name"])
-            time.sleep(1)
-
-        except Exception as e:
-            print("error with", src["name"], e)
-            failed.append(src["name"])
+    results = DomainScheduler(workers=len(by_url) or 1).run(list(by_url), fetch)
+    articles = [a for res in results if res for a in res]
+    failed = [by_url[u]["name"] for u, res in zip(by_url, results) if res is None]
 
     df = pd.DataFrame(articles) if articles else pd.DataFrame()
-    return {"dataframe": df, "failed_sources": failed}
+    return {"dataframe": df, "failed_sources": failed, "state": state}
+
+# append new items to the day's file (one file per day, later runs append)
+def store(df: pd.DataFrame) -> Path:
+    fname = save_folder / f"malay_news_{get_now()['date']}.csv"
+    df.to_csv(fname, mode="a", header=not fname.exists(), index=False)
+    frontier.mark(df["Source_URL"].dropna().tolist(), frontier.DONE, "news_feed")
+    dedupe.assign_frame(df, "news_feed")
+    fts.refresh("news_feed")
+    return fname
 
 if __name__ == "__main__":
     res = scrape_news()
     if not res["dataframe"].empty:
-        print("\nscraped", len(res["dataframe"]), "articles")
-        fname = save_folder / f"malay_news_{get_now()['date']}.csv"
-        res["dataframe"].to_csv(fname, index=False)
-        print("saved to", fname)
+        print("\n", len(res["dataframe"]), "new articles")
+        print("saved to", store(res["dataframe"]))
     else:
-        print("no articles scraped")
+        print("no new articles")
+    # state only moves forward once the items are stored
+    save_state(res["state"])
+    http_client.print_stats()
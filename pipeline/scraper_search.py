@@ -2,25 +2,40 @@
 """
 scrape news based on query
 1. set scrape
-2. set parse
-3. scrape and parse
-4. save as search_*.csv file into data/raw/search
+2. set parse (extract.py - one lxml parse, compiled selectors; profiles.py - learned selector per domain)
+3. scrape and parse (skip urls already fetched, reuse their rows, polite per domain)
+4. append each article + journal entry as soon as it's parsed (resumable)
+5. compact into search_*.csv file in data/raw/search
 """
-import requests
 import pandas as pd
-from bs4 import BeautifulSoup
 from datetime import datetime
 from pathlib import Path
-import time, random, re
+import json, random, re, threading
+from pipeline import frontier, http_client, extract, profiles, dedupe, fts
+from pipeline.politeness import DomainScheduler
 
 # folders
 crawl_folder = Path("data/crawl")
 save_folder = Path("data/raw/search")
+news_id_folder = Path("data/raw/news_id")
 proc_folder = Path("data/processed")
 last_query_file = proc_folder / "last_query.txt"
+partial_folder = save_folder / ".partial"
+
+# selectors, best first (compiled once by extract.cascade)
+title_selectors = ("h1", "title")
+date_selectors = ("time", ".date", "span.posted-on",
+                  "meta[property='article:published_time']", "meta[name='date']")
+category_selectors = (".category", "a[rel='category tag']", "meta[property='article:section']")
+content_selectors = (".article-content", ".entry-content", ".post-content", "article", ".content",
+                     "#mw-content-text", "#\\31")
+
+# pages scraped at the same time (different domains only)
+DEFAULT_WORKERS = 4
 
 # make sure folders exist
 save_folder.mkdir(parents=True, exist_ok=True)
+partial_folder.mkdir(parents=True, exist_ok=True)
 proc_folder.mkdir(parents=True, exist_ok=True)
 
 # load links from file
@@ -28,7 +43,7 @@ def load_links() -> list[str]:
     f = crawl_folder / "link_list.txt"
     if not f.exists():
         raise FileNotFoundError("no links file found")
-    return f.read_text(encoding="utf-8").splitlines()
+    return frontier.dedupe(f.read_text(encoding="utf-8").splitlines())
 
 # clean filename
 def clean_name(txt: str, max_len: int = 100) -> str:
@@ -42,68 +57,38 @@ def get_last_query() -> str:
             return q
     return "default"
 
-# scrape one page
+# paragraphs of a content block (whole block text if it has none)
+def block_text(block) -> str:
+    ps = extract.paragraphs(block)
+    if not ps:
+        return extract.text_joined(block)
+    return "\n\n".join(p for p in ps if p)
+
+# scrape one page (fetch errors are raised, so the scheduler backs the domain off)
 def scrape_page(url: str) -> dict | None:
-    try:
-        headers = {
-            "User-Agent": random.choice([
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)",
-                "Mozilla/5.0 (X11; Linux x86_64)"
-            ])
-        }
-        r = requests.get(url, timeout=20, headers=headers)
-        r.raise_for_status()
-    except Exception as e:
-        print("fail to fetch", url, e)
+    headers = {
+        "User-Agent": random.choice([
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)",
+            "Mozilla/5.0 (X11; Linux x86_64)"
+        ])
+    }
+    r = http_client.get(url, timeout=20, headers=headers, cache="article")
+    r.raise_for_status()
+    return parse_page(url, r.content)
+
+# pull fields out of a fetched page
+def parse_page(url: str, page: str | bytes) -> dict | None:
+    tree = extract.parse(page)
+
+    if tree is None:
+        print("no content from", url)
         return None
 
-    soup = BeautifulSoup(r.text, "html.parser")
-
-    # title
-    title = ""
-    for sel in ["h1", "title"]:
-        el = soup.select_one(sel)
-        if el:
-            title = el.get_text(strip=True)
-            break
-
-    # date
-    pub_date = ""
-    for sel in ["time", ".date", "span.posted-on",
-                "meta[property='article:published_time']",
-                "meta[name='date']"]:
-        el = soup.select_one(sel)
-        if el:
-            pub_date = el.get("content", "").strip() if el.has_attr("content") else el.get_text(strip=True)
-            if pub_date:
-                break
-
-    # category
-    cat = ""
-    for sel in [".category", "a[rel='category tag']", "meta[property='article:section']"]:
-        el = soup.select_one(sel)
-        if el:
-            cat = el.get("content", "").strip() if el.has_attr("content") else el.get_text(strip=True)
-            if cat:
-                break
-
-    # content
-    content = ""
-    for sel in [".article-content", ".entry-content", ".post-content", "article", ".content",
-                "#mw-content-text", "#\\31"]:
-        block = soup.select_one(sel)
-        if block:
-            ps = [p.get_text(strip=True) for p in block.find_all("p")]
-            if not ps:
-                txt = block.get_text(" ", strip=True)
-                if txt:
-                    content = txt
-                    break
-            else:
-                content = "\n\n".join(p for p in ps if p)
-                if content:
-                    break
+    title = profiles.field(url, "title", extract.cascade(title_selectors), tree, extract.text_strip)
+    pub_date = profiles.field(url, "date", extract.cascade(date_selectors), tree, extract.content_or_text)
+    cat = profiles.field(url, "category", extract.cascade(category_selectors), tree, extract.content_or_text)
+    content = profiles.field(url, "content", extract.cascade(content_selectors), tree, block_text)
 
     if not content:
         print("no content from", url)
@@ -117,26 +102,110 @@ def scrape_page(url: str) -> dict | None:
         "Content": content
     }
 
+# rows for urls we already scraped (search and news_id csvs hold full text)
+def known_rows(urls: list[str]) -> dict[str, dict]:
+    want = {frontier.url_key(u): u for u in urls}
+    rows = {}
+    if not want:
+        return rows
+    for folder in (save_folder, news_id_folder):
+        for f in sorted(folder.glob("*.csv")):
+            try:
+                df = pd.read_csv(f, dtype=str).fillna("")
+            except Exception:
+                continue
+            if "Source_URL" not in df.columns:
+                continue
+            for row in df.to_dict("records"):
+                url = want.get(frontier.url_key(row["Source_URL"]))
+                content = row.get("Content") or row.get("Summary") or ""
+                if url and url not in rows and content:
+                    rows[url] = {
+                        "Title": row.get("Title", ""),
+                        "Source_URL": row["Source_URL"],
+                        "Publish_Date": row.get("Publish_Date", ""),
+                        "Category": row.get("Category", ""),
+                        "Content": content
+                    }
+    return rows
+
+# part file (articles so far) + journal (urls done) for a query
+def partial_paths(safe_q: str) -> tuple[Path, Path]:
+    return partial_folder / f"search_{safe_q}.jsonl", partial_folder / f"search_{safe_q}.journal"
+
+# load what an interrupted run already finished
+def load_partial(safe_q: str) -> tuple[dict[str, dict], set[str]]:
+    part, journal = partial_paths(safe_q)
+    rows, done = {}, set()
+    if part.exists():
+        for line in part.read_text(encoding="utf-8").splitlines():
+            try:
+                row = json.loads(line)
+                rows[row["Source_URL"]] = row
+            except Exception:
+                continue  # half-written last line
+    if journal.exists():
+        for line in journal.read_text(encoding="utf-8").splitlines():
+            url, _, status = line.partition("\t")
+            # failed urls are tried again on resume
+            if url.strip() and status.strip() == "ok":
+                done.add(url.strip())
+    return rows, done
+
 # main run
-def run_scraper(query: str | None = None):
+def run_scraper(query: str | None = None, workers: int = DEFAULT_WORKERS):
     if query is None:
         query = get_last_query()
+    safe_q = clean_name(query)
     links = load_links()
     print("loaded", len(links), "links")
 
-    articles = []
-    today = datetime.now().strftime("%Y-%m-%d")
+    # pick up where an interrupted run stopped
+    part_rows, done = load_partial(safe_q)
+    if done:
+        print("resuming,", len(done), "links already done")
 
-    for i, url in enumerate(links, start=1):
-        data = scrape_page(url)
-        if data:
-            articles.append(data)
-        time.sleep(random.uniform(1.0, 2.5))
+    # don't download articles we already have
+    reused = known_rows(list(frontier.fetched(links, ["search", "news_id"])))
+    if reused:
+        print("reusing", len(reused), "already scraped articles")
 
-    df = pd.DataFrame(articles)
+    today = datetime.now().strftime("%Y-%m-%d")
+    part_file, journal_file = partial_paths(safe_q)
+    lock = threading.Lock()
+
+    # journal one page and mark it in the frontier
+    def record(url: str, data: dict | None):
+        with lock:
+            if data:
+                with part_file.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(data, ensure_ascii=False) + "\n")
+                part_rows[url] = data
+            with journal_file.open("a", encoding="utf-8") as f:
+                f.write(f"{url}\t{'ok' if data else 'fail'}\n")
+        if data:
+            frontier.mark(url, frontier.DONE, "search")
+        else:
+            frontier.mark(url, frontier.FAILED)
+
+    # scrape one page and persist it straight away (a failed fetch is re-raised for the scheduler)
+    def scrape_and_save(url: str) -> dict | None:
+        try:
+            data = scrape_page(url)
+        except Exception:
+            record(url, None)
+            raise
+        record(url, data)
+        return data
+
+    # one queue per domain, domains in parallel
+    todo = [url for url in links if url not in reused and url not in done]
+    DomainScheduler(workers=workers).run(todo, scrape_and_save)
+
+    # compact: keep link order
+    articles = [reused.get(url) or part_rows.get(url) for url in links]
+    df = pd.DataFrame([a for a in articles if a])
     if not df.empty:
-        safe_q = clean_name(query)
-
         # remove any older CSVs for this query
         for old in save_folder.glob(f"search_{safe_q}_*.csv"):
             try:
@@ -149,9 +218,17 @@ def run_scraper(query: str | None = None):
         out_path = save_folder / f"search_{safe_q}_{today}.csv"
         df.to_csv(out_path, index=False, encoding="utf-8")
         print("saved", len(df), "articles to", out_path)
+        dedupe.assign_frame(df, "search")
+        fts.refresh("search")
     else:
         print("no articles scraped")
 
+    # run finished, drop the part file and journal
+    for f in (part_file, journal_file):
+        f.unlink(missing_ok=True)
+    profiles.save()
+    http_client.print_stats()
+
 if __name__ == "__main__":
     save_folder.mkdir(parents=True, exist_ok=True)
     run_scraper()
@@ -0,0 +1,112 @@
+# pipeline/search_backends.py
+"""
+search backends for duckduckgo
+1. set backend registry (name -> search function)
+2. http backend (post to html.duckduckgo.com, parse with lxml)
+3. selenium backend (pooled headless edge from driver_pool.py, optional fallback)
+4. try backends in order until one gives links
+"""
+from urllib.parse import urljoin
+import time
+from lxml import html
+from pipeline import http_client
+
+# html-only duckduckgo endpoint
+DDG_URL = "https://html.duckduckgo.com/html/"
+
+# order to try backends in
+default_order = ["http", "selenium"]
+
+# seconds for one search, shared by the backends tried
+SEARCH_TIMEOUT = 15
+
+# result links, skipping sponsored results
+RESULT_XPATH = (
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' result ')"
+    " and not(contains(@class, 'result--ad'))]"
+    "//a[contains(concat(' ', normalize-space(@class), ' '), ' result__a ')]/@href"
+)
+
+# parse a duckduckgo result page
+def parse_results(page: str | bytes, max_results: int = 10) -> list[str]:
+    if not page:
+        return []
+    tree = html.fromstring(page)
+    urls = []
+    for h in tree.xpath(RESULT_XPATH):
+        h = h.strip()
+        if not h:
+            continue
+        # hrefs are protocol-relative (//duckduckgo.com/l/?uddg=...)
+        urls.append(urljoin(DDG_URL, h))
+        if len(urls) >= max_results:
+            break
+    return urls
+
+# plain http, no browser
+def http_search(query: str, max_results: int = 10, timeout: float = SEARCH_TIMEOUT) -> list[str]:
+    r = http_client.post(
+        DDG_URL,
+        data={"q": query},
+        timeout=timeout,
+        headers={"Referer": DDG_URL}
+    )
+    r.raise_for_status()
+    return parse_results(r.content, max_results)
+
+# headless edge from the shared pool (kept as fallback)
+def selenium_search(query: str, max_results: int = 10, timeout: float = SEARCH_TIMEOUT) -> list[str]:
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from pipeline import driver_pool
+
+    urls = []
+    with driver_pool.get_pool().driver() as driver:
+        driver.get(DDG_URL)
+        box = driver.find_element(By.NAME, "q")
+        box.send_keys(query)
+        box.submit()
+
+        # wait for results instead of a fixed sleep
+        sel = (By.CSS_SELECTOR, "div.result a.result__a")
+        try:
+            WebDriverWait(driver, timeout).until(EC.presence_of_element_located(sel))
+        except Exception:
+            return urls
+
+        for r in driver.find_elements(*sel)[:max_results]:
+            h = r.get_attribute("href")
+            if h:
+                urls.append(h)
+
+    return urls
+
+# name -> search function
+backends = {
+    "http": http_search,
+    "selenium": selenium_search
+}
+
+# try each backend until one returns links (each gets the time the earlier ones left)
+def search(query: str, max_results: int = 10, order: list[str] | None = None,
+           timeout: float = SEARCH_TIMEOUT) -> list[str]:
+    end = time.monotonic() + timeout
+    for name in order or default_order:
+        fn = backends.get(name)
+        if fn is None:
+            print("unknown search backend", name)
+            continue
+        left = end - time.monotonic()
+        if left <= 0:
+            print(f"no time left for {name} search")
+            break
+        try:
+            urls = fn(query, max_results, left)
+        except Exception as e:
+            print(f"{name} search failed:", e)
+            continue
+        if urls:
+            return urls
+        print(f"{name} search gave no results")
+    return []
@@ -0,0 +1,187 @@
+# pipeline/sitemaps.py
+"""
+incremental sitemap reader
+1. find sitemaps from robots.txt (or /sitemap_index.xml, /sitemap.xml)
+2. stream each sitemap through iterparse, one entry at a time
+3. remember the lastmod seen per sitemap in data/crawl/sitemaps.json
+4. only read sitemaps that changed (or still have urls left over from the cap), only return urls newer than last time
+"""
+from pathlib import Path
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+import gzip, json
+import xml.etree.ElementTree as ET
+
+from pipeline import http_client
+
+# state file
+crawl_folder = Path("data/crawl")
+crawl_folder.mkdir(parents=True, exist_ok=True)
+state_file = crawl_folder / "sitemaps.json"
+
+# per site and run
+MAX_SITEMAPS = 5        # child sitemaps read
+MAX_URLS = 200          # article urls returned
+
+def load_state() -> dict:
+    try:
+        return json.loads(state_file.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+def save_state(state: dict):
+    tmp = state_file.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    tmp.replace(state_file)
+
+# lastmod -> utc iso string, so string comparison works across formats
+def norm_lastmod(txt: str | None) -> str:
+    txt = (txt or "").strip()
+    if not txt:
+        return ""
+    try:
+        dt = datetime.fromisoformat(txt.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return txt
+
+# sitemap urls for a site
+def find_sitemaps(base_url: str) -> list[str]:
+    parts = urlsplit(base_url)
+    root = f"{parts.scheme}://{parts.netloc}"
+    try:
+        r = http_client.get(f"{root}/robots.txt", timeout=10, retries=0)
+        if r.status_code == 200:
+            found = [line.split(":", 1)[1].strip() for line in r.text.splitlines()
+                     if line.lower().startswith("sitemap:")]
+            if found:
+                return found
+    except Exception as e:
+        print("robots.txt failed for", root, "-", e)
+    return [f"{root}/sitemap_index.xml", f"{root}/sitemap.xml"]
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+# stream one sitemap -> ("sitemap" | "url", loc, lastmod)
+def iter_entries(url: str, timeout: float = 20):
+    r = http_client.request("GET", url, stream=True, timeout=timeout)
+    try:
+        if r.status_code != 200:
+            print("sitemap", url, "returned", r.status_code)
+            return
+        r.raw.decode_content = True
+        src = r.raw
+        if url.endswith(".gz") and "xml" not in r.headers.get("Content-Type", ""):
+            src = gzip.GzipFile(fileobj=r.raw)
+        for _, el in ET.iterparse(src, events=("end",)):
+            kind = _local(el.tag)
+            if kind not in ("url", "sitemap"):
+                continue
+            loc = lastmod = ""
+            for child in el.iter():
+                name = _local(child.tag)
+                if name == "loc" and not loc:
+                    loc = (child.text or "").strip()
+                elif name in ("lastmod", "publication_date") and not lastmod:
+                    lastmod = norm_lastmod(child.text)
+            el.clear()
+            if loc:
+                yield kind, loc, lastmod
+    except ET.ParseError as e:
+        print("bad sitemap xml", url, "-", e)
+    finally:
+        r.close()
+
+# read one sitemap (index or url set)
+# -> url sets with their candidate (lastmod, url) pairs, oldest first, and the indexes above them:
+#    [(sitemap_url, pairs, first_visit, parents)]
+#    "newest" is not moved here, only for urls new_urls actually returns
+def walk(url: str, state: dict, listed_lastmod: str = "", depth: int = 0, max_urls: int = MAX_URLS,
+         parents: tuple[str, ...] = ()) -> list[tuple[str, list[tuple[str, str]], bool, tuple[str, ...]]]:
+    seen = state.setdefault(url, {})
+    first_time = not seen
+    seen.pop("pending", None)      # set again by new_urls if urls are left over
+    children, urls = [], []
+    for kind, loc, lastmod in iter_entries(url):
+        (children if kind == "sitemap" else urls).append((lastmod, loc))
+    seen["lastmod"] = listed_lastmod or max((m for m, _ in children + urls), default="")
+
+    # sitemap index: only children that changed since last read
+    if children:
+        if depth >= 2:
+            return []
+        children.sort(reverse=True)
+        todo = [(m, loc) for m, loc in children
+                if not m or m > state.get(loc, {}).get("lastmod", "")
+                or state.get(loc, {}).get("pending")][:MAX_SITEMAPS]
+        if first_time:
+            # first visit: older children are history, start from the newest few
+            for m, loc in children[MAX_SITEMAPS:]:
+                state.setdefault(loc, {"lastmod": m, "newest": m})
+        out = []
+        for m, loc in todo:
+            out += walk(loc, state, m, depth + 1, max_urls, parents + (url,))
+        return out
+
+    # url set: urls newer than the last one returned
+    newest = seen.get("newest", "")
+    fresh = sorted((m, loc) for m, loc in urls if not newest or not m or m > newest)
+    if not newest:
+        fresh = fresh[-max_urls:]      # first visit: newest ones only (older ones are history)
+    return [(url, fresh, not newest, parents)] if fresh else []
+
+# move a url set's "newest" past the urls taken from it (oldest-first prefix of its candidates)
+def _advance(seen: dict, fresh: list[tuple[str, str]], taken: int):
+    if not taken:
+        return
+    top = fresh[taken - 1][0]
+    if taken < len(fresh) and fresh[taken][0] == top:
+        # cut inside a run of equal lastmods: stop below it, the run comes back next time
+        top = max((m for m, _ in fresh[:taken] if m < top), default="")
+    if top > seen.get("newest", ""):
+        seen["newest"] = top
+
+# new article urls for a site, newest first
+#   at most max_urls; url sets share the budget in turns, each catching up oldest first,
+#   so nothing past the cap is marked seen
+def new_urls(base_url: str, state: dict, max_urls: int = MAX_URLS) -> list[str]:
+    groups = []
+    for sm in find_sitemaps(base_url):
+        try:
+            groups += walk(sm, state, max_urls=max_urls)
+        except Exception as e:
+            print("sitemap failed", sm, "-", e)
+
+    # first visits start from their newest urls, catch-ups from their oldest
+    queues = [(sm, fresh, fresh[::-1] if first else fresh) for sm, fresh, first, _ in groups]
+    taken = {sm: 0 for sm, _, _ in queues}
+    picked, seen = [], set()
+    while len(picked) < max_urls and any(taken[sm] < len(q) for sm, _, q in queues):
+        for sm, _, q in queues:
+            if len(picked) >= max_urls:
+                break
+            if taken[sm] < len(q):
+                m, loc = q[taken[sm]]
+                taken[sm] += 1
+                if loc not in seen:
+                    seen.add(loc)
+                    picked.append((m, loc))
+
+    for sm, fresh, first, parents in groups:
+        if first:
+            # only the newest were taken; everything older is history anyway
+            if taken[sm]:
+                state[sm]["newest"] = max(m for m, _ in fresh)
+        else:
+            _advance(state[sm], fresh, taken[sm])
+            if taken[sm] < len(fresh):
+                # left over past the cap: read this url set (and the indexes listing it) again next run,
+                # even though their lastmod hasn't moved
+                for loc in (sm,) + parents:
+                    state[loc]["pending"] = True
+
+    picked.sort(reverse=True)
+    return [loc for _, loc in picked]
@@ -0,0 +1,185 @@
+# pipeline/store.py
+"""
+columnar article store (parquet) in data/store
+1. one parquet part per raw csv, partitioned by store and scrape date:
+   data/store/store=<news_feed|news_id|search>/scrape_date=<yyyy-mm-dd>/<csv stem>.parquet
+2. typed schema per store, plus __srcfile__ (csv name) and __row__ (row in that csv)
+3. parts are rebuilt when their csv changes (size / mtime in _index.json) and dropped when it is deleted
+   (sync, one process at a time: _index.json.lock)
+4. read only the columns asked for, skip partitions outside the dates / files asked for
+5. or stream it batch by batch (batches)
+"""
+from pathlib import Path
+from datetime import datetime
+import json, os, re, tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from utils import file_lock
+
+# store location
+store_folder = Path("data/store")
+store_folder.mkdir(parents=True, exist_ok=True)
+index_file = store_folder / "_index.json"
+
+# raw csv folders per store
+raw_folders = {
+    "news_feed": Path("data/raw/news_feed"),
+    "news_id": Path("data/raw/news_id"),
+    "search": Path("data/raw/search")
+}
+
+# columns per store (all text, csv values are kept as written)
+news_columns = ["News_Source", "Title", "Source_URL", "Publish_Date", "Category", "Summary", "Scrape_Date"]
+columns = {
+    "news_feed": news_columns,
+    "news_id": news_columns,
+    "search": ["Title", "Source_URL", "Publish_Date", "Category", "Content"]
+}
+schemas = {
+    name: pa.schema([(c, pa.string()) for c in cols] + [("__srcfile__", pa.string()), ("__row__", pa.int32())])
+    for name, cols in columns.items()
+}
+
+# scrape date for a csv: its Scrape_Date column, else the date in its name, else its mtime
+def csv_date(csv: Path, df: pd.DataFrame | None = None) -> str:
+    if df is not None and "Scrape_Date" in df.columns:
+        dates = df["Scrape_Date"].dropna().astype(str)
+        if not dates.empty and re.fullmatch(r"\d{4}-\d{2}-\d{2}", dates.iloc[0]):
+            return dates.iloc[0]
+    m = re.search(r"\d{4}-\d{2}-\d{2}", csv.stem)
+    if m:
+        return m.group(0)
+    return datetime.fromtimestamp(csv.stat().st_mtime).strftime("%Y-%m-%d")
+
+def _parts(store: str) -> dict[str, Path]:
+    return {p.stem: p for p in (store_folder / f"store={store}").glob("scrape_date=*/*.parquet")}
+
+# write the parquet part for one csv
+def write_part(store: str, csv: Path) -> Path | None:
+    try:
+        df = pd.read_csv(csv, dtype=str, keep_default_na=False, na_values=[""], encoding="utf-8-sig")
+    except Exception as e:
+        print("could not read", csv, e)
+        return None
+    cols = columns[store]
+    df = df.reindex(columns=cols)
+    df["__srcfile__"] = csv.name
+    df["__row__"] = range(len(df))
+    table = pa.Table.from_pandas(df, schema=schemas[store], preserve_index=False)
+
+    out = store_folder / f"store={store}" / f"scrape_date={csv_date(csv, df)}" / f"{csv.stem}.parquet"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    _replace(out, lambda f: pq.write_table(table, f, compression="zstd"))
+    return out
+
+# write through a uniquely named temp file next to path, then swap it in
+def _replace(path: Path, write):
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False) as f:
+        tmp = Path(f.name)
+        try:
+            write(f)
+        except BaseException:
+            f.close()
+            tmp.unlink(missing_ok=True)
+            raise
+    os.replace(tmp, path)
+
+def _load_index() -> dict:
+    try:
+        return json.loads(index_file.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+# csv size / mtime per stem, as of the last sync
+def signatures(store: str) -> dict[str, list[int]]:
+    return _load_index().get(store, {})
+
+# bring the parquet parts in line with the csv folder
+def sync(store: str) -> dict[str, int]:
+    with file_lock(index_file):
+        index = _load_index()
+        seen = index.setdefault(store, {})
+        parts = _parts(store)
+        csvs = {f.stem: f for f in raw_folders[store].glob("*.csv")}
+        written = dropped = 0
+        for stem, csv in csvs.items():
+            st = csv.stat()
+            sig = [st.st_size, st.st_mtime_ns]
+            part = parts.get(stem)
+            if part is not None and seen.get(stem) == sig:
+                continue
+            new = write_part(store, csv)
+            if new is None:
+                continue
+            if part and part != new:
+                part.unlink(missing_ok=True)    # scrape date moved
+            seen[stem] = sig
+            written += 1
+        for stem, part in parts.items():
+            if stem not in csvs:
+                part.unlink(missing_ok=True)
+                seen.pop(stem, None)
+                dropped += 1
+        if written or dropped:
+            _replace(index_file, lambda f: f.write(json.dumps(index).encode("utf-8")))
+        return {"written": written, "dropped": dropped, "parts": len(csvs)}
+
+# read a store as a dataframe, in csv order (file name, then row)
+#   columns: only these (plus __srcfile__ / __row__)
+#   dates: only these scrape dates (partition pruning)
+#   file_filter: only csvs whose stem passes this (e.g. a query name)
+def read(store: str, columns: list[str] | None = None, dates: list[str] | None = None,
+         file_filter=None) -> pd.DataFrame:
+    sync(store)
+    files = []
+    for stem, part in sorted(_parts(store).items()):
+        date = part.parent.name.split("=", 1)[1]
+        if dates is not None and date not in dates:
+            continue
+        if file_filter is not None and not file_filter(stem):
+            continue
+        files.append(part)
+    if not files:
+        return pd.DataFrame()
+
+    schema = schemas[store]
+    cols = [c for c in (columns or schema.names) if c in schema.names]
+    cols += [c for c in ("__srcfile__", "__row__") if c not in cols]
+    try:
+        table = ds.dataset([str(f) for f in files], schema=schema, format="parquet").to_table(columns=cols)
+    except Exception as e:
+        print("could not read", store, "store:", e)
+        return pd.DataFrame()
+    df = table.to_pandas()
+    return df.sort_values(["__srcfile__", "__row__"], kind="stable").reset_index(drop=True)
+
+# stream a store in csv order, one record batch (dict of column -> list) at a time
+#   same filters as read, but nothing is held beyond one batch
+def batches(store: str, columns: list[str] | None = None, file_filter=None, batch_size: int = 256):
+    sync(store)
+    schema = schemas[store]
+    cols = [c for c in (columns or schema.names) if c in schema.names]
+    cols += [c for c in ("__srcfile__", "__row__") if c not in cols]
+    for stem, part in sorted(_parts(store).items()):
+        if file_filter is not None and not file_filter(stem):
+            continue
+        try:
+            for batch in pq.ParquetFile(part).iter_batches(batch_size=batch_size, columns=cols):
+                yield batch.to_pydict()
+        except Exception as e:
+            print("could not read", part, e)
+
+# store name for a raw csv folder (readers that are given a folder)
+def store_for(folder: Path) -> str | None:
+    for name, raw in raw_folders.items():
+        if Path(folder).resolve() == raw.resolve():
+            return name
+    return None
+
+if __name__ == "__main__":
+    # migrate / refresh every store
+    for name in raw_folders:
+        print(name, sync(name))
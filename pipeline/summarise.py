@@ -1,22 +1,27 @@
 # pipeline/summarise.py
 """
 summarise search csv
-1. load ollama (llama3.2)
+1. call ollama over its rest api (ollama_client.py, model kept loaded between calls)
 2. set prompt
-3. summarise from individual data (csv files)
+3. summarise from individual data (csv files, one copy per near-duplicate cluster, NUM_PARALLEL at a time)
 4. summarise from compiled data (txt file)
 4. save as txt files into data/output
 """
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
+import os, statistics, time
 import pandas as pd
-import subprocess
+from pipeline import dedupe, ollama_client
 
 # folders
 raw_folder = Path("data/raw/search")
 out_folder = Path("data/output")
 out_indiv = out_folder / "summary_individual"
 
+# summaries in flight at once (ollama serves OLLAMA_NUM_PARALLEL requests per model at a time)
+NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL") or 4)
+
 # make sure folders exist
 out_folder.mkdir(parents=True, exist_ok=True)
 out_indiv.mkdir(parents=True, exist_ok=True)
@@ -24,16 +29,14 @@ out_indiv.mkdir(parents=True, exist_ok=True)
 # call ollama
 def ollama_generate(prompt: str, model: str) -> str:
     try:
-        res = subprocess.run(
-            ["ollama", "run", model],
-            input=prompt.encode("utf-8"),
-            capture_output=True,
-            check=True
-        )
-        return res.stdout.decode("utf-8").strip()
-    except Exception as e:
+        res = ollama_client.generate(prompt, model)
+    except ollama_client.OllamaError as e:
         print("ollama call failed:", e)
         return ""
+    print(f"{model}: {res['prompt_tokens']} prompt + {res['tokens']} tokens in {res['wall_s']:.1f}s"
+          + (f" ({res['tokens_per_s']} tok/s)" if res["tokens_per_s"] else "")
+          + (f", model load {res['load_s']:.1f}s" if res["load_s"] > 0.5 else ""))
+    return res["text"].strip()
 
 # summarise
 def summarise(txt: str, query: str = "", model: str = "mistral") -> str:
@@ -73,8 +76,24 @@ def summarise(txt: str, query: str = "", model: str = "mistral") -> str:
 
     return summary
 
+# summarise one article and write it (runs in a worker thread)
+def _summarise_one(task: dict, query: str, model: str) -> dict:
+    t0 = time.perf_counter()
+    summary = summarise(task["content"], query=query, model=model)
+    out = {"title": task["title"], "path": None, "seconds": time.perf_counter() - t0}
+    if not summary:
+        return out
+    try:
+        task["out_path"].write_text(summary, encoding="utf-8")
+        out["path"] = task["out_path"]
+    except Exception as e:
+        print("could not write summary for", task["title"], e)
+    return out
+
 # summarise each article
-def run_individual(query: str = "", model: str = "mistral"):
+#   workers: requests in flight at once (match the server's OLLAMA_NUM_PARALLEL; 1 = one after another)
+# -> results in article order, plus latency / throughput
+def run_individual(query: str = "", model: str = "mistral", workers: int = NUM_PARALLEL) -> dict | None:
     csvs = sorted(raw_folder.glob("*.csv"))
     if not csvs:
         print("no csv files in data/raw/search/")
@@ -88,6 +107,9 @@ def run_individual(query: str = "", model: str = "mistral"):
             print(f"no csv files found matching query '{query}'")
             return
 
+    # articles to summarise, in order
+    tasks = []
+    done_clusters = set()  # near-duplicates are summarised once
     for f in csvs:
         try:
             df = pd.read_csv(f)
@@ -100,24 +122,57 @@ def run_individual(query: str = "", model: str = "mistral"):
             print("no 'Content' col in", f)
             continue
 
-        for idx, row in tqdm(df.iterrows(), total=len(df), desc=f"summarising {f.name}"):
+        ids = [dedupe.doc_id(u) for u in df["Source_URL"]] if "Source_URL" in df.columns else []
+        cmap = dedupe.clusters(ids)
+
+        for idx, row in df.iterrows():
             title = str(row.get("Title", f"row{idx}"))
             content = str(row.get(content_col, "")).strip()
             if not content:
                 continue
 
-            summary = summarise(content, query=query, model=model)
-            
-            if not summary:
+            cluster = cmap.get(dedupe.doc_id(row.get("Source_URL")))
+            if cluster and cluster in done_clusters:
+                print("skip near-duplicate", title[:50])
                 continue
+            if cluster:
+                done_clusters.add(cluster)
 
             safe_title = "".join(c if c.isalnum() else "_" for c in title)[:40]
             # include query in filename
             out_path = out_indiv / f"{safe_q}_{safe_title}_{idx}.txt" if query else out_indiv / f"{safe_title}_{idx}.txt"
+            tasks.append({"title": title, "content": content, "out_path": out_path})
+
+    # bounded pool: at most `workers` requests at the server, each file written as soon as it is done
+    workers = max(1, min(workers, len(tasks) or 1))
+    results = [None] * len(tasks)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_summarise_one, task, query, model): i for i, task in enumerate(tasks)}
+        for fut in tqdm(as_completed(futures), total=len(futures), desc=f"summarising ({workers} in flight)"):
+            i = futures[fut]
             try:
-                out_path.write_text(summary, encoding="utf-8")
+                results[i] = fut.result()
             except Exception as e:
-                print("could not write summary for", title, e)
+                print("summary failed for", tasks[i]["title"], e)
+                results[i] = {"title": tasks[i]["title"], "path": None, "seconds": None}
+    secs = time.perf_counter() - t0
+
+    latencies = sorted(r["seconds"] for r in results if r["seconds"] is not None)
+    report = {
+        "articles": len(tasks),
+        "written": sum(1 for r in results if r["path"]),
+        "workers": workers,
+        "seconds": round(secs, 1),
+        "articles_per_min": round(len(tasks) / secs * 60, 1) if secs else None,
+        "median_latency_s": round(statistics.median(latencies), 1) if latencies else None,
+        "max_latency_s": round(latencies[-1], 1) if latencies else None,
+        "results": results
+    }
+    print(f"summarised {report['written']} of {report['articles']} articles in {report['seconds']}s "
+          f"with {workers} in flight ({report['articles_per_min']} per min, "
+          f"median {report['median_latency_s']}s, max {report['max_latency_s']}s per article)")
+    return report
 
 # summarise compiled file
 def run_overall(query: str = "", model: str = "mistral") -> Path | None:
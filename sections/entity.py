@@ -1,7 +1,6 @@
 import streamlit as st
 from pathlib import Path
-from collections import Counter
-from ui_helpers import load_preds_json
+from pipeline import entity_index
 
 # paths
 data_folder = Path("data")
@@ -39,45 +38,21 @@ def render_entity_summary(search_text: str = ""):
         st.caption("No entities available")
         return
 
-    # load predictions
+    # prediction sets, later ones win on the same doc
     safe_q = "".join(c if c.isalnum() else "_" for c in search_text).lower()
-    newsfeed = load_preds_json(proc_folder / "predictions_newsfeed.json") or {}
-    fullnews = load_preds_json(proc_folder / "predictions_fullnews.json") or {}
-    search = load_preds_json(proc_folder / f"predictions_search_{safe_q}.json") or {}
-
-    # filter by query
-    def filter_by_query(preds: dict, query: str):
-        if not isinstance(preds, dict):
-            return {}
-        filtered = {}
-        for k, ents in preds.items():
-            if query in k.lower() or any(query in str(e.get("text", "")).lower() for e in ents):
-                filtered[k] = ents
-        return filtered
-
-    filtered_newsfeed = filter_by_query(newsfeed, cur_q)
-    filtered_fullnews = filter_by_query(fullnews, cur_q)
-    filtered_search = filter_by_query(search, cur_q)
-
-    # merge
-    all_preds = {}
-    for src in (filtered_newsfeed, filtered_fullnews, filtered_search):
-        all_preds.update(src)
+    sources = []
+    for name in ("newsfeed", "fullnews", f"search_{safe_q}"):
+        # index is only rebuilt when the prediction store has changed since
+        if entity_index.ensure(name):
+            sources.append(name)
+    if not sources:
+        st.caption("No ORG or PERSON found for this query")
+        return
 
-    # collect ORG + PERSON with frequency
-    org_counter, person_counter = Counter(), Counter()
-    for ents in all_preds.values():
-        if not isinstance(ents, list):
-            continue
-        for e in ents:
-            label, txt = e.get("label"), e.get("text")
-            if not label or not txt:
-                continue
-            txt = txt.strip()
-            if label == "ORG":
-                org_counter[txt] += 1
-            elif label == "PERSON":
-                person_counter[txt] += 1
+    # docs matching the query (doc id or any entity), then ORG + PERSON frequency
+    docs = entity_index.matching_docs(sources, cur_q)
+    org_counter = entity_index.label_counts(docs, "ORG")
+    person_counter = entity_index.label_counts(docs, "PERSON")
 
     if not org_counter and not person_counter:
         st.caption("No ORG or PERSON found for this query")
@@ -2,23 +2,21 @@
 """
 display full news
 1. title
-2. check predictions from *.json files from data/processed
-3. set filter to only query
+2. check predictions from data/processed/predictions.db (pred_store, looked up per article)
+3. set filter to only query (fts index, bm25 ranked, near-duplicates collapsed, paged)
 4. set title colors (for search and full news)
 5. set highlights (from ui_helpers.py)
-6. news rendering (csv files)
+6. news rendering
 """
 import streamlit as st
-import pandas as pd
 from pathlib import Path
+from pipeline import fts, pred_store
 
 # helper functions from ui_helpers.py
 from ui_helpers import (
     s,                # safe string conversion
     join_meta,        # join metadata fields
     trim_source,      # shorten source name
-    exact_mask,       # exact match filter
-    load_preds_json,  # load predictions from JSON
     build_colors,     # assign colors to entity labels
     highlight_ents    # highlight entities in text
 )
@@ -52,61 +50,34 @@ def render_full_news(search_text: str):
     active_labels = st.session_state.get("active_labels", [])
     colors = st.session_state.get("entity_colors", {})
 
-    # load predictions
+    # prediction sets (search predictions win over full news)
     safe_q = "".join(c if c.isalnum() else "_" for c in search_text).lower()
-    
-    full_predictions = load_preds_json(processed_folder / "predictions_fullnews.json") or {}
-    search_predictions = load_preds_json(processed_folder / f"predictions_search_{safe_q}.json") or {}
-    if isinstance(search_predictions, dict):
-        full_predictions.update(search_predictions)
+    pred_sources = [f"search_{safe_q}", "fullnews"]
 
     # build colors if not already in session
     if not colors:
-        labels = sorted({
-            e.get("label", "")
-            for src in (search_predictions, full_predictions)
-            if isinstance(src, dict)
-            for ents in src.values()
-            for e in ents
-        } - {""})
+        labels = pred_store.labels(pred_sources)
         colors = build_colors(labels)
         st.session_state["entity_colors"] = colors
 
-    # helper to load CSVs into a dataframe
-    def load_csvs(folder: Path):
-        frames = []
-        for file in sorted(folder.glob("*.csv")):
-            try:
-                df = pd.read_csv(file)
-                df["__srcfile__"] = file.name
-                frames.append(df)
-            except Exception:
-                continue
-        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
-
-    # Load separately
-    df_search = load_csvs(search_folder)
-    df_news = load_csvs(full_news_folder)
-
-    # filter by query
-    def filter_df(df, text):
-        if df.empty:
-            return df
-        if text.strip():
-            if "Summary" in df.columns:
-                mask = exact_mask(df["Title"], text) | exact_mask(df["Summary"], text)
-            elif "Content" in df.columns:
-                mask = exact_mask(df["Title"], text) | exact_mask(df["Content"], text)
-            else:
-                mask = exact_mask(df["Title"], text)
-            return df[mask]
-        return df.iloc[0:0]
-    
-    df_search_filtered = filter_df(df_search, search_text)  # for search
-    df_news_filtered = filter_df(df_news, search_text)  # for news
+    # full-text index (re-indexes only csvs that changed)
+    fts.refresh("search")
+    fts.refresh("news_id")
+    total = fts.total("search") + fts.total("news_id")
+
+    # stories already shown from search aren't repeated in news
+    def find(page: int = 1):
+        return (fts.search(search_text, "search", page=page),
+                fts.search(search_text, "news_id", page=page, exclude_store="search"))
+
+    (df_search_filtered, n_search), (df_news_filtered, n_news) = find()
+    pages = max(1, -(-max(n_search, n_news) // fts.PAGE_SIZE))
+    page = st.number_input("Page", 1, pages, 1, key="full_news_page") if pages > 1 else 1
+    if page > 1:
+        (df_search_filtered, _), (df_news_filtered, _) = find(page)
 
-    total_articles = len(df_search_filtered) + len(df_news_filtered)
-    st.caption(f"{total_articles} of {len(df_search) + len(df_news)} articles")
+    total_articles = n_search + n_news
+    st.caption(f"{total_articles} of {total} articles")
 
     if total_articles == 0:
         st.caption("No news articles available.")
@@ -114,7 +85,7 @@ def render_full_news(search_text: str):
 
     # render helper
     def render_rows(df, title_color: str):
-        for idx, row in df.head(30).iterrows():
+        for _, row in df.iterrows():
             title = s(row.get("Title"))
             url = s(row.get("Source_URL"))
 
@@ -142,9 +113,9 @@ def render_full_news(search_text: str):
                 )
 
             # summary / content + highlighting
-            summary_text = s(row.get("Summary") or row.get("Content"))
-            fallback_key = f"{s(row.get('__srcfile__'))}:{s(idx)}"
-            entities = (full_predictions or {}).get(url) or (full_predictions or {}).get(fallback_key) or []
+            summary_text = s(row.get("Body"))
+            fallback_key = f"{s(row.get('__srcfile__'))}:{s(row.get('__row__'))}"
+            entities = pred_store.get(pred_sources, url) or pred_store.get(pred_sources, fallback_key)
 
             if show_entities and active_labels and entities:
                 filtered_entities = [e for e in entities if e.get("label") in active_labels]
@@ -2,13 +2,35 @@
 buttons to fetch news
 1. news feed button
 2. full news (id) button
+3. auto-refresh toggle (background feed poller) + per-feed poll report
 """
 import streamlit as st
+import pandas as pd
 import subprocess
 from pipeline import predict as pred_mod
+from pipeline.poller import FeedPoller
+
+# one poller per server process, kept across reruns
+@st.cache_resource
+def get_poller() -> FeedPoller:
+    return FeedPoller(on_new=lambda rows: pred_mod.run_news())
+
+def render_poller():
+    poller = get_poller()
+    auto = st.toggle("Auto-refresh news feed", value=poller.running(),
+                     help="Polls each feed in the background, busy feeds more often than quiet ones")
+    if auto and not poller.running():
+        poller.start()
+    elif not auto and poller.running():
+        poller.stop()
+
+    if auto:
+        with st.expander("Feed polling"):
+            st.dataframe(pd.DataFrame(poller.report()), hide_index=True, use_container_width=True)
 
 def render_news_controls():
     st.subheader("Get News")
+    render_poller()
 
     # make 2 cols for buttons
     col1, col2 = st.columns(2)
@@ -20,7 +42,7 @@ def render_news_controls():
                 # run quick scraper
                 box.write("Running news feed scraper...")
                 try:
-                    subprocess.run(["python", "pipeline/scraper_quick.py"], check=True)
+                    subprocess.run(["python", "-m", "pipeline.scraper_quick"], check=True)
                     box.write("Scraping completed!")
                 except subprocess.CalledProcessError as e:
                     box.error(f"Scraping failed: {e}")
@@ -46,7 +68,7 @@ def render_news_controls():
                 # run full scraper
                 box.write("Running full news scraper...")
                 try:
-                    subprocess.run(["python", "pipeline/scraper_full.py"], check=True)
+                    subprocess.run(["python", "-m", "pipeline.scraper_full"], check=True)
                     box.write("Scraping completed!")
                 except subprocess.CalledProcessError as e:
                     box.error(f"Scraping failed: {e}")
@@ -2,19 +2,19 @@
 """
 display news feed
 1. appearance
-2. check predictions from *.json files from data/processed
-3. set filter to only query
+2. check predictions from data/processed/predictions.db (pred_store, looked up per article)
+3. set filter to only query (fts index, bm25 ranked, near-duplicates collapsed, paged)
 4. set highlights (from ui_helpers.py)
-6. news rendering (csv files)
+6. news rendering
 """
 import streamlit as st
-import pandas as pd
 from pathlib import Path
+from pipeline import fts, pred_store
 
 # helpers from ui_helpers.py
 from ui_helpers import (
-    s, join_meta, trim_source, exact_mask,
-    load_preds_json, build_colors, highlight_ents
+    s, join_meta, trim_source,
+    build_colors, highlight_ents
 )
 
 # paths
@@ -47,63 +47,35 @@ def render_news_feed(search_text: str):
     active_labels = st.session_state.get("active_labels", [])
     colors = st.session_state.get("entity_colors", {})
 
-    # load preds
-    feed_preds = load_preds_json(proc_folder / "predictions_newsfeed.json")
-
     # build colors if not set
     colors = st.session_state.get("entity_colors")
     if not colors:
-        indiv_preds = load_preds_json(proc_folder / "predictions_individual.json")
-        full_preds = load_preds_json(proc_folder / "predictions_fullnews.json")
-
-        labels = sorted({
-            e.get("label", "")
-            for src in (indiv_preds, feed_preds, full_preds)
-            if isinstance(src, dict)
-            for ents in src.values()
-            for e in ents
-        } - {""})
-
+        labels = pred_store.labels(["individual", "newsfeed", "fullnews"])
         colors = build_colors(labels)
         st.session_state["entity_colors"] = colors
 
-    # load csvs
-    csvs = sorted(feed_folder.glob("*.csv"))
-    if not csvs:
+    # full-text index (re-indexes only csvs that changed)
+    fts.refresh("news_feed")
+    total = fts.total("news_feed")
+    if not total:
         st.caption("No feed csvs available")
         return
 
-    dfs = []
-    for f in csvs:
-        try:
-            df = pd.read_csv(f)
-            df["__srcfile__"] = f.name
-            dfs.append(df)
-        except Exception:
-            continue
-
-    if not dfs:
-        st.caption("No readable feed csvs")
-        return
-
-    # combine
-    df_all = pd.concat(dfs, ignore_index=True)
-
-    # filter by query
-    if search_text.strip():
-        mask = exact_mask(df_all["Title"], search_text) | exact_mask(df_all["Summary"], search_text)
-        df_filt = df_all[mask]
-    else:
-        df_filt = df_all.iloc[0:0]
+    # matching articles, best first, one per near-duplicate cluster
+    df_filt, matches = fts.search(search_text, "news_feed")
+    pages = max(1, -(-matches // fts.PAGE_SIZE))
+    page = st.number_input("Page", 1, pages, 1, key="feed_page") if pages > 1 else 1
+    if page > 1:
+        df_filt, _ = fts.search(search_text, "news_feed", page=page)
 
-    st.caption(f"{len(df_filt)} of {len(df_all)} feed articles")
+    st.caption(f"{matches} of {total} feed articles")
 
     if df_filt.empty:
         st.caption("No news feed available")
         return
 
-    # show up to 30
-    for idx, row in df_filt.head(30).iterrows():
+    # one page at a time
+    for _, row in df_filt.iterrows():
         title = s(row.get("Title"))
         url = s(row.get("Source_URL"))
         meta = join_meta([
@@ -129,9 +101,9 @@ def render_news_feed(search_text: str):
             )
 
         # summary + ents
-        summ = s(row.get("Summary"))
-        fallback = f"{s(row.get('__srcfile__'))}:{s(idx)}"
-        ents = (feed_preds or {}).get(url) or (feed_preds or {}).get(fallback) or []
+        summ = s(row.get("Body"))
+        fallback = f"{s(row.get('__srcfile__'))}:{s(row.get('__row__'))}"
+        ents = pred_store.get("newsfeed", url) or pred_store.get("newsfeed", fallback)
 
         if show_ents and active_labels and ents:
             filt_ents = [e for e in ents if e.get("label") in active_labels]
@@ -11,14 +11,17 @@ make search and summarise pipeline with clear button
 import streamlit as st
 import shutil
 from pathlib import Path
-from ui_helpers import load_preds_json, build_colors
-import subprocess
+from ui_helpers import build_colors
+from utils import memo, cache_invalidate
 
 from pipeline import crawler as crawl_mod
 from pipeline import summarise as sum_mod
 from pipeline import compile as comp_mod
 from pipeline.scraper_search import run_scraper
 from pipeline import predict as pred_mod
+from pipeline import pred_store
+from pipeline import ollama_client
+from pipeline import dedupe
 
 last_query_file = Path("data/processed/last_query.txt")
 
@@ -35,6 +38,11 @@ def clear_pipeline_data():
         Path("data/processed/predictions_fullnews.json").resolve(),
         Path("data/processed/predictions_newsfeed.json").resolve()
     }
+    # prediction store is kept, minus everything but the news feed / full news sets
+    keep_files |= {pred_store.db_file.with_name(pred_store.db_file.name + ext).resolve() for ext in ("", "-wal", "-shm")}
+    pred_store.drop([src for src in pred_store.sources() if src not in ("newsfeed", "fullnews")])
+    # duplicate clusters are kept too (canonical ids stay stable for the kept csvs)
+    keep_files |= {dedupe.db_file.with_name(dedupe.db_file.name + ext).resolve() for ext in ("", "-wal", "-shm")}
     folders = [Path("data/raw"), Path("data/output"), Path("data/processed")]
     for f in folders:
         if f.exists():
@@ -49,28 +57,20 @@ def clear_pipeline_data():
                         item.unlink()
                     except FileNotFoundError:
                         pass
-    st.success("Pipeline data cleared (except news_feed, news_id, and two prediction json files)")
+    st.success("Pipeline data cleared (except news_feed, news_id, and their predictions)")
 
 def check_model(model: str):
     try:
-        # check installed models
-        res = subprocess.run(
-            ["ollama", "list"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        if model not in res.stdout:
+        # check installed models (server's model list, cached for a minute)
+        names = memo("ollama", "tags", ollama_client.tags, ttl=60)
+        if not ollama_client.has_model(model, names):
             with st.spinner(f"Downloading model '{model}'..."):
-                pull = subprocess.run(
-                    ["ollama", "pull", model],
-                    capture_output=True,
-                    text=True
-                )
-                if pull.returncode == 0:
+                try:
+                    ollama_client.pull(model)
+                    cache_invalidate("ollama")
                     st.success(f"Model '{model}' downloaded successfully")
-                else:
-                    st.error(f"Failed to download model '{model}': {pull.stderr}")
+                except ollama_client.OllamaError as e:
+                    st.error(f"Failed to download model '{model}': {e}")
         else:
             st.caption(f"✅ Model '{model}' already available")
     except Exception as e:
@@ -159,7 +159,7 @@ def render_search_pipeline(search_text: str):
             st.warning(
                 "Are you sure you want to clear pipeline data? "
                 "This will remove processed/output data but keep news_feed, news_id, "
-                "and their respective prediction JSON files."
+                "and their predictions."
             )
             c1, c2 = st.columns(2)
             with c1:
@@ -174,19 +174,7 @@ def render_search_pipeline(search_text: str):
     show_ents = st.checkbox("Show predicted labels", key="show_ents")
 
     if show_ents:
-        proc_folder = Path("data/processed")
-        indiv_preds = load_preds_json(proc_folder / "predictions_individual.json")
-        feed_preds = load_preds_json(proc_folder / "predictions_newsfeed.json")
-        full_preds = load_preds_json(proc_folder / "predictions_fullnews.json")
-        search_preds = load_preds_json(proc_folder / "predictions_search.json")
-
-        labels = sorted({
-            e.get("label", "")
-            for src in (indiv_preds, feed_preds, full_preds, search_preds)
-            if isinstance(src, dict)
-            for ents in src.values()
-            for e in ents
-        } - {""})
+        labels = pred_store.labels(["individual", "newsfeed", "fullnews", "search"])
 
         colors = build_colors(labels)
         st.session_state["entity_colors"] = colors
@@ -2,7 +2,7 @@
 """
 display summaries
 1. check last query (for loading)
-2. get source
+2. get source (search articles from the parquet store)
 3. appearance
 4. set highlights (from ui_helpers.py)
 5. render individual and overall summaries (txt files)
@@ -10,9 +10,8 @@ display summaries
 """
 from pathlib import Path
 import streamlit as st
-import pandas as pd
-from ui_helpers import s, load_preds_json, highlight_ents, needs_prediction
-from pipeline import predict as pred_mod
+from ui_helpers import s, highlight_ents, needs_prediction
+from pipeline import predict as pred_mod, store, pred_store
 
 # paths
 data_folder = Path("data")
@@ -20,7 +19,6 @@ proc_folder = data_folder / "processed"
 out_folder = data_folder / "output"
 out_indiv = out_folder / "summary_individual"
 last_query_file = proc_folder / "last_query.txt"
-raw_folder = data_folder / "raw" / "search"
 
 def get_last_query() -> str:
     if last_query_file.exists():
@@ -41,27 +39,22 @@ def get_query_from_filename(filename: str) -> str:
 def build_source_map(current_query: str):
     src_map = {}
     safe_q = "".join(c if c.isalnum() else "_" for c in current_query).lower()
-    for csv_file in raw_folder.glob("search_*.csv"):
-        # only include files that contain the query string
-        if safe_q not in csv_file.stem.lower():
+    # only search files whose name contains the query string
+    df = store.read("search", columns=["Title", "Source_URL"],
+                    file_filter=lambda stem: stem.startswith("search_") and safe_q in stem.lower())
+    if df.empty:
+        return src_map
+    for title, url, idx in zip(df["Title"], df["Source_URL"], df["__row__"]):
+        title = str(title if isinstance(title, str) else "").strip()
+        url = str(url if isinstance(url, str) else "").strip()
+        if not title:
             continue
-        try:
-            df = pd.read_csv(csv_file)
-        except Exception:
-            continue
-        if "Title" not in df.columns or "Source_URL" not in df.columns:
-            continue
-        for idx, row in df.iterrows():
-            title = str(row.get("Title", "")).strip()
-            url = str(row.get("Source_URL", "")).strip()
-            if not title:
-                continue
-            if url and not url.startswith(("http://", "https://")):
-                url = "https://" + url
-            fname = make_safe_filename(title, idx)
-            # store both plain and query-prefixed keys to match summary filenames
-            src_map[fname] = (title, url)
-            src_map[f"{safe_q}_{Path(fname).stem}"] = (title, url)
+        if url and not url.startswith(("http://", "https://")):
+            url = "https://" + url
+        fname = make_safe_filename(title, idx)
+        # store both plain and query-prefixed keys to match summary filenames
+        src_map[fname] = (title, url)
+        src_map[f"{safe_q}_{Path(fname).stem}"] = (title, url)
     return src_map
 
 def get_summaries_for_query(current_query: str):
@@ -116,8 +109,8 @@ def render_overall_summary(current_query: str, overall_file: Path, show_ents: bo
             return
         
         safe_q = "".join(c if c.isalnum() else "_" for c in current_query).lower()
-        overall_json = load_preds_json(proc_folder / f"predictions_overall_{safe_q}.json")
-        overall_ents = overall_json.get("entities", []) if isinstance(overall_json, dict) else []
+        overall_preds = pred_store.load(f"overall_{safe_q}")
+        overall_ents = next(iter(overall_preds.values()), [])
         
         st.markdown("<style>.summary-text{ text-align:justify; line-height:1.5; }</style>", unsafe_allow_html=True)
         
@@ -144,7 +137,7 @@ def render_individual_summaries(summary_files: list, show_ents: bool, active_lab
     
     safe_q = "".join(c if c.isalnum() else "_" for c in current_query).lower()
     src_map = build_source_map(current_query)
-    indiv_preds = load_preds_json(proc_folder / f"predictions_individual_{safe_q}.json")
+    indiv_preds = pred_store.load(f"individual_{safe_q}")
     
     for i, f in enumerate(summary_files):
         try:
@@ -0,0 +1,6 @@
+# tests/conftest.py
+# run from the repo root like the app does (pipeline imports, data/ paths)
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,36 @@
+# tests/test_id_explorer.py
+"""
+id_explorer.ProbeMap planning across runs (no network)
+1. ids past the newest article that miss are probed again on later runs
+2. once the site publishes them, the forward walk finds them
+"""
+from pipeline.id_explorer import ProbeMap, MISS, ARTICLE, UNKNOWN
+
+TOP = 500000
+
+def run(pm: ProbeMap, live: int, n: int = 100) -> list[int]:
+    ids = pm.plan(n)
+    pm.record({aid: "found" if TOP - 50 <= aid <= live else "miss" for aid in ids})
+    return ids
+
+def test_forward_misses_stay_probeable():
+    pm = ProbeMap("test", TOP - 1000, TOP + 1)
+    pm.set(TOP, ARTICLE)
+
+    ids = run(pm, live=TOP)
+    ahead = [aid for aid in ids if aid > TOP]
+    assert ahead == list(range(TOP + 1, TOP + 31))
+    assert all(pm.get(aid) == UNKNOWN for aid in ahead)
+
+    # the site publishes 20 more; the next run walks the same ids again and finds them
+    run(pm, live=TOP + 20)
+    assert all(pm.get(aid) == ARTICLE for aid in range(TOP + 1, TOP + 21))
+    assert pm.meta["highest_article"] == TOP + 20
+    assert all(pm.get(aid) == UNKNOWN for aid in range(TOP + 21, TOP + 31))
+
+def test_misses_below_head_are_kept():
+    pm = ProbeMap("test", TOP - 1000, TOP + 1)
+    pm.set(TOP, ARTICLE)
+    pm.record({TOP - 500: "miss", TOP + 5: "miss"})
+    assert pm.get(TOP - 500) == MISS
+    assert pm.get(TOP + 5) == UNKNOWN
@@ -0,0 +1,120 @@
+# tests/test_ollama_client.py
+"""
+ollama_client against a local stub server (no ollama needed)
+1. /api/generate, plain and streamed
+2. /api/tags
+3. read timeout and 5xx both raise OllamaError
+4. per-model stats
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import json, threading, time
+
+import pytest
+from pipeline import ollama_client
+
+FINAL = {"done": True, "done_reason": "stop", "prompt_eval_count": 12, "prompt_eval_duration": 2e8,
+         "eval_count": 5, "eval_duration": 5e8, "load_duration": 0, "total_duration": 8e8}
+
+class Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send(200, {"models": [{"name": "mistral:latest"}, {"name": "llama3.2:3b"}]})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        req = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        Stub.requests.append(req)
+        prompt = req.get("prompt")
+        if prompt == "slow":
+            time.sleep(1.0)
+        if prompt == "boom":
+            self._send(500, {"error": "model crashed"})
+            return
+        if not req.get("stream"):
+            self._send(200, {**FINAL, "model": req["model"], "response": "hello world"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in ({"response": "hel", "done": False}, {"response": "lo ", "done": False},
+                      {"response": "world", "done": False}, {**FINAL, "model": req["model"], "response": ""}):
+            line = (json.dumps(chunk) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+@pytest.fixture
+def server(monkeypatch):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(ollama_client, "HOST", f"http://127.0.0.1:{srv.server_port}")
+    Stub.requests = []
+    ollama_client.reset_stats()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+def test_generate(server):
+    res = ollama_client.generate("hi", "mistral")
+    assert res["text"] == "hello world"
+    assert res["prompt_tokens"] == 12 and res["tokens"] == 5
+    assert res["gen_s"] == pytest.approx(0.5)
+    assert res["tokens_per_s"] == 10.0
+    req = Stub.requests[-1]
+    assert req["keep_alive"] == ollama_client.KEEP_ALIVE
+    assert req["stream"] is False
+
+def test_keep_alive_override(server):
+    ollama_client.generate("hi", "mistral", keep_alive=0)
+    assert Stub.requests[-1]["keep_alive"] == 0
+
+def test_generate_stream(server):
+    tokens = []
+    res = ollama_client.generate("hi", "mistral", stream=True, on_token=tokens.append)
+    assert tokens == ["hel", "lo ", "world"]
+    assert res["text"] == "hello world"
+    assert res["tokens"] == 5
+    assert Stub.requests[-1]["stream"] is True
+
+def test_tags(server):
+    names = ollama_client.tags()
+    assert names == ["mistral:latest", "llama3.2:3b"]
+    assert ollama_client.has_model("mistral", names)
+    assert ollama_client.has_model("llama3.2:3b", names)
+    assert not ollama_client.has_model("llama3.2", names)
+
+def test_timeout(server):
+    with pytest.raises(ollama_client.OllamaError):
+        ollama_client.generate("slow", "mistral", timeout=0.2)
+
+def test_server_error(server):
+    with pytest.raises(ollama_client.OllamaError, match="500"):
+        ollama_client.generate("boom", "mistral")
+
+def test_stats(server):
+    ollama_client.generate("hi", "mistral")
+    ollama_client.generate("hi", "mistral", stream=True)
+    with pytest.raises(ollama_client.OllamaError):
+        ollama_client.generate("boom", "mistral")
+    st = ollama_client.stats()["mistral"]
+    assert st["requests"] == 3
+    assert st["errors"] == 1
+    assert st["prompt_tokens"] == 24 and st["tokens"] == 10
+    assert st["gen_s"] == pytest.approx(1.0)
+    assert st["tokens_per_s"] == 10.0
@@ -0,0 +1,28 @@
+# tests/test_politeness.py
+"""
+politeness.DomainScheduler pacing (no network, robots.txt off)
+1. requests to one domain are spaced by the token wait plus the jitter
+2. results come back in input order, None where fn raised
+"""
+import time
+from pipeline import politeness
+
+def test_jitter_adds_to_token_wait(monkeypatch):
+    monkeypatch.setattr(politeness.random, "uniform", lambda a, b: b)    # always the largest jitter
+    stamps = []
+    def fn(url):
+        stamps.append(time.monotonic())
+        return url
+    rate = 20.0
+    politeness.DomainScheduler(rate=rate, use_robots=False).run([f"http://a.example/{i}" for i in range(5)], fn)
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert min(gaps) >= (1 + politeness.JITTER) / rate * 0.95
+
+def test_results_in_order():
+    def fn(url):
+        if url.endswith("/bad"):
+            raise RuntimeError("boom")
+        return url
+    items = ["http://a.example/1", "http://b.example/bad", "http://a.example/2", "http://c.example/3"]
+    res = politeness.DomainScheduler(rate=50.0, use_robots=False).run(items, fn)
+    assert res == ["http://a.example/1", None, "http://a.example/2", "http://c.example/3"]
@@ -0,0 +1,41 @@
+# tests/test_profiles.py
+"""
+profiles.field with learned selectors (in memory, nothing saved)
+1. scrapers with different cascades for the same field don't share what they learn
+2. a better-ranked selector on the page beats the learned one
+3. a winner is not learned when a better-ranked selector matched but was empty
+"""
+import pytest
+from pipeline import extract, profiles
+
+URL = "https://www.hmetro.com.my/mutakhir/2026/01/1/story"
+PAGE = b"<html><head><title>Story X | Harian Metro</title></head><body><h1>Story X</h1></body></html>"
+NO_H1 = b"<html><head><title>Gallery | Harian Metro</title></head><body></body></html>"
+EMPTY_H1 = b"<html><head><title>Gallery | Harian Metro</title></head><body><h1> </h1></body></html>"
+
+search = extract.cascade(("h1", "title"))
+full = extract.cascade(("h1.jeg_post_title", "h1.entry-title", "title"))
+
+@pytest.fixture(autouse=True)
+def fresh(monkeypatch):
+    monkeypatch.setattr(profiles, "_profiles", {})
+
+def title(cascade, page: bytes) -> str:
+    return profiles.field(URL, "title", cascade, extract.parse(page), extract.text_strip)
+
+def test_cascades_kept_apart():
+    for _ in range(3):
+        assert title(full, PAGE) == "Story X | Harian Metro"
+    assert title(search, PAGE) == "Story X"
+    learned = profiles.load()["hmetro.com.my"]
+    assert learned[profiles.profile_key("title", full)]["selector"] == "title"
+    assert learned[profiles.profile_key("title", search)]["selector"] == "h1"
+
+def test_better_ranked_selector_wins():
+    assert title(search, NO_H1) == "Gallery | Harian Metro"
+    assert profiles.load()["hmetro.com.my"][profiles.profile_key("title", search)]["selector"] == "title"
+    assert title(search, PAGE) == "Story X"
+
+def test_no_learning_past_empty_match():
+    assert title(search, EMPTY_H1) == "Gallery | Harian Metro"
+    assert profiles.profile_key("title", search) not in profiles.load().get("hmetro.com.my", {})
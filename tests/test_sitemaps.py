@@ -0,0 +1,53 @@
+# tests/test_sitemaps.py
+"""
+sitemaps.new_urls against stubbed sitemaps (no network)
+1. an index whose child gains more urls than max_urls hands them all out over later runs
+2. nothing is returned twice
+"""
+import pytest
+from pipeline import sitemaps
+
+INDEX = "https://news.example/sitemap_index.xml"
+CHILD = "https://news.example/post-sitemap.xml"
+
+class Site:
+    def __init__(self):
+        self.urls = []      # (lastmod, loc)
+
+    def publish(self, n: int):
+        start = len(self.urls)
+        for i in range(start, start + n):
+            self.urls.append((f"2026-01-{1 + i // 1000:02d}T{i // 60 % 24:02d}:{i % 60:02d}:00", f"https://news.example/a/{i}"))
+
+    def entries(self, url: str, timeout: float = 20):
+        if url == INDEX:
+            yield "sitemap", CHILD, max(m for m, _ in self.urls)
+        elif url == CHILD:
+            for m, loc in self.urls:
+                yield "url", loc, m
+
+@pytest.fixture
+def site(monkeypatch):
+    s = Site()
+    monkeypatch.setattr(sitemaps, "iter_entries", s.entries)
+    monkeypatch.setattr(sitemaps, "find_sitemaps", lambda base_url: [INDEX])
+    return s
+
+def test_index_child_leftovers(site):
+    state = {}
+    site.publish(20)
+    assert len(sitemaps.new_urls("https://news.example", state, max_urls=50)) == 20
+
+    site.publish(150)
+    runs = [sitemaps.new_urls("https://news.example", state, max_urls=50) for _ in range(4)]
+    assert [len(r) for r in runs] == [50, 50, 50, 0]
+    got = [u for r in runs for u in r]
+    assert len(set(got)) == 150
+    assert set(got) == {loc for _, loc in site.urls[20:]}
+
+def test_nothing_new(site):
+    state = {}
+    site.publish(10)
+    sitemaps.new_urls("https://news.example", state, max_urls=50)
+    assert sitemaps.new_urls("https://news.example", state, max_urls=50) == []
+    assert not state[CHILD].get("pending")
@@ -8,7 +8,6 @@ from pathlib import Path
 import json
 import pandas as pd
 from urllib.parse import urlparse
-import re
 
 # basic helpers
 def s(val):
@@ -35,14 +34,6 @@ def trim_source(src):
         return urlparse(txt).netloc.replace("www.", "")
     return txt
 
-# search helpers
-def exact_mask(series: pd.Series, query: str) -> pd.Series:
-    # exact word match mask
-    if not query.strip():
-        return series.astype(bool) & False
-    pattern = rf"(?i)(?<!\w){re.escape(query)}(?!\w)"
-    return series.astype(str).str.contains(pattern, na=False, regex=True)
-
 # title color helpers 
 def get_title_color(srcfile: str) -> str:
     # pick color based on file name
@@ -53,16 +44,6 @@ def get_title_color(srcfile: str) -> str:
         return "gold"
     return "red"
 
-# json helpers 
-def load_preds_json(path: Path):
-    # load json if exists else {}
-    if path.exists():
-        try:
-            return json.loads(path.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
-    return {}
-
 # entity color + highlight 
 def build_colors(labels: list[str]) -> dict[str, str]:
     # assign colors from palette
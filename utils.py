@@ -1,10 +1,18 @@
 # utils.py
 """
 cache handling
+1. disk cache in data/.cache/kv, keys grouped by namespace, index in data/.cache/kv.db
+2. atomic writes (temp file + rename), optional zlib compression
+3. ttl per entry, and deps: files / folders whose mtime change makes the entry stale
+4. global byte budget for the disk cache, least recently used entries evicted first
+5. in-memory memo for cheap lookups (directory listings, parsed frames), same ttl / deps checks
+6. hit / miss / stale / eviction counts per namespace (cache_stats)
+7. cross-process file lock for state files shared by several runs (file_lock)
 """
 from pathlib import Path
-import json
-from functools import lru_cache
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+import hashlib, json, os, pickle, sqlite3, threading, time, zlib
 
 # main data folder
 data_folder = Path("data")
@@ -12,26 +20,263 @@ data_folder = Path("data")
 # cache folder inside data
 cache_folder = data_folder / ".cache"
 cache_folder.mkdir(parents=True, exist_ok=True)
+kv_folder = cache_folder / "kv"
+kv_db = cache_folder / "kv.db"
 
-# write to cache
-def cache_write(fname: str, obj):
-    # save dict/list as json, else just text
-    fpath = cache_folder / fname
+# limits
+MAX_BYTES = 200 * 1024 * 1024   # disk cache budget (all namespaces)
+MEMO_ENTRIES = 128              # in-memory entries kept
+COMPRESS_MIN = 4096             # compress=None: only values at least this big
+
+_lock = threading.Lock()
+_memo = OrderedDict()           # (ns, key) -> (value, expires, deps signature)
+_stats = Counter()              # (ns, event) -> count
+
+def _connect() -> sqlite3.Connection:
+    con = sqlite3.connect(kv_db, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS entries ("
+        " ns TEXT,"
+        " key TEXT,"
+        " file TEXT,"            # path under kv_folder
+        " format TEXT,"          # json, text or pickle
+        " codec TEXT,"           # zlib or empty
+        " size INTEGER,"         # bytes on disk
+        " stored REAL,"
+        " accessed REAL,"
+        " expires REAL,"         # null = no ttl
+        " deps TEXT,"            # json {path: mtime_ns} at write time
+        " PRIMARY KEY (ns, key))"
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+    return con
+
+def _count(ns: str, event: str):
+    with _lock:
+        _stats[(ns, event)] += 1
+
+# mtime (ns) of each dep, -1 if missing (a deleted file also invalidates)
+def _signature(deps) -> dict[str, int]:
+    sig = {}
+    for d in deps or []:
+        p = Path(d)
+        try:
+            sig[str(p)] = p.stat().st_mtime_ns
+        except OSError:
+            sig[str(p)] = -1
+    return sig
+
+def _stale(expires: float | None, deps: dict) -> bool:
+    if expires is not None and time.time() >= expires:
+        return True
+    return bool(deps) and _signature(deps) != deps
+
+def _entry_path(ns: str, key: str) -> Path:
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return kv_folder / ns / digest[:2] / digest
+
+def _encode(obj) -> tuple[bytes, str]:
     if isinstance(obj, (dict, list)):
-        fpath.write_text(json.dumps(obj, ensure_ascii=False), encoding="utf-8")
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8"), "json"
+    if isinstance(obj, str):
+        return obj.encode("utf-8"), "text"
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), "pickle"
+
+def _decode(data: bytes, fmt: str):
+    if fmt == "json":
+        return json.loads(data.decode("utf-8"))
+    if fmt == "pickle":
+        return pickle.loads(data)
+    return data.decode("utf-8")
+
+# write a value (dict/list as json, str as text, anything else pickled)
+#   ttl: seconds before it expires
+#   deps: files / folders; the entry goes stale once any of their mtimes change
+#   compress: True / False, None = only big values
+def cache_put(key: str, obj, ns: str = "default", ttl: float | None = None, deps=None,
+              compress: bool | None = None) -> Path:
+    return _write(key, obj, ns, ttl, _signature(deps), compress)
+
+def _write(key: str, obj, ns: str, ttl: float | None, sig: dict, compress: bool | None) -> Path:
+    data, fmt = _encode(obj)
+    codec = ""
+    if compress or (compress is None and len(data) >= COMPRESS_MIN):
+        data, codec = zlib.compress(data, 6), "zlib"
+    path = _entry_path(ns, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+
+    now = time.time()
+    with _connect() as con:
+        con.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (ns, key, str(path.relative_to(kv_folder)), fmt, codec, len(data), now, now,
+             now + ttl if ttl is not None else None, json.dumps(sig))
+        )
+    with _lock:
+        _memo.pop((ns, key), None)
+    _count(ns, "write")
+    evict()
+    return path
+
+# read a value (default if missing, expired or stale)
+def cache_get(key: str, ns: str = "default", default=None):
+    with _connect() as con:
+        row = con.execute(
+            "SELECT file, format, codec, expires, deps FROM entries WHERE ns = ? AND key = ?", (ns, key)
+        ).fetchone()
+        if row is None:
+            _count(ns, "miss")
+            return default
+        file, fmt, codec, expires, deps = row
+        if _stale(expires, json.loads(deps or "{}")):
+            con.execute("DELETE FROM entries WHERE ns = ? AND key = ?", (ns, key))
+            (kv_folder / file).unlink(missing_ok=True)
+            _count(ns, "stale")
+            return default
+        try:
+            data = (kv_folder / file).read_bytes()
+            value = _decode(zlib.decompress(data) if codec == "zlib" else data, fmt)
+        except Exception:
+            con.execute("DELETE FROM entries WHERE ns = ? AND key = ?", (ns, key))
+            _count(ns, "miss")
+            return default
+        con.execute("UPDATE entries SET accessed = ? WHERE ns = ? AND key = ?", (time.time(), ns, key))
+    _count(ns, "hit")
+    return value
+
+# drop one key, or a whole namespace
+def cache_invalidate(ns: str, key: str | None = None) -> int:
+    with _connect() as con:
+        if key is None:
+            rows = con.execute("SELECT file FROM entries WHERE ns = ?", (ns,)).fetchall()
+            con.execute("DELETE FROM entries WHERE ns = ?", (ns,))
+        else:
+            rows = con.execute("SELECT file FROM entries WHERE ns = ? AND key = ?", (ns, key)).fetchall()
+            con.execute("DELETE FROM entries WHERE ns = ? AND key = ?", (ns, key))
+    for (file,) in rows:
+        (kv_folder / file).unlink(missing_ok=True)
+    with _lock:
+        for k in [k for k in _memo if k[0] == ns and (key is None or k[1] == key)]:
+            del _memo[k]
+    return len(rows)
+
+# drop least recently used entries until under the budget
+def evict(max_bytes: int = MAX_BYTES) -> int:
+    removed = 0
+    with _connect() as con:
+        (total,) = con.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= max_bytes:
+            return 0
+        for ns, key, file, size in con.execute(
+            "SELECT ns, key, file, size FROM entries ORDER BY accessed"
+        ).fetchall():
+            con.execute("DELETE FROM entries WHERE ns = ? AND key = ?", (ns, key))
+            (kv_folder / file).unlink(missing_ok=True)
+            _count(ns, "evicted")
+            total -= size or 0
+            removed += 1
+            if total <= max_bytes:
+                break
+    return removed
+
+# in-memory get-or-build (not written to disk)
+def memo(ns: str, key: str, build, ttl: float | None = None, deps=None):
+    k = (ns, key)
+    with _lock:
+        hit = _memo.get(k)
+    if hit is not None:
+        value, expires, sig = hit
+        if not _stale(expires, sig):
+            with _lock:
+                _memo.move_to_end(k)
+            _count(ns, "hit")
+            return value
+        _count(ns, "stale")
     else:
-        fpath.write_text(str(obj), encoding="utf-8")
-    return fpath
+        _count(ns, "miss")
+    sig = _signature(deps)              # taken before building, so a change mid-build isn't missed
+    value = build()
+    with _lock:
+        _memo[k] = (value, time.time() + ttl if ttl is not None else None, sig)
+        _memo.move_to_end(k)
+        while len(_memo) > MEMO_ENTRIES:
+            _memo.popitem(last=False)
+    return value
+
+# disk get-or-build
+def cached(ns: str, key: str, build, ttl: float | None = None, deps=None, compress: bool | None = None):
+    missing = object()
+    value = cache_get(key, ns, missing)
+    if value is missing:
+        sig = _signature(deps)
+        value = build()
+        _write(key, value, ns, ttl, sig, compress)
+    return value
+
+# hit / miss / stale / write / evicted counts, per namespace, plus disk usage
+def cache_stats() -> dict:
+    with _lock:
+        out = {}
+        for (ns, event), n in _stats.items():
+            out.setdefault(ns, Counter())[event] += n
+    with _connect() as con:
+        for ns, n, size in con.execute("SELECT ns, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY ns"):
+            out.setdefault(ns, Counter()).update({"entries": n, "bytes": size})
+    for ns, c in out.items():
+        looked = c["hit"] + c["miss"] + c["stale"]
+        c["hit_rate"] = round(c["hit"] / looked, 3) if looked else None
+    return {ns: dict(c) for ns, c in out.items()}
+
+_file_locks = {}                # lock file -> thread lock (the os lock is per process)
+_file_locks_guard = threading.Lock()
+
+# hold <path>.lock exclusively, across threads and processes
+@contextmanager
+def file_lock(path):
+    lock_file = Path(f"{path}.lock")
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with _file_locks_guard:
+        thread_lock = _file_locks.setdefault(str(lock_file.resolve()), threading.Lock())
+    with thread_lock, open(lock_file, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue    # LK_LOCK gives up after ~10 s, keep waiting
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+# write to cache (kept for older callers)
+def cache_write(fname: str, obj, ttl: float | None = None, deps=None):
+    return cache_put(fname, obj, "files", ttl, deps)
 
-# read json from cache
+# read json from cache (kept for older callers, falls back to files written before the index)
 def cache_read_json(fname: str):
-    fpath = cache_folder / fname
-    if fpath.exists():
-        return json.loads(fpath.read_text(encoding="utf-8"))
-    return None
+    value = cache_get(fname, "files")
+    legacy = cache_folder / fname
+    if value is None and legacy.is_file():
+        return json.loads(legacy.read_text(encoding="utf-8"))
+    return value
 
-# get all links_*.txt files
-@lru_cache(maxsize=32)
+# get all links_*.txt files (re-globbed once the crawl folder changes)
 def get_links_files():
     crawl_folder = data_folder / "crawl"
-    return sorted(crawl_folder.glob("links_*.txt"))
+    return memo("listing", "links", lambda: sorted(crawl_folder.glob("links_*.txt")), deps=[crawl_folder])